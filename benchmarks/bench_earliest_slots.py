@@ -0,0 +1,148 @@
+"""Earliest free slot search across many doctors.
+
+Adds 500 synthetic doctors (by default) with varied working hours, fills a
+90-day slots horizon for them and books most of the near-term slots. Then
+times both plans of find_earliest_slots (one time-ordered scan of all free
+slots, and a per-doctor probe merged afterwards) and looking the same
+answer up one doctor at a time through get_availability, with and without
+a specialization filter. The unfiltered rows include any real doctors.
+The synthetic doctors and their slots are deleted afterwards, but run it
+against a scratch database.
+
+    python benchmarks/bench_earliest_slots.py [doctors] [calls]
+"""
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+
+from db import HospitalDatabase  # noqa: E402
+
+HORIZON_DAYS = 90
+SPECIALIZATIONS = ['Cardiology', 'Dermatology', 'Neurology', 'Pediatrics', 'Oncology',
+                   'Orthopedics', 'Psychiatry', 'Radiology', 'Surgery', 'Urology']
+
+
+def seed(db, doctors, marker):
+    """Insert the synthetic doctors and their slots; returns their ids"""
+    with db._cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, name, role, is_deleted)
+            SELECT %(marker)s || '-' || n || '@example.com', 'x', 'Bench Doctor ' || n,
+                   'doctor', FALSE
+            FROM generate_series(1, %(doctors)s) AS n
+            RETURNING id
+        """, {'marker': marker, 'doctors': doctors})
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            INSERT INTO doctors (user_id, specialization, department, from_time, until_time, is_deleted)
+            SELECT id, (%(specs)s::text[])[1 + id %% %(spec_count)s], 'Bench',
+                   TIME '08:00' + (id %% 3) * INTERVAL '1 hour',
+                   TIME '16:00' + (id %% 3) * INTERVAL '1 hour', FALSE
+            FROM unnest(%(ids)s::integer[]) AS id
+        """, {'specs': SPECIALIZATIONS, 'spec_count': len(SPECIALIZATIONS), 'ids': ids})
+        cursor.connection.commit()
+
+    for doctor_id in ids:
+        db.extend_slot_horizon(HORIZON_DAYS, doctor_id=doctor_id)
+
+    with db._cursor() as cursor:
+        # A busy clinic: most of the next two weeks is already taken
+        cursor.execute("""
+            UPDATE slots SET status = 'booked'
+            WHERE doctor_id = ANY(%s) AND start_ts < CURRENT_DATE + 14 AND random() < 0.9
+        """, (ids,))
+        cursor.execute("ANALYZE slots")
+        cursor.connection.commit()
+    return ids
+
+
+def cleanup(db, marker):
+    with db._cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM doctors WHERE user_id IN (SELECT id FROM users WHERE email LIKE %s)
+        """, (marker + '-%',))
+        cursor.execute("DELETE FROM users WHERE email LIKE %s", (marker + '-%',))
+        cursor.connection.commit()
+
+
+def per_doctor(db, doctors, limit):
+    """The naive way: walk every doctor's calendar, then merge"""
+    today = date.today()
+    found = []
+    for doctor in doctors:
+        days = db.get_availability(doctor['id'], today, today + timedelta(days=HORIZON_DAYS))
+        mine = [datetime.combine(day, slot) for day, slots in sorted(days.items()) for slot in slots]
+        found.extend((start, doctor['id']) for start in mine[:limit])
+    return sorted(found)[:limit]
+
+
+def timed(run, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    doctor_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    limit = 10
+    db = HospitalDatabase()
+    marker = f"bench-{uuid.uuid4().hex[:8]}"
+
+    try:
+        started = time.perf_counter()
+        ids = seed(db, doctor_count, marker)
+        print(f"Seeded {len(ids)} doctors x {HORIZON_DAYS} days of slots "
+              f"in {time.perf_counter() - started:.1f} s")
+
+        doctors = [d for d in db.get_all_doctors() if d['id'] in set(ids)]
+        cardiology = [d for d in doctors if d['specialization'] == 'Cardiology']
+
+        # department='Bench' keeps any real doctors out of the comparison
+        for spec in (None, 'Cardiology'):
+            scan = db.find_earliest_slots(spec, 'Bench', limit=limit, plan='scan')
+            probe = db.find_earliest_slots(spec, 'Bench', limit=limit, plan='per_doctor')
+            assert scan == probe, "plans differ"
+        fast = db.find_earliest_slots(department='Bench', limit=limit)
+        slow = per_doctor(db, doctors, limit)
+        assert [s['start_ts'] for s in fast] == [start for start, _ in slow], "results differ"
+
+        print(f"{calls} calls each, milliseconds per call, limit {limit}")
+        print(f"{'search':<28}{'p50':>10}{'max':>10}")
+        cases = []
+        for plan in ('scan', 'per_doctor'):
+            cases += [
+                (f"plan={plan}",
+                 lambda plan=plan: db.find_earliest_slots(limit=limit, plan=plan), calls),
+                ('  + department',
+                 lambda plan=plan: db.find_earliest_slots(
+                     department='Bench', limit=limit, plan=plan), calls),
+                ('  + specialization',
+                 lambda plan=plan: db.find_earliest_slots(
+                     'Cardiology', 'Bench', limit=limit, plan=plan), calls),
+            ]
+        cases += [
+            ('per-doctor get_availability',
+             lambda: per_doctor(db, doctors, limit), max(1, calls // 10)),
+            ('  + specialization',
+             lambda: per_doctor(db, cardiology, limit), max(1, calls // 10)),
+        ]
+        for name, run, n in cases:
+            p50, worst = timed(run, n)
+            print(f"{name:<28}{p50:>10.2f}{worst:>10.2f}")
+    finally:
+        cleanup(db, marker)
+        db.pool.closeall()
+
+
+if __name__ == '__main__':
+    main()
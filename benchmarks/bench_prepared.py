@@ -0,0 +1,80 @@
+"""Per-call latency of the hot lookups, ad hoc versus prepared.
+
+Runs each statement in PREPARED_STATEMENTS against the database from .env,
+once as a plain parameterised query (parsed and planned on every call) and
+once through HospitalDatabase._execute_prepared. Needs at least one doctor
+and one patient in the database.
+
+    python benchmarks/bench_prepared.py [calls]
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+
+from db import PREPARED_STATEMENTS, HospitalDatabase  # noqa: E402
+
+
+def to_psycopg(query, count):
+    """$1, $2... placeholders to %s so the statement can run unprepared"""
+    for n in range(count, 0, -1):
+        query = query.replace(f"${n}", "%s")
+    return query
+
+
+def timed(run, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), statistics.quantiles(samples, n=100)[98]
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    db = HospitalDatabase()
+    with db._cursor() as cursor:
+        cursor.execute("SELECT id FROM users WHERE role = 'doctor' AND is_deleted = FALSE LIMIT 1")
+        doctor_id = cursor.fetchone()[0]
+        cursor.execute("SELECT id FROM users WHERE role = 'patient' AND is_deleted = FALSE LIMIT 1")
+        patient_id = cursor.fetchone()[0]
+
+    today = date.today().isoformat()
+    params = {
+        'doctor_by_id': (doctor_id,),
+        'patient_by_id': (patient_id,),
+        'booked_times': (doctor_id, today),
+        'todays_appointments': (doctor_id, today),
+    }
+
+    print(f"{calls} calls each, milliseconds per call")
+    print(f"{'statement':<22}{'ad hoc p50':>12}{'p99':>8}{'prepared p50':>15}{'p99':>8}")
+    # One connection for the whole run, so both sides skip the pool checkout
+    with db._cursor() as cursor:
+        for name, (_, query) in PREPARED_STATEMENTS.items():
+            args = params[name]
+            adhoc = to_psycopg(query, len(args))
+
+            def run_adhoc():
+                cursor.execute(adhoc, args)
+                cursor.fetchall()
+
+            def run_prepared():
+                db._execute_prepared(cursor, name, args)
+                cursor.fetchall()
+
+            run_adhoc()
+            run_prepared()
+            adhoc_p50, adhoc_p99 = timed(run_adhoc, calls)
+            prepared_p50, prepared_p99 = timed(run_prepared, calls)
+            print(f"{name:<22}{adhoc_p50:>12.3f}{adhoc_p99:>8.3f}{prepared_p50:>15.3f}{prepared_p99:>8.3f}")
+    db.pool.closeall()
+
+
+if __name__ == '__main__':
+    main()
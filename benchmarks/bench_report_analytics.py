@@ -0,0 +1,150 @@
+"""Report figures: per-row Python loops versus NumPy over columnar fetches.
+
+First times the report maths alone on synthetic columns of ``rows``
+appointments, bills and prescriptions (1M by default, no database
+needed). It compares the per-row loops the reports page used to run with
+report_analytics. Then, against the database, it times each report's SQL
+query against a columnar fetch plus report_analytics over the whole
+history, and checks that both give the same figures. The report views
+are refreshed first, so run it against a scratch database. Needs NumPy.
+
+    python benchmarks/bench_report_analytics.py [rows] [calls]
+"""
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+
+import numpy as np  # noqa: E402
+
+import report_analytics  # noqa: E402
+from db import APPOINTMENT_STATUSES, BILL_STATUSES, HospitalDatabase  # noqa: E402
+
+
+def timed(run, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        result = run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def synthetic(rows, patients=20_000, doctors=300):
+    rng = np.random.default_rng(7)
+    today = np.datetime64(date.today(), 'D')
+    people = {
+        'patients': {
+            'id': np.arange(1, patients + 1, dtype=np.int64),
+            'name': np.array([f"Patient {i}" for i in range(patients)], dtype=object),
+            'date_of_birth': today - rng.integers(0, 90 * 365, patients),
+        },
+        'doctors': {
+            'id': np.arange(1, doctors + 1, dtype=np.int64),
+            'name': np.array([f"Doctor {i}" for i in range(doctors)], dtype=object),
+            'specialization': np.array(['General'] * doctors, dtype=object),
+        },
+    }
+    columns = {
+        'appointments': {
+            'patient_id': rng.integers(1, patients + 1, rows),
+            'doctor_id': rng.integers(1, doctors + 1, rows),
+            'date': today - rng.integers(0, 5 * 365, rows),
+            'status': rng.integers(0, len(APPOINTMENT_STATUSES), rows).astype(np.int8),
+        },
+        'bills': {
+            'amount': rng.integers(1_000, 500_000, rows),
+            'status': rng.integers(0, len(BILL_STATUSES), rows).astype(np.int8),
+        },
+        'prescriptions': {
+            'medication': rng.integers(0, 400, rows).astype(np.int32),
+            'medication_labels': np.array([f"Drug {i:03}" for i in range(400)], dtype=object),
+        },
+    }
+    return people, columns
+
+
+def python_loops(people, columns):
+    """The reports page's old approach: one Python step per record"""
+    appointments = columns['appointments']
+    rows = list(zip(appointments['patient_id'].tolist(), appointments['doctor_id'].tolist(),
+                    appointments['date'].tolist(), appointments['status'].tolist()))
+    visits, last = Counter(), {}
+    per_doctor = defaultdict(Counter)
+    for patient_id, doctor_id, day, status in rows:
+        visits[patient_id] += 1
+        if patient_id not in last or day > last[patient_id]:
+            last[patient_id] = day
+        per_doctor[doctor_id][APPOINTMENT_STATUSES[status]] += 1
+    totals = Counter()
+    for amount, status in zip(columns['bills']['amount'].tolist(), columns['bills']['status'].tolist()):
+        totals[BILL_STATUSES[status]] += amount
+    labels = columns['prescriptions']['medication_labels']
+    top = Counter(labels[code] for code in columns['prescriptions']['medication'].tolist()).most_common(3)
+    return visits, per_doctor, totals, top
+
+
+def numpy_analytics(people, columns):
+    return (
+        report_analytics.patient_report(people['patients'], columns['appointments']),
+        report_analytics.doctor_report(people['doctors'], columns['appointments']),
+        report_analytics.financial_summary(columns['bills']),
+        report_analytics.top_medications(columns['prescriptions']),
+    )
+
+
+def compare_with_sql(db, calls):
+    doctors, patients = db.get_doctor_columns(), db.get_patient_columns()
+    cases = [
+        ('patient report',
+         lambda: db.get_patient_report(),
+         lambda: report_analytics.patient_report(patients, db.get_appointment_columns()),
+         lambda rows: [(r['id'], r['age'], r['appointments'], r['last_visit']) for r in rows]),
+        ('doctor report',
+         lambda: db.get_doctor_report(),
+         lambda: report_analytics.doctor_report(doctors, db.get_appointment_columns()),
+         lambda rows: [(r['id'], r['appointments'], r['completed'], r['cancelled'],
+                        float(r['completion_rate'])) for r in rows]),
+        ('revenue summary',
+         lambda: db.get_revenue_summary(),
+         lambda: report_analytics.financial_summary(db.get_bill_columns()),
+         lambda s: (s['total'], s['paid'], s['pending'], s['count'])),
+        ('top medications',
+         lambda: db.get_top_medications(limit=3),
+         lambda: report_analytics.top_medications(db.get_prescription_columns(), limit=3),
+         lambda rows: [(r['medication'], r['count']) for r in rows]),
+    ]
+    print(f"Whole history, {calls} calls each, milliseconds per call")
+    print(f"{'report':<20}{'SQL':>10}{'columnar+NumPy':>16}")
+    for name, in_sql, in_numpy, key in cases:
+        sql_ms, expected = timed(in_sql, calls)
+        numpy_ms, actual = timed(in_numpy, calls)
+        assert key(expected) == key(actual), f"{name}: results differ"
+        print(f"{name:<20}{sql_ms:>10.1f}{numpy_ms:>16.1f}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    people, columns = synthetic(rows)
+    print(f"Report maths over {rows} synthetic records of each kind, milliseconds")
+    for name, run in (('Python loops', python_loops), ('NumPy', numpy_analytics)):
+        ms, _ = timed(lambda: run(people, columns), max(1, calls // 2))
+        print(f"  {name:<14}{ms:>10.1f}")
+
+    db = HospitalDatabase()
+    try:
+        db.refresh_report_views(force=True)
+        compare_with_sql(db, calls)
+    finally:
+        db.pool.closeall()
+
+
+if __name__ == '__main__':
+    main()
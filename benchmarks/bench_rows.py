@@ -0,0 +1,80 @@
+"""Memory and build time of 100k result rows: RealDictRow versus typed rows.
+
+Fetches the same synthetic appointment rows (generated server-side, so no
+data is needed) through a RealDictCursor and through a tuple cursor turned
+into models.Appointment, and reports the memory the rows hold on to and
+the time to fetch and build them.
+
+    python benchmarks/bench_rows.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+from db import HospitalDatabase  # noqa: E402
+from models import Appointment  # noqa: E402
+
+QUERY = """
+    SELECT n AS id, n %% 5000 AS patient_id, n %% 200 AS doctor_id,
+           CURRENT_DATE - (n %% 365) AS date,
+           TIME '08:00' + (n %% 20) * INTERVAL '30 minutes' AS time,
+           'Checkup ' || (n %% 50) AS reason, 'scheduled' AS status,
+           now()::timestamp AS created_at, FALSE AS is_deleted, NULL::timestamp AS deleted_at,
+           'Patient ' || (n %% 5000) AS patient_name
+    FROM generate_series(1, %s) AS n
+"""
+
+
+def measure(db, build, count):
+    # Timed without tracemalloc, which slows allocation down
+    gc.collect()
+    started = time.perf_counter()
+    rows = build(db, count)
+    elapsed = time.perf_counter() - started
+    assert len(rows) == count
+    del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = build(db, count)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return elapsed, held
+
+
+def dict_rows(db, count):
+    with db._cursor(RealDictCursor) as cursor:
+        cursor.execute(QUERY, (count,))
+        return cursor.fetchall()
+
+
+def typed_rows(db, count):
+    with db._cursor() as cursor:
+        cursor.execute(QUERY, (count,))
+        return Appointment.from_cursor(cursor)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    db = HospitalDatabase()
+    # Warm up the connection and the typecasters
+    dict_rows(db, 100)
+    typed_rows(db, 100)
+
+    print(f"{count} appointment rows")
+    print(f"{'rows':<14}{'fetch+build s':>15}{'held MiB':>10}{'bytes/row':>11}")
+    for name, build in (('RealDictRow', dict_rows), ('Appointment', typed_rows)):
+        elapsed, held = measure(db, build, count)
+        print(f"{name:<14}{elapsed:>15.3f}{held / 2**20:>10.1f}{held / count:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Concurrent booking against the slots inventory.
+
+Starts 200 threads (by default) at once, each booking a random one of the
+first few free slots of one doctor through HospitalDatabase.book_slot, so
+most attempts collide. Reports how many succeeded, checks that no slot
+was booked twice and prints the throughput. The appointments it makes are
+deleted again afterwards, but run it against a scratch database: it needs
+at least one doctor with working hours and one patient.
+
+    python benchmarks/load_test_booking.py [threads] [slots]
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+# Enough connections for the threads to really run at the same time
+os.environ.setdefault('DB_POOL_MAX', '50')
+os.environ.setdefault('DB_POOL_TIMEOUT', '60')
+
+from db import BookingConflict, HospitalDatabase  # noqa: E402
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    slot_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    db = HospitalDatabase()
+    db.extend_slot_horizon()
+    marker = f"load test {uuid.uuid4()}"
+
+    with db._cursor() as cursor:
+        cursor.execute("""
+            SELECT doctor_id FROM slots
+            WHERE status = 'free' AND start_ts > NOW()
+            GROUP BY doctor_id
+            ORDER BY count(*) DESC
+            LIMIT 1
+        """)
+        doctor_id = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT start_ts FROM slots
+            WHERE doctor_id = %s AND status = 'free' AND start_ts > NOW()
+            ORDER BY start_ts
+            LIMIT %s
+        """, (doctor_id, slot_count))
+        slots = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT id FROM users WHERE role = 'patient' AND is_deleted = FALSE LIMIT 1")
+        patient_id = cursor.fetchone()[0]
+
+    results = []
+    start = threading.Barrier(threads)
+
+    def book():
+        start.wait()
+        slot = random.choice(slots)
+        started = time.perf_counter()
+        try:
+            outcome = 'booked' if db.book_slot(patient_id, doctor_id, slot, marker) else 'error'
+        except BookingConflict:
+            outcome = 'conflict'
+        results.append((slot, outcome, time.perf_counter() - started))
+
+    workers = [threading.Thread(target=book) for _ in range(threads)]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    booked = sorted(slot for slot, outcome, _ in results if outcome == 'booked')
+    errors = sum(1 for _, outcome, _ in results if outcome == 'error')
+    try:
+        with db._cursor() as cursor:
+            cursor.execute("""
+                SELECT date, time, count(*)
+                FROM appointments
+                WHERE doctor_id = %s AND is_deleted = FALSE AND status <> 'cancelled'
+                  AND date + time = ANY(%s)
+                GROUP BY date, time
+                HAVING count(*) > 1
+            """, (doctor_id, slots))
+            doubles = cursor.fetchall()
+    finally:
+        with db._cursor() as cursor:
+            cursor.execute("""
+                UPDATE slots SET status = 'free', appointment_id = NULL
+                WHERE appointment_id IN (SELECT id FROM appointments WHERE reason = %s)
+            """, (marker,))
+            cursor.execute("DELETE FROM appointments WHERE reason = %s", (marker,))
+            cursor.connection.commit()
+        db.pool.closeall()
+
+    latencies = sorted(latency for _, _, latency in results)
+    print(f"{threads} threads booking {len(slots)} slots of doctor {doctor_id} "
+          f"({datetime.now():%Y-%m-%d %H:%M})")
+    print(f"  booked:           {len(booked)} (distinct slots: {len(set(booked))})")
+    print(f"  rejected:         {len(results) - len(booked) - errors}")
+    print(f"  errors:           {errors}")
+    print(f"  double bookings:  {len(doubles)}")
+    print(f"  elapsed:          {elapsed:.3f} s")
+    print(f"  throughput:       {len(results) / elapsed:.1f} attempts/s")
+    print(f"  latency p50/p99:  {latencies[len(latencies) // 2] * 1000:.1f} / "
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    if doubles or len(booked) != len(set(booked)):
+        sys.exit("FAILED: a slot was booked more than once")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,24 @@
-import psycopg2
-from psycopg2 import sql
+from psycopg2 import errors, sql
 from psycopg2.extras import RealDictCursor
-from typing import Dict, List, Optional, Union
-from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import html
+import itertools
+import json
 import os
 from typing import List, Dict
 
 from dotenv import load_dotenv
 
+from db_cache import EntityCache
+from db_columnar import column_select, to_arrays
+from db_listener import CHANGE_CHANNEL, ChangeListener
+from db_migrations import MigrationRunner
+from models import Appointment, Bill, Doctor, MedicalRecord, Patient, Prescription
+from db_paging import decode_cursor, encode_cursor
+from db_pool import ConnectionPool
+
 CREATE_TABLES = """
     -- Create users table
     CREATE TABLE users (
@@ -159,29 +170,226 @@ CREATE_TABLES = """
 
 """
 
+# Status values as the CHECK constraints allow them, in the order of the
+# category codes that columnar fetches return (see db_columnar)
+APPOINTMENT_STATUSES = ('scheduled', 'completed', 'cancelled', 'no-show')
+BILL_STATUSES = ('pending', 'paid', 'cancelled', 'refunded')
+PRESCRIPTION_STATUSES = ('active', 'completed', 'cancelled')
+# Materialized views behind the reports page, see refresh_report_views()
+REPORT_VIEWS = ('report_doctor_daily', 'report_medication_daily', 'report_revenue_daily')
+# pg_advisory_xact_lock key so only one client refreshes the report views at a time
+REPORT_REFRESH_LOCK = 7301
+# pg_advisory_xact_lock key for mark_missed_appointments()
+NO_SHOW_SWEEP_LOCK = 7302
+# pg_advisory_xact_lock key for extend_slot_horizon()
+SLOT_GENERATOR_LOCK = 7304
+# Length of a bookable slot in the slots inventory
+SLOT_MINUTES = 30
+# Hot, fixed-shape queries PREPAREd once per pooled connection, see
+# _execute_prepared(). Columns are listed rather than * so a later schema
+# change can't alter the result type of a statement that is already prepared.
+PREPARED_STATEMENTS = {
+    'doctor_by_id': ('integer', """
+        SELECT u.id, u.email, u.name, u.phone, u.role,
+               u.is_deleted, u.deleted_at, u.created_at,
+               d.specialization, d.department, d.from_time, d.until_time
+        FROM users u
+        JOIN doctors d ON u.id = d.user_id
+        WHERE u.id = $1 AND u.role = 'doctor'
+        AND u.is_deleted = FALSE AND d.is_deleted = FALSE
+    """),
+    'patient_by_id': ('integer', """
+        SELECT u.id, u.email, u.name, u.phone, u.role,
+               u.is_deleted, u.deleted_at, u.created_at,
+               p.address, p.date_of_birth, p.blood_type, p.insurance
+        FROM users u
+        JOIN patients p ON u.id = p.user_id
+        WHERE u.id = $1 AND u.role = 'patient'
+        AND u.is_deleted = FALSE AND p.is_deleted = FALSE
+    """),
+    'booked_times': ('integer, date', """
+        SELECT time::text as time
+        FROM appointments
+        WHERE doctor_id = $1 AND date = $2 AND is_deleted = FALSE
+        ORDER BY time
+    """),
+    'todays_appointments': ('integer, date', """
+        SELECT a.id, a.patient_id, a.doctor_id, a.date, a.time, a.reason, a.status,
+               a.created_at, a.is_deleted, a.deleted_at, u.name as patient_name
+        FROM appointment_view a
+        JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
+        JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
+        WHERE a.doctor_id = $1 AND a.date = $2
+        AND a.is_deleted = FALSE
+        ORDER BY a.time ASC
+    """),
+}
+# ts_headline options for search_medical_records(). Matches are delimited
+# with control characters, not tags, so the text can be escaped afterwards.
+HEADLINE_OPTIONS = 'StartSel="\x01", StopSel="\x02", MaxFragments=2, MinWords=5, MaxWords=20'
+# Every medical_records column except search_vector, which is only for matching
+MEDICAL_RECORD_COLUMNS = ("mr.id, mr.patient_id, mr.doctor_id, mr.date, mr.diagnosis, "
+                          "mr.treatment, mr.notes, mr.is_deleted, mr.deleted_at")
+
 load_dotenv()  
 
+
+class BookingConflict(Exception):
+    """The doctor already has an active appointment at that time"""
+
+
 class HospitalDatabase:
     def __init__(self):
         try:
-            self.conn = psycopg2.connect(
+            connect_kwargs = dict(
                 dbname=os.getenv('DB_NAME', 'hospital_db'),
                 user=os.getenv('DB_USER', 'postgres'),
                 password=os.getenv('DB_PASSWORD', 'postgres'),
                 host=os.getenv('DB_HOST', 'localhost'),
                 port=os.getenv('DB_PORT', '5432')
             )
-            # Set isolation level to handle errors gracefully
-            self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_READ_COMMITTED)
+            # Every query checks a connection out of the pool, so the UI and
+            # background workers can talk to the database at the same time.
+            self.pool = ConnectionPool(
+                minconn=int(os.getenv('DB_POOL_MIN', '1')),
+                maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                statement_timeout_ms=int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000')),
+                **connect_kwargs
+            )
+            # Doctor and patient rows are read far more often than written
+            self.cache = EntityCache(
+                max_size=int(os.getenv('DB_CACHE_SIZE', '1000')),
+                ttl=float(os.getenv('DB_CACHE_TTL', '300'))
+            )
+            # Rows fetched per round trip by the iter_* server-side cursors
+            self.stream_itersize = int(os.getenv('DB_STREAM_ITERSIZE', '2000'))
+            self._stream_ids = itertools.count(1)
+            # Seconds a report view snapshot is used before it is refreshed
+            self.report_max_age = float(os.getenv('DB_REPORT_MAX_AGE', '300'))
+            # Days ahead the slots inventory is generated, see extend_slot_horizon()
+            self.slot_horizon_days = int(os.getenv('DB_SLOT_HORIZON_DAYS', '90'))
             self._initialize_db()
-            self.mark_missed_appointments()
+            # Versioned schema changes (see db_migrations.MIGRATIONS). With
+            # DB_AUTO_MIGRATE=0 they are applied separately (python db_migrations.py).
+            migrations = MigrationRunner(**connect_kwargs)
+            if os.getenv('DB_AUTO_MIGRATE', '1') != '0':
+                migrations.run()
+                pending = []
+            else:
+                pending = migrations.pending()
+            if pending:
+                print(f"Database migrations not applied yet: {pending}")
+            else:
+                # The nightly maintenance job keeps the horizon rolling; this
+                # only fills it in on a fresh database or after the job stopped
+                self.extend_slot_horizon(min_days_left=self.slot_horizon_days // 2)
+
+            # Changes made by other clients arrive through LISTEN/NOTIFY
+            self.listener = None
+            if os.getenv('DB_CHANGE_FEED', '1') != '0':
+                self.listener = ChangeListener(**connect_kwargs)
+                self.listener.subscribe(self._on_change)
+                self.listener.start()
         except Exception as e:
             print(f"Error initializing database: {e}")
             raise
 
+    def _on_change(self, change: Dict):
+        """Drop cached rows that another client (or this one) changed"""
+        table = change.get('table')
+        if change.get('op') == 'RESYNC':
+            self.cache.clear()
+        elif table == 'doctors':
+            self.cache.invalidate('doctor', change.get('id'))
+        elif table == 'patients':
+            self.cache.invalidate('patient', change.get('id'))
+        elif table == 'users':
+            # A user row backs either a doctor or a patient entry
+            self.cache.invalidate('doctor', change.get('id'))
+            self.cache.invalidate('patient', change.get('id'))
+
+    def subscribe_changes(self, callback):
+        """Call ``callback(change)`` from the listener thread on every row change"""
+        if self.listener:
+            self.listener.subscribe(callback)
+
+    def unsubscribe_changes(self, callback):
+        if self.listener:
+            self.listener.unsubscribe(callback)
+
+    @contextmanager
+    def _cursor(self, cursor_factory=None):
+        """Check a connection out of the pool and yield a cursor on it"""
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=cursor_factory) as cursor:
+                yield cursor
+
+    def _execute_prepared(self, cursor, name: str, params: Tuple):
+        """Run a statement from PREPARED_STATEMENTS on ``cursor``.
+
+        The statement is PREPAREd the first time it is used on a pooled
+        connection; after that only EXECUTE and the parameters go over the
+        wire, and Postgres can reuse the plan.
+        """
+        conn = cursor.connection
+        if name not in conn.prepared:
+            arg_types, query = PREPARED_STATEMENTS[name]
+            cursor.execute(f"PREPARE {name} ({arg_types}) AS {query}")
+            conn.prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+    def _stream(self, query, params=None, itersize: int = None) -> Iterator[Dict]:
+        """Yield rows of ``query`` from a named (server-side) cursor.
+
+        Only ``itersize`` rows are held in memory at a time. The pooled
+        connection stays checked out until the generator is exhausted or
+        closed, so don't leave half-read iterators lying around. Errors are
+        raised to the caller rather than printed, because a stream that
+        stops early would otherwise look like a complete one.
+        """
+        with self.pool.connection() as conn:
+            name = f"stream_{os.getpid()}_{next(self._stream_ids)}"
+            with conn.cursor(name=name, cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = itersize or self.stream_itersize
+                cursor.execute(query, params)
+                yield from cursor
+
+    def _seek_page(self, query: str, params: List, keys: List[Tuple[str, str]],
+                   page_size: int, cursor: Optional[str] = None,
+                   descending: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch one page of ``query`` using keyset (seek) pagination.
+
+        ``query`` must already have a WHERE clause and no ORDER BY. ``keys``
+        lists the ``(column, row field)`` pairs that make up a unique sort
+        key, e.g. ``[('u.name', 'name'), ('u.id', 'id')]``. Instead of an
+        OFFSET, the page starts right after the key stored in ``cursor``,
+        so every page costs the same however deep the user has scrolled.
+        Returns the rows and the cursor for the next page (None at the end).
+        """
+        columns = ", ".join(column for column, _ in keys)
+        after = decode_cursor(cursor, len(keys))
+        params = list(params)
+        if after is not None:
+            query += f" AND ({columns}) {'<' if descending else '>'} ({', '.join(['%s'] * len(keys))})"
+            params.extend(after)
+        direction = " DESC" if descending else ""
+        query += " ORDER BY " + ", ".join(column + direction for column, _ in keys)
+        query += " LIMIT %s"
+        params.append(page_size + 1)
+
+        with self._cursor(RealDictCursor) as db_cursor:
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
+
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, encode_cursor([rows[-1][field] for _, field in keys])
+
     def _initialize_db(self):
         """Initialize database tables if they don't exist"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 # Check if tables exist (using users table as indicator)
                 cursor.execute("""
@@ -191,32 +399,50 @@ class HospitalDatabase:
                     );
                 """)
                 if not cursor.fetchone()[0]:
-                    self._create_tables()
+                    self._create_tables(cursor)
+                cursor.connection.commit()
             except Exception as e:
                 print(f"Error checking database initialization: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 raise
 
-    def _create_tables(self):
+    def _create_tables(self, cursor):
         """Create all necessary tables with soft delete"""
-        with self.conn.cursor() as cursor:
-            try:
-                cursor.execute(CREATE_TABLES)
-                self.conn.commit()
-            except Exception as e:
-                print(f"Error creating tables: {e}")
-                self.conn.rollback()
-                raise
+        try:
+            cursor.execute(CREATE_TABLES)
+            cursor.connection.commit()
+        except Exception as e:
+            print(f"Error creating tables: {e}")
+            cursor.connection.rollback()
+            raise
 
-    def __del__(self):
-        """Close database connection when object is destroyed"""
-        if hasattr(self, 'conn') and self.conn:
-            self.conn.close()
+    def get_pool_stats(self) -> Dict:
+        """Connection pool utilisation and wait time metrics"""
+        return self.pool.stats()
+
+    def get_cache_stats(self) -> Dict:
+        """Entity cache hit/miss counters"""
+        return self.cache.stats()
 
-    def mark_missed_appointments(self):
-        """Mark past scheduled appointments as 'no-show'."""
+    def __del__(self):
+        """Close pooled connections when object is destroyed"""
+        if getattr(self, 'listener', None):
+            self.listener.stop()
+        if hasattr(self, 'pool') and self.pool:
+            self.pool.closeall()
+
+    def mark_missed_appointments(self) -> int:
+        """Persist 'no-show' on past scheduled appointments; returns rows changed.
+
+        Reads already see these as no-shows through appointment_view, so this
+        is only housekeeping for a periodic maintenance job. An advisory lock
+        keeps concurrent callers from sweeping the same rows.
+        """
         try:
-            with self.conn.cursor() as cursor:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (NO_SHOW_SWEEP_LOCK,))
+                if not cursor.fetchone()[0]:
+                    return 0
                 query = """
                     UPDATE appointments
                     SET status = 'no-show'
@@ -224,13 +450,90 @@ class HospitalDatabase:
                     AND status = 'scheduled'
                     AND is_deleted = FALSE;
                 """
+                # One BULK notification instead of one per row swept
+                cursor.execute("SET LOCAL hospital.bulk_change = 'on'")
                 cursor.execute(query)
-                self.conn.commit()
+                swept = cursor.rowcount
+                if swept:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (
+                        CHANGE_CHANNEL, json.dumps({'table': 'appointments', 'op': 'BULK'})
+                    ))
+                cursor.connection.commit()
+                return swept
         except Exception as e:
             print(f"Error marking missed appointments: {e}")
+            return 0
+
+    def extend_slot_horizon(self, days: int = None, doctor_id: int = None,
+                            min_days_left: int = None) -> int:
+        """Generate bookable slots up to ``days`` ahead; returns slots added.
+
+        Slots are ``SLOT_MINUTES`` long within each doctor's working hours
+        (only ``doctor_id``'s if given). Times already taken by an active
+        appointment start out booked. Free slots of deleted doctors or
+        outside working hours are dropped, as are past ones. With
+        ``min_days_left`` nothing happens while the inventory already
+        reaches that far. Meant for a nightly job (see maintenance.py); an
+        advisory lock makes concurrent runs skip.
+        """
+        days = self.slot_horizon_days if days is None else days
+        step = timedelta(minutes=SLOT_MINUTES)
+        try:
+            with self._cursor() as cursor:
+                if doctor_id is None:
+                    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (SLOT_GENERATOR_LOCK,))
+                    if not cursor.fetchone()[0]:
+                        return 0
+                if min_days_left is not None:
+                    cursor.execute("""
+                        SELECT COALESCE(MAX(start_ts) >= CURRENT_DATE + %s, FALSE) FROM slots
+                    """, (min_days_left,))
+                    if cursor.fetchone()[0]:
+                        return 0
+
+                cursor.execute("""
+                    INSERT INTO slots (doctor_id, start_ts, status, appointment_id)
+                    SELECT d.user_id, slot,
+                           CASE WHEN a.id IS NULL THEN 'free' ELSE 'booked' END, a.id
+                    FROM doctors d
+                    CROSS JOIN generate_series(CURRENT_DATE, CURRENT_DATE + %(days)s,
+                                               INTERVAL '1 day') AS day
+                    CROSS JOIN LATERAL generate_series(day::date + d.from_time,
+                                                       day::date + d.until_time - %(step)s,
+                                                       %(step)s) AS slot
+                    LEFT JOIN LATERAL (
+                        SELECT a.id FROM appointments a
+                        WHERE a.doctor_id = d.user_id AND a.date = day::date
+                          AND a.time = slot::time AND a.is_deleted = FALSE
+                          AND a.status <> 'cancelled'
+                        ORDER BY a.id
+                        LIMIT 1
+                    ) a ON TRUE
+                    WHERE d.is_deleted = FALSE
+                      AND (%(doctor_id)s::integer IS NULL OR d.user_id = %(doctor_id)s)
+                    ON CONFLICT (doctor_id, start_ts) DO NOTHING
+                """, {'days': days, 'step': step, 'doctor_id': doctor_id})
+                added = cursor.rowcount
+
+                cursor.execute("""
+                    DELETE FROM slots s
+                    USING doctors d
+                    WHERE s.doctor_id = d.user_id
+                      AND s.status = 'free'
+                      AND (%(doctor_id)s::integer IS NULL OR d.user_id = %(doctor_id)s)
+                      AND (d.is_deleted
+                           OR s.start_ts::time < d.from_time
+                           OR s.start_ts::time > d.until_time - %(step)s)
+                """, {'step': step, 'doctor_id': doctor_id})
+                cursor.execute("DELETE FROM slots WHERE start_ts < CURRENT_DATE")
+                cursor.connection.commit()
+                return added
+        except Exception as e:
+            print(f"Error extending slot horizon: {e}")
+            return 0
 
     def verify_password(self, user_id, current_pass):
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     SELECT password
@@ -248,9 +551,54 @@ class HospitalDatabase:
                 return False
 
     # User management methods
+    @staticmethod
+    def _name_match(alias: str, term: str) -> Tuple[str, List]:
+        """SQL condition matching ``term`` against ``alias``.name.
+
+        Matches substrings, and names within a typo or two of the term
+        (pg_trgm word similarity). Both forms are served by the trigram
+        index on users.name.
+        """
+        escaped = term.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return (
+            f"({alias}.name ILIKE %s OR %s <%% {alias}.name)",
+            [f"%{escaped}%", term.strip()]
+        )
+
+    def search_users(self, term: str, role: str = None, limit: int = 20) -> List[Dict]:
+        """Users whose name or email matches ``term``, best matches first.
+
+        Substring matches rank above fuzzy ones; ``role`` limits the search
+        to 'patient', 'doctor' or 'admin'.
+        """
+        if not term or not term.strip():
+            return []
+        name_clause, params = self._name_match('u', term)
+        like = params[0]
+        query = f"""
+            SELECT u.id, u.name, u.email, u.phone, u.role,
+                   GREATEST(word_similarity(%s, u.name), similarity(u.email, %s)) AS score
+            FROM users u
+            WHERE u.is_deleted = FALSE
+              AND ({name_clause} OR u.email ILIKE %s)
+        """
+        params = [term.strip(), term.strip()] + params + [like]
+        if role:
+            query += " AND u.role = %s"
+            params.append(role)
+        query += " ORDER BY (u.name ILIKE %s OR u.email ILIKE %s) DESC, score DESC, u.name LIMIT %s"
+        params.extend([like, like, limit])
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error searching users: {e}")
+            return []
+
     def get_user(self, email: str, password: str) -> Optional[Dict]:
         """Get user by email, password and role"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     SELECT u.*, 
@@ -270,27 +618,35 @@ class HospitalDatabase:
                 print(f"Error getting user: {e}")
                 return None
 
-    def get_patient_by_id(self, patient_id: int, include_deleted: bool = False) -> Optional[Dict]:
-        """Get patient by ID"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+    def get_patient_by_id(self, patient_id: int, include_deleted: bool = False) -> Optional[Patient]:
+        """Get patient by ID, as the same row type get_patients_by_ids() returns"""
+        if not include_deleted:
+            cached = self.cache.get('patient', patient_id)
+            if cached is not None:
+                return cached
+        with self._cursor() as cursor:
             try:
-                deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND p.is_deleted = FALSE"
-                query = f"""
-                    SELECT u.*, p.address, p.date_of_birth, p.blood_type, p.insurance
-                    FROM users u
-                    JOIN patients p ON u.id = p.user_id
-                    WHERE u.id = %s AND u.role = 'patient'
-                    {deleted_clause}
-                """
-                cursor.execute(query, (patient_id,))
-                return cursor.fetchone()
+                if include_deleted:
+                    cursor.execute("""
+                        SELECT u.id, u.email, u.name, u.phone, u.role, u.is_deleted, u.deleted_at, u.created_at,
+                               p.address, p.date_of_birth, p.blood_type, p.insurance
+                        FROM users u
+                        JOIN patients p ON u.id = p.user_id
+                        WHERE u.id = %s AND u.role = 'patient'
+                    """, (patient_id,))
+                else:
+                    self._execute_prepared(cursor, 'patient_by_id', (patient_id,))
+                patient = next(iter(Patient.from_cursor(cursor)), None)
+                if patient and not include_deleted:
+                    self.cache.put('patient', patient_id, patient)
+                return patient
             except Exception as e:
                 print(f"Error getting patient by ID: {e}")
                 return None
 
     def get_patient_by_email(self, patient_email: str, include_deleted: bool = False) -> Optional[Dict]:
         """Get patient by email"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND p.is_deleted = FALSE"
                 query = f"""
@@ -306,27 +662,35 @@ class HospitalDatabase:
                 print(f"Error getting patient by email: {e}")
                 return None
 
-    def get_doctor_by_id(self, doctor_id: int, include_deleted: bool = False) -> Optional[Dict]:
-        """Get doctor by ID"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+    def get_doctor_by_id(self, doctor_id: int, include_deleted: bool = False) -> Optional[Doctor]:
+        """Get doctor by ID, as the same row type get_doctors_by_ids() returns"""
+        if not include_deleted:
+            cached = self.cache.get('doctor', doctor_id)
+            if cached is not None:
+                return cached
+        with self._cursor() as cursor:
             try:
-                deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND d.is_deleted = FALSE"
-                query = f"""
-                    SELECT u.*, d.specialization, d.department, d.from_time, d.until_time
-                    FROM users u
-                    JOIN doctors d ON u.id = d.user_id
-                    WHERE u.id = %s AND u.role = 'doctor'
-                    {deleted_clause}
-                """
-                cursor.execute(query, (doctor_id,))
-                return cursor.fetchone()
+                if include_deleted:
+                    cursor.execute("""
+                        SELECT u.id, u.email, u.name, u.phone, u.role, u.is_deleted, u.deleted_at, u.created_at,
+                               d.specialization, d.department, d.from_time, d.until_time
+                        FROM users u
+                        JOIN doctors d ON u.id = d.user_id
+                        WHERE u.id = %s AND u.role = 'doctor'
+                    """, (doctor_id,))
+                else:
+                    self._execute_prepared(cursor, 'doctor_by_id', (doctor_id,))
+                doctor = next(iter(Doctor.from_cursor(cursor)), None)
+                if doctor and not include_deleted:
+                    self.cache.put('doctor', doctor_id, doctor)
+                return doctor
             except Exception as e:
                 print(f"Error getting doctor by ID: {e}")
                 return None
 
     def get_doctor_by_email(self, doctor_email: str, include_deleted: bool = False) -> Optional[Dict]:
         """Get doctor by email"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND d.is_deleted = FALSE"
                 query = f"""
@@ -342,45 +706,91 @@ class HospitalDatabase:
                 print(f"Error getting doctor by email: {e}")
                 return None
 
-    def get_patient_appointments(self, patient_id: int) -> List[Dict]:
+    def get_patients_by_ids(self, patient_ids, include_deleted: bool = False) -> Dict[int, Patient]:
+        """Get many patients in one query, keyed by ID"""
+        patient_ids = list({pid for pid in patient_ids if pid is not None})
+        patients = {}
+        if not include_deleted:
+            patients, patient_ids = self.cache.get_many('patient', patient_ids)
+        if not patient_ids:
+            return patients
+        with self._cursor() as cursor:
+            try:
+                deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND p.is_deleted = FALSE"
+                query = f"""
+                    SELECT u.id, u.email, u.name, u.phone, u.role, u.is_deleted, u.deleted_at, u.created_at,
+                           p.address, p.date_of_birth, p.blood_type, p.insurance
+                    FROM users u
+                    JOIN patients p ON u.id = p.user_id
+                    WHERE u.id = ANY(%s) AND u.role = 'patient'
+                    {deleted_clause}
+                """
+                cursor.execute(query, (patient_ids,))
+                fetched = {row.id: row for row in Patient.from_cursor(cursor)}
+                if not include_deleted:
+                    self.cache.put_many('patient', fetched)
+                patients.update(fetched)
+                return patients
+            except Exception as e:
+                print(f"Error getting patients by IDs: {e}")
+                return patients
+
+    def get_doctors_by_ids(self, doctor_ids, include_deleted: bool = False) -> Dict[int, Doctor]:
+        """Get many doctors in one query, keyed by ID"""
+        doctor_ids = list({did for did in doctor_ids if did is not None})
+        doctors = {}
+        if not include_deleted:
+            doctors, doctor_ids = self.cache.get_many('doctor', doctor_ids)
+        if not doctor_ids:
+            return doctors
+        with self._cursor() as cursor:
+            try:
+                deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND d.is_deleted = FALSE"
+                query = f"""
+                    SELECT u.id, u.email, u.name, u.phone, u.role, u.is_deleted, u.deleted_at, u.created_at,
+                           d.specialization, d.department, d.from_time, d.until_time
+                    FROM users u
+                    JOIN doctors d ON u.id = d.user_id
+                    WHERE u.id = ANY(%s) AND u.role = 'doctor'
+                    {deleted_clause}
+                """
+                cursor.execute(query, (doctor_ids,))
+                fetched = {row.id: row for row in Doctor.from_cursor(cursor)}
+                if not include_deleted:
+                    self.cache.put_many('doctor', fetched)
+                doctors.update(fetched)
+                return doctors
+            except Exception as e:
+                print(f"Error getting doctors by IDs: {e}")
+                return doctors
+
+    def get_patient_appointments(self, patient_id: int) -> List[Appointment]:
         """Get all appointments for a patient"""
-        appointments = List[dict]
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor() as cursor:
             try:
                 query = """
-                    SELECT a.*, u.name as doctor_name
-                    FROM appointments a
+                    SELECT a.*, NULL AS patient_name, u.name as doctor_name,
+                           d.department AS doctor_department
+                    FROM appointment_view a
                     JOIN doctors d ON a.doctor_id = d.user_id
                     JOIN users u ON d.user_id = u.id
                     WHERE a.patient_id = %s AND a.is_deleted = FALSE
                     ORDER BY a.date DESC, a.time DESC
                 """
                 cursor.execute(query, (patient_id,))
-                appointments = cursor.fetchall()
-                
-                # Convert dates to datetime.date objects if they're strings
-                for appt in appointments:
-                    if isinstance(appt['date'], str):
-                        appt['date'] = datetime.strptime(appt['date'], "%Y-%m-%d").date()
-                    if isinstance(appt['time'], str):
-                        try:
-                            appt['time'] = datetime.strptime(appt['time'], "%H:%M:%S").time()
-                        except ValueError:
-                            appt['time'] = datetime.strptime(appt['time'], "%H:%M").time()
-                return appointments
-                
+                return Appointment.from_cursor(cursor)
             except Exception as e:
                 print(f"Error getting patient appointments: {e}")
-                return appointments
+                return []
 
-    def get_doctor_appointments(self, doctor_id: int, include_deleted: bool = False) -> List[Dict]:
+    def get_doctor_appointments(self, doctor_id: int, include_deleted: bool = False) -> List[Appointment]:
         """Get all appointments for a doctor"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor() as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND a.is_deleted = FALSE"
                 query = f"""
                     SELECT a.*, u.name as patient_name
-                    FROM appointments a
+                    FROM appointment_view a
                     JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
                     JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
                     WHERE a.doctor_id = %s
@@ -388,7 +798,7 @@ class HospitalDatabase:
                     ORDER BY a.date DESC, a.time DESC
                 """
                 cursor.execute(query, (doctor_id,))
-                return cursor.fetchall()
+                return Appointment.from_cursor(cursor)
             except Exception as e:
                 print(f"Error getting doctor appointments: {e}")
                 return []
@@ -398,28 +808,178 @@ class HospitalDatabase:
         if date is None:
             date = datetime.now().strftime('%Y-%m-%d')
             
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                deleted_clause = "" if include_deleted else "AND a.is_deleted = FALSE"
-                query = f"""
-                    SELECT a.*, u.name as patient_name
-                    FROM appointments a
-                    JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
-                    JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
-                    WHERE a.doctor_id = %s AND a.date = %s
-                    {deleted_clause}
-                    ORDER BY a.time ASC
-                """
-                cursor.execute(query, (doctor_id, date))
+                if include_deleted:
+                    cursor.execute("""
+                        SELECT a.*, u.name as patient_name
+                        FROM appointment_view a
+                        JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
+                        JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
+                        WHERE a.doctor_id = %s AND a.date = %s
+                        ORDER BY a.time ASC
+                    """, (doctor_id, date))
+                else:
+                    self._execute_prepared(cursor, 'todays_appointments', (doctor_id, date))
                 return cursor.fetchall()
             except Exception as e:
                 print(f"Error getting today's appointments: {e}")
                 return []
 
+    @staticmethod
+    def _parse_json_dates(rows: List[Dict], date_fields=(), time_fields=()) -> List[Dict]:
+        """Turn the ISO strings json_agg produces back into date and time objects"""
+        for row in rows:
+            for field in date_fields:
+                if isinstance(row.get(field), str):
+                    row[field] = datetime.strptime(row[field][:10], "%Y-%m-%d").date()
+            for field in time_fields:
+                if isinstance(row.get(field), str):
+                    row[field] = datetime.strptime(row[field][:8], "%H:%M:%S").time()
+        return rows
+
+    def get_doctor_dashboard(self, doctor_id: int, today: str = None) -> Optional[Dict]:
+        """Everything the doctor dashboard shows, in one round trip.
+
+        Returns ``schedule`` (today's appointments with patient names),
+        ``status_counts`` (all of the doctor's appointments by status),
+        ``monthly_prescriptions``, ``patients`` (every patient the doctor has
+        seen, with their last completed visit) and ``active_prescriptions``
+        (with patient names).
+        """
+        if today is None:
+            today = datetime.now().strftime('%Y-%m-%d')
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT json_build_object(
+                        'schedule', COALESCE((
+                            SELECT json_agg(t ORDER BY t.time)
+                            FROM (
+                                SELECT a.id, a.patient_id, a.doctor_id, a.date, a.time,
+                                       a.reason, a.status, u.name AS patient_name
+                                FROM appointment_view a
+                                JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
+                                JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
+                                WHERE a.doctor_id = %(doctor_id)s AND a.date = %(today)s
+                                  AND a.is_deleted = FALSE
+                            ) t
+                        ), '[]'::json),
+                        'status_counts', COALESCE((
+                            SELECT json_object_agg(status, count)
+                            FROM (
+                                SELECT status, COUNT(*) AS count
+                                FROM appointment_view
+                                WHERE doctor_id = %(doctor_id)s AND is_deleted = FALSE
+                                GROUP BY status
+                            ) s
+                        ), '{}'::json),
+                        'monthly_prescriptions', (
+                            SELECT COUNT(*)
+                            FROM prescriptions
+                            WHERE doctor_id = %(doctor_id)s AND is_deleted = FALSE
+                              AND date >= date_trunc('month', %(today)s::date)::date
+                              AND date < (date_trunc('month', %(today)s::date) + INTERVAL '1 month')::date
+                        ),
+                        'patients', COALESCE((
+                            SELECT json_agg(r ORDER BY r.name)
+                            FROM (
+                                SELECT u.id, u.name, u.email, u.phone, p.date_of_birth, p.blood_type,
+                                       MAX(a.date) FILTER (WHERE a.status = 'completed') AS last_visit
+                                FROM appointment_view a
+                                JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
+                                JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
+                                WHERE a.doctor_id = %(doctor_id)s AND a.is_deleted = FALSE
+                                GROUP BY u.id, u.name, u.email, u.phone, p.date_of_birth, p.blood_type
+                            ) r
+                        ), '[]'::json),
+                        'active_prescriptions', COALESCE((
+                            SELECT json_agg(rx ORDER BY rx.date)
+                            FROM (
+                                SELECT pr.id, pr.patient_id, pr.medication, pr.dosage, pr.date,
+                                       u.name AS patient_name
+                                FROM prescriptions pr
+                                JOIN users u ON pr.patient_id = u.id AND u.is_deleted = FALSE
+                                WHERE pr.doctor_id = %(doctor_id)s AND pr.status = 'active'
+                                  AND pr.is_deleted = FALSE
+                            ) rx
+                        ), '[]'::json)
+                    )
+                """, {'doctor_id': doctor_id, 'today': today})
+                data = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error getting doctor dashboard: {e}")
+            return None
+
+        self._parse_json_dates(data['schedule'], ('date',), ('time',))
+        self._parse_json_dates(data['patients'], ('date_of_birth', 'last_visit'))
+        self._parse_json_dates(data['active_prescriptions'], ('date',))
+        return data
+
+    def get_patient_overview(self, patient_id: int) -> Optional[Dict]:
+        """Everything the patient dashboard shows, in one round trip.
+
+        Returns ``appointments``, ``prescriptions`` and ``medical_records``
+        (each with ``doctor_name``) and ``bills`` (with the appointment they
+        belong to), newest first.
+        """
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT json_build_object(
+                        'appointments', COALESCE((
+                            SELECT json_agg(t ORDER BY t.date DESC, t.time DESC)
+                            FROM (
+                                SELECT a.*, u.name AS doctor_name
+                                FROM appointment_view a
+                                JOIN users u ON a.doctor_id = u.id
+                                WHERE a.patient_id = %(patient_id)s AND a.is_deleted = FALSE
+                            ) t
+                        ), '[]'::json),
+                        'prescriptions', COALESCE((
+                            SELECT json_agg(rx ORDER BY rx.date DESC)
+                            FROM (
+                                SELECT pr.*, u.name AS doctor_name
+                                FROM prescriptions pr
+                                JOIN users u ON pr.doctor_id = u.id AND u.is_deleted = FALSE
+                                WHERE pr.patient_id = %(patient_id)s AND pr.is_deleted = FALSE
+                            ) rx
+                        ), '[]'::json),
+                        'medical_records', COALESCE((
+                            SELECT json_agg(r ORDER BY r.date DESC)
+                            FROM (
+                                SELECT {MEDICAL_RECORD_COLUMNS}, u.name AS doctor_name
+                                FROM medical_records mr
+                                JOIN users u ON mr.doctor_id = u.id AND u.is_deleted = FALSE
+                                WHERE mr.patient_id = %(patient_id)s AND mr.is_deleted = FALSE
+                            ) r
+                        ), '[]'::json),
+                        'bills', COALESCE((
+                            SELECT json_agg(b ORDER BY b.date DESC)
+                            FROM (
+                                SELECT bl.*, a.date AS appointment_date, a.reason AS appointment_reason
+                                FROM billing bl
+                                LEFT JOIN appointments a ON bl.appointment_id = a.id AND a.is_deleted = FALSE
+                                WHERE bl.patient_id = %(patient_id)s AND bl.is_deleted = FALSE
+                            ) b
+                        ), '[]'::json)
+                    )
+                """, {'patient_id': patient_id})
+                data = cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error getting patient overview: {e}")
+            return None
+
+        self._parse_json_dates(data['appointments'], ('date',), ('time',))
+        self._parse_json_dates(data['prescriptions'], ('date',))
+        self._parse_json_dates(data['medical_records'], ('date',))
+        self._parse_json_dates(data['bills'], ('date', 'appointment_date'))
+        return data
+
     # Prescription methods
-    def get_patient_prescriptions(self, patient_id: int, include_deleted: bool = False) -> List[Dict]:
+    def get_patient_prescriptions(self, patient_id: int, include_deleted: bool = False) -> List[Prescription]:
         """Get all prescriptions for a patient"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor() as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND p.is_deleted = FALSE"
                 query = f"""
@@ -432,14 +992,14 @@ class HospitalDatabase:
                     ORDER BY p.date DESC
                 """
                 cursor.execute(query, (patient_id,))
-                return cursor.fetchall()
+                return Prescription.from_cursor(cursor)
             except Exception as e:
                 print(f"Error getting patient prescriptions: {e}")
                 return []
 
     def get_active_prescriptions(self, patient_id: int, include_deleted: bool = False) -> List[Dict]:
         """Get active prescriptions for a patient"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND p.is_deleted = FALSE"
                 query = f"""
@@ -463,13 +1023,13 @@ class HospitalDatabase:
                                  to_date: str = None, 
                                  doctor_id: int = None, 
                                  diagnosis: str = None,
-                                 include_deleted: bool = False) -> List[Dict]:
+                                 include_deleted: bool = False) -> List[MedicalRecord]:
         """Get filtered medical records for a patient"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor() as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND mr.is_deleted = FALSE"
                 query = f"""
-                    SELECT mr.*, u.name as doctor_name
+                    SELECT {MEDICAL_RECORD_COLUMNS}, u.name as doctor_name
                     FROM medical_records mr
                     JOIN doctors d ON mr.doctor_id = d.user_id AND d.is_deleted = FALSE
                     JOIN users u ON d.user_id = u.id AND u.is_deleted = FALSE
@@ -493,19 +1053,95 @@ class HospitalDatabase:
                 
                 query += " ORDER BY mr.date DESC"
                 cursor.execute(query, params)
-                return cursor.fetchall()
+                return MedicalRecord.from_cursor(cursor)
             except Exception as e:
                 print(f"Error getting medical records: {e}")
                 return []
 
+    def get_latest_medical_records(self, patient_ids, include_deleted: bool = False) -> Dict[int, Dict]:
+        """Get the most recent medical record of each patient, keyed by patient ID"""
+        patient_ids = list({pid for pid in patient_ids if pid is not None})
+        if not patient_ids:
+            return {}
+        with self._cursor(RealDictCursor) as cursor:
+            try:
+                deleted_clause = "" if include_deleted else "AND mr.is_deleted = FALSE"
+                query = f"""
+                    SELECT DISTINCT ON (mr.patient_id) {MEDICAL_RECORD_COLUMNS}
+                    FROM medical_records mr
+                    WHERE mr.patient_id = ANY(%s)
+                    {deleted_clause}
+                    ORDER BY mr.patient_id, mr.date DESC, mr.id DESC
+                """
+                cursor.execute(query, (patient_ids,))
+                return {row['patient_id']: row for row in cursor.fetchall()}
+            except Exception as e:
+                print(f"Error getting latest medical records: {e}")
+                return {}
+
+    def search_medical_records(self, query: str, doctor_id: int = None, patient_id: int = None,
+                               limit: int = 20, cursor: Optional[str] = None,
+                               from_date: str = None, to_date: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """Full-text search of diagnosis, treatment and notes, best matches first.
+
+        ``query`` takes web search syntax ("quoted phrases", or, -exclude).
+        ``doctor_id`` limits the search to that doctor's patients, i.e. the
+        ones with an appointment with them, whoever wrote the record. Rows
+        carry ``patient_name``, ``doctor_name``, ``rank`` and a ``snippet``:
+        HTML-escaped record text with the matched words wrapped in <b> tags.
+        Returns one page of ``limit`` rows and the cursor for the next page.
+        """
+        if not query or not query.strip():
+            return [], None
+        date_clause, date_params = self._date_range('mr.date', from_date, to_date)
+        matches = f"""
+            SELECT {MEDICAL_RECORD_COLUMNS},
+                   pu.name AS patient_name, du.name AS doctor_name,
+                   ts_rank(mr.search_vector, q)::float8 AS rank,
+                   ts_headline('simple', concat_ws(' / ', mr.diagnosis, mr.treatment, mr.notes), q,
+                               %s) AS snippet
+            FROM medical_records mr
+            CROSS JOIN websearch_to_tsquery('simple', %s) q
+            JOIN users pu ON mr.patient_id = pu.id
+            JOIN users du ON mr.doctor_id = du.id
+            WHERE mr.is_deleted = FALSE AND mr.search_vector @@ q
+            {date_clause}
+        """
+        params = [HEADLINE_OPTIONS, query.strip()] + date_params
+        if doctor_id:
+            matches += """ AND EXISTS (
+                SELECT 1 FROM appointments a
+                WHERE a.doctor_id = %s AND a.patient_id = mr.patient_id AND a.is_deleted = FALSE
+            )"""
+            params.append(doctor_id)
+        if patient_id:
+            matches += " AND mr.patient_id = %s"
+            params.append(patient_id)
+        try:
+            # Wrapped so the page keys can refer to the computed rank
+            rows, next_cursor = self._seek_page(
+                f"SELECT * FROM ({matches}) matches WHERE TRUE", params,
+                [('matches.rank', 'rank'), ('matches.id', 'id')], limit, cursor,
+                descending=True
+            )
+            for row in rows:
+                # The record text is whatever was typed in; only the
+                # highlights may come through as markup
+                row['snippet'] = (html.escape(row['snippet'] or '')
+                                  .replace('\x01', '<b>').replace('\x02', '</b>'))
+            return rows, next_cursor
+        except Exception as e:
+            print(f"Error searching medical records: {e}")
+            return [], None
+
     # Billing methods
     def get_patient_bills(self, patient_id: int, 
                         from_date: str = None, 
                         to_date: str = None, 
                         status: str = None,
-                        include_deleted: bool = False) -> List[Dict]:
+                        include_deleted: bool = False) -> List[Bill]:
         """Get filtered bills for a patient"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor() as cursor:
             try:
                 deleted_clause = "" if include_deleted else "AND b.is_deleted = FALSE"
                 query = f"""
@@ -529,213 +1165,348 @@ class HospitalDatabase:
                 
                 query += " ORDER BY b.date DESC"
                 cursor.execute(query, params)
-                return cursor.fetchall()
+                return Bill.from_cursor(cursor)
             except Exception as e:
                 print(f"Error getting patient bills: {e}")
                 return []
 
+    def _all_bills_query(self, include_deleted: bool = False) -> str:
+        deleted_clause = "" if include_deleted else "WHERE b.is_deleted = FALSE"
+        return f"""
+            SELECT b.*, u.name as patient_name, a.date as appointment_date
+            FROM billing b
+            JOIN patients p ON b.patient_id = p.user_id AND p.is_deleted = FALSE
+            JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
+            LEFT JOIN appointments a ON b.appointment_id = a.id AND a.is_deleted = FALSE
+            {deleted_clause}
+            ORDER BY b.date DESC
+        """
+
     def get_all_bills(self, include_deleted: bool = False) -> List[Dict]:
         """Get all bills"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                deleted_clause = "" if include_deleted else "WHERE b.is_deleted = FALSE"
-                query = f"""
-                    SELECT b.*, u.name as patient_name, a.date as appointment_date
-                    FROM billing b
-                    JOIN patients p ON b.patient_id = p.user_id AND p.is_deleted = FALSE
-                    JOIN users u ON p.user_id = u.id AND u.is_deleted = FALSE
-                    LEFT JOIN appointments a ON b.appointment_id = a.id AND a.is_deleted = FALSE
-                    {deleted_clause}
-                    ORDER BY b.date DESC
-                """
-                cursor.execute(query)
+                cursor.execute(self._all_bills_query(include_deleted))
                 return cursor.fetchall()
             except Exception as e:
                 print(f"Error getting all bills: {e}")
                 return []
 
+    def iter_all_bills(self, include_deleted: bool = False, itersize: int = None) -> Iterator[Dict]:
+        """Stream all bills without loading them into memory at once"""
+        yield from self._stream(self._all_bills_query(include_deleted), itersize=itersize)
+
     # Admin methods
+    def get_admin_kpis(self) -> Dict:
+        """Counters and revenue for the admin dashboard cards, in one statement"""
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT
+                        (SELECT COUNT(*)
+                         FROM users u
+                         JOIN doctors d ON u.id = d.user_id AND d.is_deleted = FALSE
+                         WHERE u.role = 'doctor' AND u.is_deleted = FALSE) AS total_doctors,
+                        (SELECT COUNT(*)
+                         FROM users u
+                         JOIN patients p ON u.id = p.user_id AND p.is_deleted = FALSE
+                         WHERE u.role = 'patient' AND u.is_deleted = FALSE) AS total_patients,
+                        appts.today_appointments,
+                        appts.today_completed,
+                        appts.today_cancelled,
+                        bills.monthly_revenue,
+                        bills.monthly_pending
+                    FROM (
+                        SELECT COUNT(*) AS today_appointments,
+                               COUNT(*) FILTER (WHERE status = 'completed') AS today_completed,
+                               COUNT(*) FILTER (WHERE status = 'cancelled') AS today_cancelled
+                        FROM appointments
+                        WHERE is_deleted = FALSE AND date = CURRENT_DATE
+                    ) appts,
+                    (
+                        SELECT COALESCE(SUM(amount), 0) AS monthly_revenue,
+                               COALESCE(SUM(amount) FILTER (WHERE status = 'pending'), 0) AS monthly_pending
+                        FROM billing
+                        WHERE is_deleted = FALSE
+                          AND date >= date_trunc('month', CURRENT_DATE)::date
+                          AND date < (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date
+                    ) bills
+                """)
+                return cursor.fetchone()
+        except Exception as e:
+            print(f"Error getting admin KPIs: {e}")
+            return {
+                'total_doctors': 0, 'total_patients': 0,
+                'today_appointments': 0, 'today_completed': 0, 'today_cancelled': 0,
+                'monthly_revenue': 0, 'monthly_pending': 0
+            }
+
     def get_all_patients(self, include_deleted: bool = False) -> List[Dict]:
         """Get all patients"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cached = self.cache.get_list('patient', include_deleted)
+        if cached is not None:
+            return cached
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                deleted_clause = "" if include_deleted else "WHERE u.is_deleted = FALSE AND p.is_deleted = FALSE"
-                query = f"""
-                    SELECT u.*, p.address, p.date_of_birth, p.blood_type, p.insurance
-                    FROM users u
-                    JOIN patients p ON u.id = p.user_id
-                    {deleted_clause} AND u.role = 'patient'
-                    
-                    ORDER BY u.name
-                """
-                cursor.execute(query)
-                return cursor.fetchall()
+                cursor.execute(self._all_patients_query(include_deleted))
+                patients = cursor.fetchall()
+                self.cache.put_list('patient', include_deleted, [dict(p) for p in patients])
+                return patients
             except Exception as e:
                 print(f"Error getting all patients: {e}")
                 return [] 
+
+    def _all_patients_query(self, include_deleted: bool = False, ordered: bool = True) -> str:
+        deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND p.is_deleted = FALSE"
+        order_clause = "ORDER BY u.name, u.id" if ordered else ""
+        return f"""
+            SELECT u.*, p.address, p.date_of_birth, p.blood_type, p.insurance
+            FROM users u
+            JOIN patients p ON u.id = p.user_id
+            WHERE u.role = 'patient'
+            {deleted_clause}
+            {order_clause}
+        """
+
+    def get_patients_page(self, page_size: int = 100, cursor: Optional[str] = None,
+                          include_deleted: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of patients ordered by name, and the cursor for the next page"""
+        try:
+            return self._seek_page(
+                self._all_patients_query(include_deleted, ordered=False), [],
+                [('u.name', 'name'), ('u.id', 'id')], page_size, cursor
+            )
+        except Exception as e:
+            print(f"Error getting patients page: {e}")
+            return [], None
+
+    def iter_all_patients(self, include_deleted: bool = False, itersize: int = None) -> Iterator[Dict]:
+        """Stream all patients without loading them into memory at once"""
+        yield from self._stream(self._all_patients_query(include_deleted), itersize=itersize)
     
     def get_all_doctors(self, include_deleted: bool = False) -> List[Dict]:
         """Get all doctors"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cached = self.cache.get_list('doctor', include_deleted)
+        if cached is not None:
+            return cached
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND d.is_deleted = FALSE"
-                query = f"""
-                    SELECT u.*, d.specialization, d.department, d.from_time, until_time
-                    FROM users u
-                    JOIN doctors d ON u.id = d.user_id
-                    WHERE u.role = 'doctor'
-                    {deleted_clause}
-                    ORDER BY u.name
-                """
-                cursor.execute(query)
-                return cursor.fetchall()
+                cursor.execute(self._all_doctors_query(include_deleted))
+                doctors = cursor.fetchall()
+                self.cache.put_list('doctor', include_deleted, [dict(d) for d in doctors])
+                return doctors
             except Exception as e:
                 print(f"Error getting all doctors: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return []
 
+    def _all_doctors_query(self, include_deleted: bool = False) -> str:
+        deleted_clause = "" if include_deleted else "AND u.is_deleted = FALSE AND d.is_deleted = FALSE"
+        return f"""
+            SELECT u.*, d.specialization, d.department, d.from_time, d.until_time
+            FROM users u
+            JOIN doctors d ON u.id = d.user_id
+            WHERE u.role = 'doctor'
+            {deleted_clause}
+            ORDER BY u.name
+        """
+
+    def iter_all_doctors(self, include_deleted: bool = False, itersize: int = None) -> Iterator[Dict]:
+        """Stream all doctors without loading them into memory at once"""
+        yield from self._stream(self._all_doctors_query(include_deleted), itersize=itersize)
+
 
     def get_all_appointments(self, include_deleted: bool = False) -> List[Dict]:
-        """Get all appointments"""        
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            query = """
-                UPDATE appointments
-                SET status = 'no-show'
-                WHERE date < CURRENT_DATE
-                AND status = 'scheduled'
-                AND is_deleted = FALSE;
-            """
-            cursor.execute(query)
+        """Get all appointments"""
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                deleted_clause = "" if include_deleted else "WHERE a.is_deleted = FALSE"
-                query = f"""
-                    SELECT a.*, 
-                           u1.name as patient_name, 
-                           u2.name as doctor_name
-                    FROM appointments a
-                    JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
-                    JOIN users u1 ON p.user_id = u1.id AND u1.is_deleted = FALSE
-                    JOIN doctors d ON a.doctor_id = d.user_id AND d.is_deleted = FALSE
-                    JOIN users u2 ON d.user_id = u2.id AND u2.is_deleted = FALSE
-                    {deleted_clause}
-                    ORDER BY a.date DESC, a.time DESC
-                """
-                cursor.execute(query)
+                cursor.execute(self._all_appointments_query(include_deleted))
                 return cursor.fetchall()
             except Exception as e:
                 print(f"Error getting all appointments: {e}")
                 return []
+
+    def _all_appointments_query(self, include_deleted: bool = False) -> str:
+        deleted_clause = "" if include_deleted else "WHERE a.is_deleted = FALSE"
+        return f"""
+            SELECT a.*, 
+                   u1.name as patient_name, 
+                   u2.name as doctor_name
+            FROM appointment_view a
+            JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
+            JOIN users u1 ON p.user_id = u1.id AND u1.is_deleted = FALSE
+            JOIN doctors d ON a.doctor_id = d.user_id AND d.is_deleted = FALSE
+            JOIN users u2 ON d.user_id = u2.id AND u2.is_deleted = FALSE
+            {deleted_clause}
+            ORDER BY a.date DESC, a.time DESC
+        """
+
+    def iter_all_appointments(self, include_deleted: bool = False, itersize: int = None) -> Iterator[Dict]:
+        """Stream all appointments without loading them into memory at once"""
+        yield from self._stream(self._all_appointments_query(include_deleted), itersize=itersize)
                 
+    def _appointments_details_query(self, filters=None) -> Tuple[str, List]:
+        """Build the unordered appointment listing query and its parameters"""
+        filters = filters or {}
+        query = """
+            SELECT 
+                a.id, a.date, a.time, a.reason, a.status,
+                p.user_id as patient_id, u1.name as patient_name,
+                d.user_id as doctor_id, u2.name as doctor_name
+            FROM appointment_view a
+            JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
+            JOIN users u1 ON p.user_id = u1.id AND u1.is_deleted = FALSE
+            JOIN doctors d ON a.doctor_id = d.user_id AND d.is_deleted = FALSE
+            JOIN users u2 ON d.user_id = u2.id AND u2.is_deleted = FALSE
+            WHERE a.is_deleted = FALSE
+        """
+        
+        conditions = []
+        params = []
+        
+        if filters.get('patient_name'):
+            condition, condition_params = self._name_match('u1', filters['patient_name'])
+            conditions.append(condition)
+            params.extend(condition_params)
+            
+        if filters.get('doctor_name'):
+            condition, condition_params = self._name_match('u2', filters['doctor_name'])
+            conditions.append(condition)
+            params.extend(condition_params)
+            
+        if filters.get('date'):
+            conditions.append("a.date = %s")
+            params.append(filters['date'])
+            
+        if filters.get('id'):
+            conditions.append("a.id = %s")
+            params.append(filters['id'])
+
+        if filters.get('ids'):
+            conditions.append("a.id = ANY(%s)")
+            params.append(list(filters['ids']))
+            
+        if conditions:
+            query += " AND " + " AND ".join(conditions)
+        return query, params
+
     def get_appointments_with_details(self, filters=None):
         """Get appointments with patient and doctor names"""
-        filters = filters or {}
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                query = """
-                    SELECT 
-                        a.id, a.date, a.time, a.reason, a.status,
-                        p.user_id as patient_id, u1.name as patient_name,
-                        d.user_id as doctor_id, u2.name as doctor_name
-                    FROM appointments a
-                    JOIN patients p ON a.patient_id = p.user_id AND p.is_deleted = FALSE
-                    JOIN users u1 ON p.user_id = u1.id AND u1.is_deleted = FALSE
-                    JOIN doctors d ON a.doctor_id = d.user_id AND d.is_deleted = FALSE
-                    JOIN users u2 ON d.user_id = u2.id AND u2.is_deleted = FALSE
-                    WHERE a.is_deleted = FALSE
-                """
-                
-                conditions = []
-                params = []
-                
-                if filters.get('patient_name'):
-                    conditions.append("u1.name ILIKE %s")
-                    params.append(f"%{filters['patient_name']}%")
-                    
-                if filters.get('doctor_name'):
-                    conditions.append("u2.name ILIKE %s")
-                    params.append(f"%{filters['doctor_name']}%")
-                    
-                if filters.get('date'):
-                    conditions.append("a.date = %s")
-                    params.append(filters['date'])
-                    
-                if conditions:
-                    query += " AND " + " AND ".join(conditions)
-                    
-                query += " ORDER BY a.date DESC, a.time DESC"
+            with self._cursor(RealDictCursor) as cursor:
+                query, params = self._appointments_details_query(filters)
+                query += " ORDER BY a.date DESC, a.time DESC, a.id DESC"
                 cursor.execute(query, params)
                 return cursor.fetchall()
         except Exception as e:
             print(f"Error getting appointments: {e}")
             return []
 
-    def update_appointment_status(self, appointment_id, status):
-        """Update appointment status"""
+    def get_appointments_page(self, filters=None, page_size: int = 100,
+                              cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of appointments, newest first, and the cursor for the next page"""
         try:
-            with self.conn.cursor() as cursor:
-                query = """
-                    UPDATE appointments 
-                    SET status = %s
-                    WHERE id = %s
-                """
-                cursor.execute(query, (status, appointment_id))
-                self.conn.commit()
-                return True
+            query, params = self._appointments_details_query(filters)
+            return self._seek_page(
+                query, params,
+                [('a.date', 'date'), ('a.time', 'time'), ('a.id', 'id')],
+                page_size, cursor, descending=True
+            )
         except Exception as e:
-            print(f"Error updating appointment status: {e}")
-            self.conn.rollback()
-            return False
+            print(f"Error getting appointments page: {e}")
+            return [], None
+
+    def get_appointment_with_details(self, appointment_id: int) -> Optional[Dict]:
+        """Get a single appointment with patient and doctor names"""
+        appointments = self.get_appointments_with_details({'id': appointment_id})
+        return appointments[0] if appointments else None
+
+    def _billing_details_query(self, filters=None) -> Tuple[str, List]:
+        """Build the unordered billing listing query and its parameters"""
+        filters = filters or {}
+        query = """
+            SELECT 
+                b.id, b.amount, b.date, b.status, 
+                b.payment_method, b.payment_date, b.appointment_id,
+                u.name as patient_name
+            FROM billing b
+            JOIN patients p ON b.patient_id = p.user_id
+            JOIN users u ON p.user_id = u.id
+            WHERE b.is_deleted = FALSE
+        """
+        
+        conditions = []
+        params = []
+        
+        if filters.get('patient_name'):
+            condition, condition_params = self._name_match('u', filters['patient_name'])
+            conditions.append(condition)
+            params.extend(condition_params)
+            
+        if filters.get('date_from'):
+            conditions.append("b.date >= %s")
+            params.append(filters['date_from'])
+            
+        if filters.get('date_to'):
+            conditions.append("b.date <= %s")
+            params.append(filters['date_to'])
+            
+        if filters.get('status'):
+            conditions.append("b.status = %s")
+            params.append(filters['status'])
+            
+        if conditions:
+            query += " AND " + " AND ".join(conditions)
+        return query, params
 
     def get_billing_with_details(self, filters=None):
         """Get billing records with patient names"""
-        filters = filters or {}
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                query = """
-                    SELECT 
-                        b.id, b.amount, b.date, b.status, 
-                        b.payment_method, b.payment_date, b.appointment_id,
-                        u.name as patient_name
-                    FROM billing b
-                    JOIN patients p ON b.patient_id = p.user_id
-                    JOIN users u ON p.user_id = u.id
-                    WHERE b.is_deleted = FALSE
-                """
-                
-                conditions = []
-                params = []
-                
-                if filters.get('patient_name'):
-                    conditions.append("u.name ILIKE %s")
-                    params.append(f"%{filters['patient_name']}%")
-                    
-                if filters.get('date_from'):
-                    conditions.append("b.date >= %s")
-                    params.append(filters['date_from'])
-                    
-                if filters.get('date_to'):
-                    conditions.append("b.date <= %s")
-                    params.append(filters['date_to'])
-                    
-                if filters.get('status'):
-                    conditions.append("b.status = %s")
-                    params.append(filters['status'])
-                    
-                if conditions:
-                    query += " AND " + " AND ".join(conditions)
-                    
-                query += " ORDER BY b.date DESC"
+            with self._cursor(RealDictCursor) as cursor:
+                query, params = self._billing_details_query(filters)
+                query += " ORDER BY b.date DESC, b.id DESC"
                 cursor.execute(query, params)
                 return cursor.fetchall()
         except Exception as e:
             print(f"Error getting billing records: {e}")
             return []
 
+    def get_billing_summary(self, filters=None) -> Dict:
+        """Get total, paid and pending amounts for the bills matching ``filters``"""
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                query, params = self._billing_details_query(filters)
+                cursor.execute(f"""
+                    SELECT
+                        COALESCE(SUM(amount), 0) AS total,
+                        COALESCE(SUM(amount) FILTER (WHERE status = 'paid'), 0) AS paid,
+                        COALESCE(SUM(amount) FILTER (WHERE status = 'pending'), 0) AS pending,
+                        COUNT(*) AS count
+                    FROM ({query}) b
+                """, params)
+                return cursor.fetchone()
+        except Exception as e:
+            print(f"Error getting billing summary: {e}")
+            return {'total': 0, 'paid': 0, 'pending': 0, 'count': 0}
+
+    def get_billing_page(self, filters=None, page_size: int = 100,
+                         cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of billing records, newest first, and the cursor for the next page"""
+        try:
+            query, params = self._billing_details_query(filters)
+            return self._seek_page(
+                query, params, [('b.date', 'date'), ('b.id', 'id')],
+                page_size, cursor, descending=True
+            )
+        except Exception as e:
+            print(f"Error getting billing page: {e}")
+            return [], None
+
 
     def update_billing_status(self, billing_id, status):
         """Update billing status"""
         try:
-            with self.conn.cursor() as cursor:
+            with self._cursor() as cursor:
                 query = """
                     UPDATE billing 
                     SET status = %s,
@@ -743,57 +1514,397 @@ class HospitalDatabase:
                     WHERE id = %s
                 """
                 cursor.execute(query, (status, status, billing_id))
-                self.conn.commit()
+                cursor.connection.commit()
                 return True
         except Exception as e:
             print(f"Error updating billing status: {e}")
-            self.conn.rollback()
             return False
 
 
     def get_booked_times(self, doctor_id: int, date: str) -> List[str]:
         """Get booked time slots for a doctor on specific date"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
-                query = """
-                    SELECT time::text as time
-                    FROM appointments
-                    WHERE doctor_id = %s AND date = %s AND is_deleted = FALSE
-                    ORDER BY time
-                """
-                cursor.execute(query, (doctor_id, date))
+                self._execute_prepared(cursor, 'booked_times', (doctor_id, date))
                 return [row[0][:5] for row in cursor.fetchall()]  # Extract HH:MM format
             except Exception as e:
                 print(f"Error getting booked times: {e}")
                 return []
 
+    def get_availability(self, doctor_id: int, from_date, to_date,
+                         now: datetime = None) -> Dict:
+        """Free appointment slots of a doctor for every day in a date range.
+
+        Reads the slots inventory (see extend_slot_horizon()), skipping
+        slots before ``now`` (the client's clock by default). Returns
+        ``{date: [time, ...]}`` with an entry, possibly empty, for each day,
+        or an empty dict if the doctor doesn't exist.
+        """
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT day::date,
+                           COALESCE(array_agg(s.start_ts::time ORDER BY s.start_ts)
+                                    FILTER (WHERE s.start_ts IS NOT NULL), '{}') AS slots
+                    FROM doctors d
+                    CROSS JOIN generate_series(%(from_date)s::date, %(to_date)s::date,
+                                               INTERVAL '1 day') AS day
+                    LEFT JOIN slots s
+                        ON s.doctor_id = d.user_id
+                       AND s.start_ts >= day::date AND s.start_ts < day::date + 1
+                       AND s.start_ts > %(now)s
+                       AND s.status = 'free'
+                    WHERE d.user_id = %(doctor_id)s AND d.is_deleted = FALSE
+                    GROUP BY day
+                    ORDER BY day
+                """, {
+                    'doctor_id': doctor_id,
+                    'from_date': from_date,
+                    'to_date': to_date,
+                    'now': now or datetime.now(),
+                })
+                return {day: slots for day, slots in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting availability: {e}")
+            return {}
+
+    def find_earliest_slots(self, specialization: str = None, department: str = None,
+                            after: datetime = None, limit: int = 10,
+                            plan: str = None) -> List[Dict]:
+        """The next ``limit`` free slots across all matching doctors, earliest first.
+
+        Two plans give the same rows. 'scan' walks idx_slots_free_start in
+        time order across everyone and stops after ``limit`` slots of
+        matching doctors; it is cheapest when most doctors match. 'per_doctor'
+        reads each matching doctor's first ``limit`` slots off idx_slots_free
+        and merges them, so a narrow filter never steps over other doctors'
+        slots. By default an unfiltered search scans and a filtered one goes
+        per doctor. Free slots start after ``after``, the client's clock by
+        default. Rows carry doctor_id, doctor_name, specialization,
+        department and start_ts.
+        """
+        if plan is None:
+            plan = 'per_doctor' if specialization or department else 'scan'
+        if plan == 'scan':
+            query = """
+                SELECT d.user_id AS doctor_id, u.name AS doctor_name,
+                       d.specialization, d.department, s.start_ts
+                FROM slots s
+                JOIN doctors d ON d.user_id = s.doctor_id AND d.is_deleted = FALSE
+                JOIN users u ON u.id = d.user_id AND u.is_deleted = FALSE
+                WHERE s.status = 'free'
+                  AND s.start_ts > %(after)s
+                  AND (%(specialization)s::text IS NULL OR d.specialization = %(specialization)s)
+                  AND (%(department)s::text IS NULL OR d.department = %(department)s)
+                ORDER BY s.start_ts, s.doctor_id
+                LIMIT %(limit)s
+            """
+        elif plan == 'per_doctor':
+            query = """
+                SELECT d.user_id AS doctor_id, u.name AS doctor_name,
+                       d.specialization, d.department, s.start_ts
+                FROM doctors d
+                JOIN users u ON u.id = d.user_id AND u.is_deleted = FALSE
+                CROSS JOIN LATERAL (
+                    SELECT start_ts FROM slots
+                    WHERE slots.doctor_id = d.user_id
+                      AND slots.status = 'free'
+                      AND slots.start_ts > %(after)s
+                    ORDER BY start_ts
+                    LIMIT %(limit)s
+                ) s
+                WHERE d.is_deleted = FALSE
+                  AND (%(specialization)s::text IS NULL OR d.specialization = %(specialization)s)
+                  AND (%(department)s::text IS NULL OR d.department = %(department)s)
+                ORDER BY s.start_ts, d.user_id
+                LIMIT %(limit)s
+            """
+        else:
+            raise ValueError(f"Unknown earliest-slot plan {plan!r}")
+        with self._cursor(RealDictCursor) as cursor:
+            try:
+                cursor.execute(query, {
+                    'specialization': specialization,
+                    'department': department,
+                    'after': after or datetime.now(),
+                    'limit': limit,
+                })
+                return cursor.fetchall()
+            except Exception as e:
+                print(f"Error finding earliest slots: {e}")
+                return []
+
     def get_all_prescriptions(self, include_deleted: bool = False) -> List[Dict]:
         """Get all prescriptions"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                deleted_clause = "" if include_deleted else "WHERE p.is_deleted = FALSE"
-                query = f"""
-                    SELECT p.*, 
-                           u1.name as patient_name, 
+                cursor.execute(self._all_prescriptions_query(include_deleted))
+                return cursor.fetchall()
+            except Exception as e:
+                print(f"Error getting all prescriptions: {e}")
+                return []
+
+    def _all_prescriptions_query(self, include_deleted: bool = False) -> str:
+        deleted_clause = "" if include_deleted else "WHERE p.is_deleted = FALSE"
+        return f"""
+            SELECT p.*, 
+                   u1.name as patient_name, 
+                   u2.name as doctor_name
+            FROM prescriptions p
+            JOIN patients pt ON p.patient_id = pt.user_id AND pt.is_deleted = FALSE
+            JOIN users u1 ON pt.user_id = u1.id AND u1.is_deleted = FALSE
+            JOIN doctors d ON p.doctor_id = d.user_id AND d.is_deleted = FALSE
+            JOIN users u2 ON d.user_id = u2.id AND u2.is_deleted = FALSE
+            {deleted_clause}
+            ORDER BY p.date DESC
+        """
+
+    def iter_all_prescriptions(self, include_deleted: bool = False, itersize: int = None) -> Iterator[Dict]:
+        """Stream all prescriptions without loading them into memory at once"""
+        yield from self._stream(self._all_prescriptions_query(include_deleted), itersize=itersize)
+
+    # Report methods
+    @staticmethod
+    def _date_range(column: str, from_date=None, to_date=None) -> Tuple[str, List]:
+        """SQL conditions (each starting with AND) limiting ``column`` to a date range"""
+        clause, params = "", []
+        if from_date:
+            clause += f" AND {column} >= %s"
+            params.append(from_date)
+        if to_date:
+            clause += f" AND {column} <= %s"
+            params.append(to_date)
+        return clause, params
+
+    def get_patient_report(self, from_date=None, to_date=None) -> List[Dict]:
+        """Age, appointment count and last visit per patient within a date range"""
+        date_clause, params = self._date_range('a.date', from_date, to_date)
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT u.id, u.name, p.date_of_birth,
+                           EXTRACT(YEAR FROM age(p.date_of_birth))::int AS age,
+                           COUNT(a.id) AS appointments,
+                           MAX(a.date) AS last_visit
+                    FROM users u
+                    JOIN patients p ON u.id = p.user_id AND p.is_deleted = FALSE
+                    LEFT JOIN appointments a ON a.patient_id = u.id AND a.is_deleted = FALSE
+                        {date_clause}
+                    WHERE u.role = 'patient' AND u.is_deleted = FALSE
+                    GROUP BY u.id, u.name, p.date_of_birth
+                    ORDER BY u.name, u.id
+                """, params)
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting patient report: {e}")
+            return []
+
+    def get_doctor_report(self, from_date=None, to_date=None) -> List[Dict]:
+        """Appointment, completed and cancelled counts per doctor within a date range.
+
+        Read from the report_doctor_daily snapshot, see refresh_report_views().
+        """
+        date_clause, params = self._date_range('r.date', from_date, to_date)
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT u.id, u.name, d.specialization,
+                           COALESCE(SUM(r.count), 0) AS appointments,
+                           COALESCE(SUM(r.count) FILTER (WHERE r.status = 'completed'), 0) AS completed,
+                           COALESCE(SUM(r.count) FILTER (WHERE r.status = 'cancelled'), 0) AS cancelled,
+                           COALESCE(ROUND(100.0 * SUM(r.count) FILTER (WHERE r.status = 'completed')
+                                          / NULLIF(SUM(r.count), 0), 1), 0) AS completion_rate
+                    FROM users u
+                    JOIN doctors d ON u.id = d.user_id AND d.is_deleted = FALSE
+                    LEFT JOIN report_doctor_daily r ON r.doctor_id = u.id
+                        {date_clause}
+                    WHERE u.role = 'doctor' AND u.is_deleted = FALSE
+                    GROUP BY u.id, u.name, d.specialization
+                    ORDER BY u.name, u.id
+                """, params)
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting doctor report: {e}")
+            return []
+
+    def get_prescriptions_in_range(self, from_date=None, to_date=None) -> List[Dict]:
+        """Get prescriptions written within a date range, newest first"""
+        date_clause, params = self._date_range('p.date', from_date, to_date)
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT p.*,
+                           u1.name as patient_name,
                            u2.name as doctor_name
                     FROM prescriptions p
                     JOIN patients pt ON p.patient_id = pt.user_id AND pt.is_deleted = FALSE
                     JOIN users u1 ON pt.user_id = u1.id AND u1.is_deleted = FALSE
                     JOIN doctors d ON p.doctor_id = d.user_id AND d.is_deleted = FALSE
                     JOIN users u2 ON d.user_id = u2.id AND u2.is_deleted = FALSE
-                    {deleted_clause}
-                    ORDER BY p.date DESC
-                """
-                cursor.execute(query)
+                    WHERE p.is_deleted = FALSE {date_clause}
+                    ORDER BY p.date DESC, p.id DESC
+                """, params)
                 return cursor.fetchall()
-            except Exception as e:
-                print(f"Error getting all prescriptions: {e}")
-                return []
+        except Exception as e:
+            print(f"Error getting prescriptions in range: {e}")
+            return []
+
+    def get_top_medications(self, from_date=None, to_date=None, limit: int = 3) -> List[Dict]:
+        """Most prescribed medications within a date range, from the report_medication_daily snapshot"""
+        date_clause, params = self._date_range('date', from_date, to_date)
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT medication, SUM(count) AS count
+                    FROM report_medication_daily
+                    WHERE TRUE {date_clause}
+                    GROUP BY medication
+                    ORDER BY count DESC, medication
+                    LIMIT %s
+                """, params + [limit])
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting top medications: {e}")
+            return []
+
+    def get_revenue_summary(self, from_date=None, to_date=None) -> Dict:
+        """Total, paid and pending amounts within a date range, from the report_revenue_daily snapshot"""
+        date_clause, params = self._date_range('date', from_date, to_date)
+        try:
+            with self._cursor(RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT COALESCE(SUM(amount), 0) AS total,
+                           COALESCE(SUM(amount) FILTER (WHERE status = 'paid'), 0) AS paid,
+                           COALESCE(SUM(amount) FILTER (WHERE status = 'pending'), 0) AS pending,
+                           COALESCE(SUM(count), 0) AS count
+                    FROM report_revenue_daily
+                    WHERE TRUE {date_clause}
+                """, params)
+                return cursor.fetchone()
+        except Exception as e:
+            print(f"Error getting revenue summary: {e}")
+            return {'total': 0, 'paid': 0, 'pending': 0, 'count': 0}
+
+    def refresh_report_views(self, force: bool = False) -> bool:
+        """Refresh the materialized report views if their snapshot is stale.
+
+        The snapshot is left alone while it is younger than
+        ``report_max_age`` seconds unless ``force`` is set. Refreshes run
+        CONCURRENTLY, so reports keep reading the old snapshot meanwhile,
+        and an advisory lock makes other clients skip instead of queueing
+        up behind the one already refreshing. Returns True if it refreshed.
+        """
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (REPORT_REFRESH_LOCK,))
+                if not cursor.fetchone()[0]:
+                    return False
+
+                if not force:
+                    cursor.execute("""
+                        SELECT COUNT(*) = %s AND MIN(refreshed_at) > NOW() - make_interval(secs => %s)
+                        FROM report_snapshots
+                        WHERE view_name = ANY(%s)
+                    """, (len(REPORT_VIEWS), self.report_max_age, list(REPORT_VIEWS)))
+                    if cursor.fetchone()[0]:
+                        return False
+
+                # A refresh can outlast the pool's statement timeout
+                cursor.execute("SET LOCAL statement_timeout = 0")
+                for view in REPORT_VIEWS:
+                    cursor.execute(
+                        sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(view))
+                    )
+                    cursor.execute("""
+                        INSERT INTO report_snapshots (view_name, refreshed_at)
+                        VALUES (%s, NOW())
+                        ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+                    """, (view,))
+                cursor.connection.commit()
+                return True
+        except Exception as e:
+            print(f"Error refreshing report views: {e}")
+            return False
+
+    def fetch_columns(self, query: str, params, columns) -> Dict:
+        """Run ``query`` and return its result as one NumPy array per column.
+
+        ``columns`` lists the ``(name, kind)`` pairs to return from the
+        query's output; see db_columnar for the kinds. Needs NumPy.
+        """
+        select, select_params = column_select(columns)
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(f"SELECT {select} FROM ({query}) q", select_params + list(params))
+                return to_arrays(cursor.fetchall(), columns)
+        except Exception as e:
+            print(f"Error fetching columns: {e}")
+            return to_arrays([], columns)
+
+    def get_patient_columns(self) -> Dict:
+        """Active patients as columns: id, name, date_of_birth"""
+        return self.fetch_columns("""
+            SELECT u.id, u.name, p.date_of_birth
+            FROM users u
+            JOIN patients p ON u.id = p.user_id AND p.is_deleted = FALSE
+            WHERE u.role = 'patient' AND u.is_deleted = FALSE
+            ORDER BY u.name, u.id
+        """, [], [('id', 'int'), ('name', 'text'), ('date_of_birth', 'date')])
+
+    def get_doctor_columns(self) -> Dict:
+        """Active doctors as columns: id, name, specialization"""
+        return self.fetch_columns("""
+            SELECT u.id, u.name, d.specialization
+            FROM users u
+            JOIN doctors d ON u.id = d.user_id AND d.is_deleted = FALSE
+            WHERE u.role = 'doctor' AND u.is_deleted = FALSE
+            ORDER BY u.name, u.id
+        """, [], [('id', 'int'), ('name', 'text'), ('specialization', 'text')])
+
+    def get_appointment_columns(self, from_date=None, to_date=None) -> Dict:
+        """Appointments within a date range as columns: patient_id, doctor_id, date, status"""
+        date_clause, params = self._date_range('a.date', from_date, to_date)
+        return self.fetch_columns(f"""
+            SELECT a.patient_id, a.doctor_id, a.date, a.status
+            FROM appointment_view a
+            WHERE a.is_deleted = FALSE {date_clause}
+        """, params, [('patient_id', 'int'), ('doctor_id', 'int'), ('date', 'date'),
+                      ('status', APPOINTMENT_STATUSES)])
+
+    def get_bill_columns(self, from_date=None, to_date=None) -> Dict:
+        """Bills within a date range as columns: date, amount (cents), status"""
+        date_clause, params = self._date_range('b.date', from_date, to_date)
+        return self.fetch_columns(f"""
+            SELECT b.date, b.amount, b.status
+            FROM billing b
+            WHERE b.is_deleted = FALSE {date_clause}
+        """, params, [('date', 'date'), ('amount', 'cents'), ('status', BILL_STATUSES)])
+
+    def get_prescription_columns(self, from_date=None, to_date=None) -> Dict:
+        """Prescriptions within a date range as columns: date, medication (codes), status"""
+        date_clause, params = self._date_range('p.date', from_date, to_date)
+        return self.fetch_columns(f"""
+            SELECT p.date, p.medication, p.status
+            FROM prescriptions p
+            WHERE p.is_deleted = FALSE {date_clause}
+        """, params, [('date', 'date'), ('medication', 'label'), ('status', PRESCRIPTION_STATUSES)])
+
+    def get_report_freshness(self) -> Optional[datetime]:
+        """When the oldest report view was last refreshed (None if never)"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT MIN(refreshed_at) FROM report_snapshots WHERE view_name = ANY(%s)
+                """, (list(REPORT_VIEWS),))
+                return cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error getting report freshness: {e}")
+            return None
 
     def get_last_doctors(self) -> List[Dict]:
         """Get last add doctors"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self._cursor(RealDictCursor) as cursor:
                 query = """
                     SELECT 
                         name,
@@ -816,7 +1927,7 @@ class HospitalDatabase:
     def get_last_patients(self) -> List[Dict]:
         """Get last add patients"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self._cursor(RealDictCursor) as cursor:
                 query = """
                     SELECT 
                         name,
@@ -839,7 +1950,7 @@ class HospitalDatabase:
     def get_last_appointments(self) -> List[Dict]:
         """Get last add appointments"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self._cursor(RealDictCursor) as cursor:
                 query = """
                     SELECT
                         u1.name AS patient_name,
@@ -851,12 +1962,12 @@ class HospitalDatabase:
                         DATE(a.created_at) AS creation_date,
                         CAST(a.created_at AS TIME) AS creation_time
                     FROM
-                        appointments a
+                        appointment_view a
                     JOIN users u1 ON a.patient_id = u1.id
                     JOIN users u2 ON a.doctor_id = u2.id
                     WHERE
                         a.is_deleted = FALSE
-                        AND DATE(a.created_at) >= CURRENT_DATE - INTERVAL '7 days'
+                        AND a.created_at >= CURRENT_DATE - INTERVAL '7 days'
                     ORDER BY
                         a.date DESC, a.time DESC;
                 """
@@ -869,7 +1980,7 @@ class HospitalDatabase:
     def get_last_bills(self) -> List[Dict]:
         """Get last add bills"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self._cursor(RealDictCursor) as cursor:
                 query = """
                     SELECT
                         u.name AS patient_name,
@@ -892,7 +2003,7 @@ class HospitalDatabase:
     def add_patient(self, patient_data: Dict) -> Optional[Dict]:
         """Add a new patient to the database"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self._cursor(RealDictCursor) as cursor:
                 # First insert the user record
                 user_query = """
                     INSERT INTO users 
@@ -925,7 +2036,8 @@ class HospitalDatabase:
                 
                 # Get the complete patient record
                 result = cursor.fetchone()
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('patient', user_id)
                 
                 # Combine user and patient data
                 combined = {
@@ -937,13 +2049,12 @@ class HospitalDatabase:
                 
         except Exception as e:
             print(f"Error adding patient: {e}")
-            self.conn.rollback()
             return None
 
     def add_doctor(self, doctor_data: Dict) -> Optional[Dict]:
         """Add a new doctor to the database"""
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self._cursor(RealDictCursor) as cursor:
                 # First insert the user record
                 user_query = """
                     INSERT INTO users 
@@ -976,7 +2087,10 @@ class HospitalDatabase:
                 
                 # Get the complete doctor record
                 result = cursor.fetchone()
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('doctor', user_id)
+                # Bookable right away rather than after the nightly job
+                self.extend_slot_horizon(doctor_id=user_id)
                 
                 # Combine user and doctor data
                 combined = {
@@ -988,13 +2102,18 @@ class HospitalDatabase:
                 
         except Exception as e:
             print(f"Error adding doctor: {e}")
-            self.conn.rollback()
             return None
   
     # Add new records
     def add_appointment(self, appointment: Dict) -> Dict:
-        """Add new appointment"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        """Add new appointment, claiming its slot in the slots inventory.
+
+        Raises BookingConflict if the doctor is already booked at that time,
+        whether a concurrent client claimed the slot first or the time has
+        no slot (past the horizon, outside working hours) and the unique
+        index on active appointments catches it. Other errors return None.
+        """
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     INSERT INTO appointments 
@@ -1011,16 +2130,73 @@ class HospitalDatabase:
                     appointment.get('status', 'scheduled')
                 ))
                 result = cursor.fetchone()
-                self.conn.commit()
+                if result['status'] != 'cancelled':
+                    self._claim_slot(cursor, result)
+                cursor.connection.commit()
                 return result
+            except BookingConflict:
+                cursor.connection.rollback()
+                raise
             except Exception as e:
+                cursor.connection.rollback()
+                if self._is_slot_conflict(e):
+                    raise BookingConflict("doctor already booked at that time") from e
                 print(f"Error adding appointment: {e}")
-                self.conn.rollback()
                 return None
 
+    def _claim_slot(self, cursor, appointment):
+        """Mark ``appointment``'s slot booked, in the caller's transaction.
+
+        ``cursor`` must be a RealDictCursor.
+
+        Times without a slot in the inventory are left to the unique index
+        on active appointments. Raises BookingConflict if the slot belongs
+        to another appointment.
+        """
+        cursor.execute("""
+            WITH claimed AS (
+                UPDATE slots
+                SET status = 'booked', appointment_id = %(id)s
+                WHERE doctor_id = %(doctor_id)s
+                  AND start_ts = %(date)s::date + %(time)s::time
+                  AND (status = 'free' OR appointment_id = %(id)s)
+                RETURNING 1
+            )
+            SELECT EXISTS (SELECT 1 FROM claimed)
+                OR NOT EXISTS (
+                    SELECT 1 FROM slots
+                    WHERE doctor_id = %(doctor_id)s
+                      AND start_ts = %(date)s::date + %(time)s::time
+                ) AS ok
+        """, {
+            'id': appointment['id'],
+            'doctor_id': appointment['doctor_id'],
+            'date': appointment['date'],
+            'time': appointment['time'],
+        })
+        if not cursor.fetchone()['ok']:
+            raise BookingConflict("slot already booked")
+
+    @staticmethod
+    def _is_slot_conflict(error) -> bool:
+        """Whether ``error`` is the unique index on active appointments firing"""
+        return (isinstance(error, errors.UniqueViolation)
+                and error.diag.constraint_name == 'appointments_doctor_slot_key')
+
+    def book_slot(self, patient_id: int, doctor_id: int, start_ts: datetime,
+                  reason: str) -> Optional[Dict]:
+        """Book the slot starting at ``start_ts``; see add_appointment()"""
+        return self.add_appointment({
+            'patient_id': patient_id,
+            'doctor_id': doctor_id,
+            'date': start_ts.date(),
+            'time': start_ts.time(),
+            'reason': reason,
+        })
+
     def add_prescription(self, prescription: Dict) -> Dict:
         """Add new prescription"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     INSERT INTO prescriptions 
@@ -1039,16 +2215,16 @@ class HospitalDatabase:
                     prescription.get('notes', '')
                 ))
                 result = cursor.fetchone()
-                self.conn.commit()
+                cursor.connection.commit()
                 return result
             except Exception as e:
                 print(f"Error adding prescription: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return None
 
     def add_medical_record(self, record: Dict) -> Dict:
         """Add new medical record"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     INSERT INTO medical_records 
@@ -1065,16 +2241,16 @@ class HospitalDatabase:
                     record.get('notes', '')
                 ))
                 result = cursor.fetchone()
-                self.conn.commit()
+                cursor.connection.commit()
                 return result
             except Exception as e:
                 print(f"Error adding medical record: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return None
 
     def update_doctor_data(self, user_id: int, data: Dict) -> Optional[Dict]:
         """Update user and doctor fields dynamically based on input dict."""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 # Split fields into user and doctor
                 user_fields = {
@@ -1112,7 +2288,8 @@ class HospitalDatabase:
                 if doctor_update_sql:
                     cursor.execute(doctor_update_sql, doctor_params)
 
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('doctor', user_id)
 
                 # Fetch final result including doctor fields
                 cursor.execute("""
@@ -1127,12 +2304,12 @@ class HospitalDatabase:
 
             except Exception as e:
                 print(f"Error updating user/doctor: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return None
     
     def update_patient_data(self, user_id: int, data: Dict) -> Optional[Dict]:
         """Update user and patient fields dynamically based on input dict."""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 # Split fields
                 user_fields = {
@@ -1172,7 +2349,8 @@ class HospitalDatabase:
                 if patient_update_sql:
                     cursor.execute(patient_update_sql, patient_params)
 
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('patient', user_id)
 
                 # Fetch final result including patient fields
                 cursor.execute("""
@@ -1187,11 +2365,11 @@ class HospitalDatabase:
 
             except Exception as e:
                 print(f"Error updating user/patient: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return None
     def update_admin_data(self, user_id: int, data: Dict) -> Optional[Dict]:
         """Update user and admin fields dynamically based on input dict."""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 # Split fields
                 user_fields = {
@@ -1227,7 +2405,7 @@ class HospitalDatabase:
                 if admin_update_sql:
                     cursor.execute(admin_update_sql, admin_params)
 
-                self.conn.commit()
+                cursor.connection.commit()
 
                 # Fetch final result including admin fields
                 cursor.execute("""
@@ -1242,12 +2420,12 @@ class HospitalDatabase:
 
             except Exception as e:
                 print(f"Error updating admin: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return None
         
     def add_billing(self, bill: Dict) -> Dict:
         """Add new billing record"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     INSERT INTO billing 
@@ -1263,34 +2441,48 @@ class HospitalDatabase:
                     bill.get('status', 'pending')
                 ))
                 result = cursor.fetchone()
-                self.conn.commit()
+                cursor.connection.commit()
                 return result
             except Exception as e:
                 print(f"Error adding billing record: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return None
 
     # Update records
     def update_appointment_status(self, appointment_id: int, status: str) -> bool:
-        """Update appointment status"""
-        with self.conn.cursor() as cursor:
+        """Update appointment status.
+
+        Cancelling frees the slot (trigger_release_slot); any other status
+        claims it again, so un-cancelling raises BookingConflict if the time
+        has been booked meanwhile.
+        """
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     UPDATE appointments
                     SET status = %s
                     WHERE id = %s AND is_deleted = FALSE
+                    RETURNING id, doctor_id, date, time, status
                 """
                 cursor.execute(query, (status, appointment_id))
-                self.conn.commit()
-                return cursor.rowcount > 0
+                appointment = cursor.fetchone()
+                if appointment and appointment['status'] != 'cancelled':
+                    self._claim_slot(cursor, appointment)
+                cursor.connection.commit()
+                return appointment is not None
+            except BookingConflict:
+                cursor.connection.rollback()
+                raise
             except Exception as e:
+                cursor.connection.rollback()
+                if self._is_slot_conflict(e):
+                    raise BookingConflict("doctor already booked at that time") from e
                 print(f"Error updating appointment status: {e}")
-                self.conn.rollback()
                 return False
 
     def update_prescription_status(self, prescription_id: int, status: str) -> bool:
         """Update prescription status"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 query = """
                     UPDATE prescriptions
@@ -1298,16 +2490,16 @@ class HospitalDatabase:
                     WHERE id = %s AND is_deleted = FALSE
                 """
                 cursor.execute(query, (status, prescription_id))
-                self.conn.commit()
+                cursor.connection.commit()
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error updating prescription status: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     def update_billing_status(self, bill_id: int, status: str) -> bool:
         """Update billing status"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 query = """
                     UPDATE billing
@@ -1315,17 +2507,17 @@ class HospitalDatabase:
                     WHERE id = %s AND is_deleted = FALSE
                 """
                 cursor.execute(query, (status, bill_id))
-                self.conn.commit()
+                cursor.connection.commit()
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error updating billing status: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     # Soft delete methods
     def delete_patient(self, patient_id: int) -> bool:
         """Soft delete a patient"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 # First soft delete the patient record
                 cursor.execute("""
@@ -1346,16 +2538,17 @@ class HospitalDatabase:
                     RETURNING id
                 """, (patient_id,))
                 
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('patient', patient_id)
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error soft deleting patient: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     def delete_doctor(self, doctor_id: int) -> bool:
         """Soft delete a doctor"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 cursor.execute("""
                     UPDATE doctors 
@@ -1374,11 +2567,12 @@ class HospitalDatabase:
                     RETURNING id
                 """, (doctor_id,))
                 
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('doctor', doctor_id)
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error soft deleting doctor: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     def delete_appointment(self, appointment_id: int) -> bool:
@@ -1399,7 +2593,7 @@ class HospitalDatabase:
 
     def _soft_delete(self, table: str, id: int) -> bool:
         """Generic soft delete method"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 query = sql.SQL("""
                     UPDATE {} 
@@ -1408,17 +2602,17 @@ class HospitalDatabase:
                     RETURNING id
                 """).format(sql.Identifier(table))
                 cursor.execute(query, (id,))
-                self.conn.commit()
+                cursor.connection.commit()
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error soft deleting from {table}: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     # Restore methods
     def restore_patient(self, patient_id: int) -> bool:
         """Restore a soft-deleted patient"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 # Restore patient record
                 cursor.execute("""
@@ -1439,16 +2633,17 @@ class HospitalDatabase:
                     RETURNING id
                 """, (patient_id,))
                 
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('patient', patient_id)
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error restoring patient: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     def restore_doctor(self, doctor_id: int) -> bool:
         """Restore a soft-deleted doctor"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 cursor.execute("""
                     UPDATE doctors 
@@ -1467,16 +2662,41 @@ class HospitalDatabase:
                     RETURNING id
                 """, (doctor_id,))
                 
-                self.conn.commit()
+                cursor.connection.commit()
+                self.cache.invalidate('doctor', doctor_id)
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error restoring doctor: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     def restore_appointment(self, appointment_id: int) -> bool:
-        """Restore a soft-deleted appointment"""
-        return self._restore('appointments', appointment_id)
+        """Restore a soft-deleted appointment and claim its slot again.
+
+        Raises BookingConflict if the time has been booked meanwhile.
+        """
+        with self._cursor(RealDictCursor) as cursor:
+            try:
+                cursor.execute("""
+                    UPDATE appointments
+                    SET is_deleted = FALSE, deleted_at = NULL
+                    WHERE id = %s
+                    RETURNING id, doctor_id, date, time, status
+                """, (appointment_id,))
+                appointment = cursor.fetchone()
+                if appointment and appointment['status'] != 'cancelled':
+                    self._claim_slot(cursor, appointment)
+                cursor.connection.commit()
+                return appointment is not None
+            except BookingConflict:
+                cursor.connection.rollback()
+                raise
+            except Exception as e:
+                cursor.connection.rollback()
+                if self._is_slot_conflict(e):
+                    raise BookingConflict("doctor already booked at that time") from e
+                print(f"Error restoring appointment: {e}")
+                return False
 
     def restore_prescription(self, prescription_id: int) -> bool:
         """Restore a soft-deleted prescription"""
@@ -1492,7 +2712,7 @@ class HospitalDatabase:
 
     def _restore(self, table: str, id: int) -> bool:
         """Generic restore method"""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             try:
                 query = sql.SQL("""
                     UPDATE {} 
@@ -1501,17 +2721,17 @@ class HospitalDatabase:
                     RETURNING id
                 """).format(sql.Identifier(table))
                 cursor.execute(query, (id,))
-                self.conn.commit()
+                cursor.connection.commit()
                 return cursor.rowcount > 0
             except Exception as e:
                 print(f"Error restoring from {table}: {e}")
-                self.conn.rollback()
+                cursor.connection.rollback()
                 return False
 
     # Admin methods to view deleted records
     def get_deleted_patients(self) -> List[Dict]:
         """Get all deleted patients"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     SELECT u.*, p.address, p.date_of_birth, p.blood_type, p.insurance
@@ -1529,7 +2749,7 @@ class HospitalDatabase:
 
     def get_deleted_doctors(self) -> List[Dict]:
         """Get all deleted doctors"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
                 query = """
                     SELECT u.*, d.specialization, d.department, d.from_date, d.until_date
@@ -1561,17 +2781,23 @@ class HospitalDatabase:
         """Get all deleted billing records"""
         return self._get_deleted_records('billing')
 
+    def _deleted_records_query(self, table: str) -> sql.Composed:
+        return sql.SQL("""
+            SELECT * FROM {} 
+            WHERE is_deleted = TRUE
+            ORDER BY deleted_at DESC
+        """).format(sql.Identifier(table))
+
     def _get_deleted_records(self, table: str) -> List[Dict]:
         """Generic method to get deleted records"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with self._cursor(RealDictCursor) as cursor:
             try:
-                query = sql.SQL("""
-                    SELECT * FROM {} 
-                    WHERE is_deleted = TRUE
-                    ORDER BY deleted_at DESC
-                """).format(sql.Identifier(table))
-                cursor.execute(query)
+                cursor.execute(self._deleted_records_query(table))
                 return cursor.fetchall()
             except Exception as e:
                 print(f"Error getting deleted records from {table}: {e}")
-                return []
\ No newline at end of file
+                return []
+
+    def iter_deleted_records(self, table: str, itersize: int = None) -> Iterator[Dict]:
+        """Stream deleted records of ``table`` without loading them into memory at once"""
+        yield from self._stream(self._deleted_records_query(table), itersize=itersize)
\ No newline at end of file
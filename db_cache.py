@@ -0,0 +1,135 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+
+class EntityCache:
+    """Per-process LRU cache with a time-to-live for entity rows.
+
+    Entries live in namespaces (``"doctor"``, ``"patient"``, ...). Single
+    rows are stored under their id, whole listings under the
+    ``"<namespace>:list"`` namespace, so invalidating one doctor also drops
+    every cached doctor listing that might contain it. Values are copied on
+    the way in and out, so callers can't change what other pages see.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = max_size > 0 and ttl > 0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()   # (namespace, key) -> (expires_at, value)
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _list_namespace(namespace: str) -> str:
+        return f"{namespace}:list"
+
+    def _lookup(self, entry_key):
+        """Return the cached value or None; caller holds the lock"""
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            self._misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[entry_key]
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(entry_key)
+        self._hits += 1
+        return value
+
+    def _store(self, entry_key, value):
+        """Insert or refresh an entry, evicting the least recently used; caller holds the lock"""
+        self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, namespace: str, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._lookup((namespace, key))
+        return copy.deepcopy(value) if value is not None else None
+
+    def put(self, namespace: str, key, value):
+        if not self.enabled or value is None:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store((namespace, key), value)
+
+    def get_many(self, namespace: str, keys: Iterable) -> Tuple[Dict, List]:
+        """Return (cached values keyed by key, keys that were not cached)"""
+        keys = list(keys)
+        if not self.enabled:
+            return {}, keys
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                value = self._lookup((namespace, key))
+                if value is None:
+                    missing.append(key)
+                else:
+                    found[key] = value
+        return copy.deepcopy(found), missing
+
+    def put_many(self, namespace: str, values: Dict):
+        if not self.enabled:
+            return
+        values = copy.deepcopy(values)
+        with self._lock:
+            for key, value in values.items():
+                self._store((namespace, key), value)
+
+    def get_list(self, namespace: str, key):
+        return self.get(self._list_namespace(namespace), key)
+
+    def put_list(self, namespace: str, key, rows: List):
+        self.put(self._list_namespace(namespace), key, rows)
+
+    def invalidate(self, namespace: str, key=None):
+        """Drop one entity (or the whole namespace) and every listing of that namespace"""
+        list_namespace = self._list_namespace(namespace)
+        with self._lock:
+            stale = [
+                entry_key for entry_key in self._entries
+                if entry_key[0] == list_namespace
+                or (entry_key[0] == namespace and (key is None or entry_key[1] == key))
+            ]
+            for entry_key in stale:
+                del self._entries[entry_key]
+            self._invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
@@ -0,0 +1,105 @@
+import json
+import select
+import threading
+from typing import Callable, Dict, List
+
+import psycopg2
+from psycopg2 import extensions
+
+CHANGE_CHANNEL = 'hospital_changes'
+
+
+class ChangeListener(threading.Thread):
+    """Background thread that LISTENs for row change notifications.
+
+    Uses its own autocommit connection (a pooled connection can't be parked
+    on LISTEN) and reconnects with backoff if the server goes away. Every
+    notification is decoded into a dict like
+    ``{'table': 'appointments', 'op': 'UPDATE', 'id': 42, ...}`` and passed to
+    each subscriber, on this thread. After a reconnect, notifications sent
+    while disconnected are lost, so subscribers get ``{'op': 'RESYNC'}`` and
+    should drop anything they derived from earlier ones. Bulk updates send a
+    single ``{'table': ..., 'op': 'BULK'}`` with no id instead of one
+    notification per row.
+    """
+
+    def __init__(self, poll_interval: float = 5.0, max_backoff: float = 60.0, **connect_kwargs):
+        super().__init__(name='db-change-listener', daemon=True)
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._connect_kwargs = connect_kwargs
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._conn = None
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+        return conn
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _dispatch(self, payload: str):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            print(f"Ignoring malformed change notification: {payload!r}")
+            return
+        self._publish(change)
+
+    def _publish(self, change: Dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"Error handling change notification: {e}")
+
+    def run(self):
+        backoff = 1.0
+        connected_before = False
+        while not self._stop_event.is_set():
+            try:
+                if self._conn is None:
+                    self._conn = self._connect()
+                    backoff = 1.0
+                    if connected_before:
+                        self._publish({'table': None, 'op': 'RESYNC'})
+                    connected_before = True
+
+                ready, _, _ = select.select([self._conn], [], [], self.poll_interval)
+                if not ready:
+                    continue
+
+                self._conn.poll()
+                while self._conn.notifies:
+                    notify = self._conn.notifies.pop(0)
+                    self._dispatch(notify.payload)
+            except (psycopg2.Error, OSError) as e:
+                print(f"Change listener lost its connection: {e}")
+                self._close()
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        self._close()
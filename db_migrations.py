@@ -0,0 +1,374 @@
+import os
+from typing import List, NamedTuple, Sequence, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2 import extensions
+
+# pg_advisory_lock key so only one client migrates a database at a time
+MIGRATION_LOCK = 7303
+
+
+class Migration(NamedTuple):
+    """One step of the schema history.
+
+    ``sql`` runs in one transaction. ``indexes`` are ``(name, definition)``
+    pairs built afterwards with ``CREATE INDEX CONCURRENTLY``, which can't
+    run in a transaction but doesn't lock the table against writes while
+    it builds; ``unique_indexes`` likewise with ``CREATE UNIQUE INDEX``.
+    The version is recorded once both are done, so if an index build fails
+    the whole migration runs again next time and ``sql`` must be safe to
+    repeat (``IF NOT EXISTS`` and the like).
+    """
+    version: int
+    description: str
+    sql: str = ''
+    indexes: Sequence[Tuple[str, str]] = ()
+    unique_indexes: Sequence[Tuple[str, str]] = ()
+
+
+# Append new schema changes here; never edit a migration that has shipped.
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'Indexes for the dashboard and schedule queries', indexes=[
+        # Doctor schedules: get_doctor_dashboard, doctor appointment lists
+        ('idx_appointments_doctor_date_time',
+         'appointments(doctor_id, date, time) WHERE is_deleted = FALSE'),
+        # "Recent activity" lists of the admin dashboard
+        ('idx_appointments_created_at',
+         'appointments(created_at) WHERE is_deleted = FALSE'),
+        ('idx_billing_created_at',
+         'billing(created_at) WHERE is_deleted = FALSE'),
+        ('idx_users_role_created_at',
+         'users(role, created_at) WHERE is_deleted = FALSE'),
+    ]),
+    Migration(2, 'Trigram indexes for name and email search',
+              sql="CREATE EXTENSION IF NOT EXISTS pg_trgm",
+              indexes=[
+        # Substring (ILIKE '%term%') and fuzzy matches of search_users and
+        # the admin name filters
+        ('idx_users_name_trgm', 'users USING gin (name gin_trgm_ops)'),
+        ('idx_users_email_trgm', 'users USING gin (email gin_trgm_ops)'),
+    ]),
+    # 'simple' rather than a language config: records are written in both
+    # English and Russian, so words are matched as typed, without stemming
+    Migration(3, 'Full-text search of medical records', sql="""
+        ALTER TABLE medical_records ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(diagnosis, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(treatment, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+            ) STORED
+    """, indexes=[
+        ('idx_medical_records_search',
+         'medical_records USING gin (search_vector) WHERE is_deleted = FALSE'),
+    ]),
+    # Bookable slots, generated ahead from doctors' working hours by
+    # HospitalDatabase.extend_slot_horizon(). Booking claims a free row, so
+    # two clients can never book the same doctor at the same time.
+    Migration(4, 'Slot inventory for booking', sql="""
+        CREATE TABLE IF NOT EXISTS slots (
+            doctor_id INTEGER NOT NULL REFERENCES doctors(user_id) ON DELETE CASCADE,
+            start_ts TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            status VARCHAR(10) NOT NULL DEFAULT 'free',
+            appointment_id INTEGER REFERENCES appointments(id) ON DELETE SET NULL,
+            PRIMARY KEY (doctor_id, start_ts),
+            CONSTRAINT slots_status_check CHECK (status IN ('free', 'booked'))
+        );
+        CREATE INDEX IF NOT EXISTS idx_slots_start ON slots(start_ts);
+        CREATE INDEX IF NOT EXISTS idx_slots_appointment ON slots(appointment_id)
+            WHERE appointment_id IS NOT NULL;
+
+        -- Cancelling or deleting an appointment, from any client, frees its slot
+        CREATE OR REPLACE FUNCTION release_appointment_slot()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE slots SET status = 'free', appointment_id = NULL
+            WHERE appointment_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_release_slot ON appointments;
+        CREATE TRIGGER trigger_release_slot
+            AFTER UPDATE OF status, is_deleted ON appointments
+            FOR EACH ROW WHEN (NEW.is_deleted OR NEW.status = 'cancelled')
+            EXECUTE FUNCTION release_appointment_slot();
+    """),
+    Migration(5, 'Index of free slots for earliest-slot search', indexes=[
+        # find_earliest_slots reads each doctor's next free slots off this
+        # in time order, without stepping over booked ones
+        ('idx_slots_free', "slots(doctor_id, start_ts) WHERE status = 'free'"),
+    ]),
+    # The real guard against double bookings: the slots inventory only covers
+    # the horizon and working hours, this covers every appointment. Existing
+    # clashes have to be resolved by hand first, they aren't guessed at here.
+    Migration(6, 'One active appointment per doctor and time', sql="""
+        DO $$
+        DECLARE clashes INTEGER;
+        BEGIN
+            SELECT count(*) INTO clashes FROM (
+                SELECT 1 FROM appointments
+                WHERE is_deleted = FALSE AND status <> 'cancelled'
+                GROUP BY doctor_id, date, time
+                HAVING count(*) > 1
+            ) c;
+            IF clashes > 0 THEN
+                RAISE EXCEPTION '% doctor/time pairs have more than one active appointment; '
+                                'cancel the extra ones before upgrading', clashes;
+            END IF;
+        END
+        $$
+    """, unique_indexes=[
+        ('appointments_doctor_slot_key',
+         "appointments(doctor_id, date, time) WHERE is_deleted = FALSE AND status <> 'cancelled'"),
+    ]),
+    # 7-9 replace the statements HospitalDatabase used to run on every start
+    Migration(7, 'Change feed triggers and appointment_view', sql="""
+        -- Broadcast row changes so other clients can refresh and drop cached rows
+        CREATE OR REPLACE FUNCTION notify_hospital_change()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            row_data JSONB;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                row_data := to_jsonb(OLD);
+            ELSE
+                row_data := to_jsonb(NEW);
+            END IF;
+
+            PERFORM pg_notify('hospital_changes', json_build_object(
+                'table', TG_TABLE_NAME,
+                'op', TG_OP,
+                'id', COALESCE(row_data->>'id', row_data->>'user_id')::INTEGER,
+                'patient_id', (row_data->>'patient_id')::INTEGER,
+                'doctor_id', (row_data->>'doctor_id')::INTEGER,
+                'date', row_data->>'date'
+            )::TEXT);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        DECLARE
+            tbl TEXT;
+        BEGIN
+            FOREACH tbl IN ARRAY ARRAY['appointments', 'billing', 'prescriptions', 'medical_records',
+                                       'users', 'doctors', 'patients']
+            LOOP
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_trigger
+                    WHERE tgname = 'trigger_notify_' || tbl AND tgrelid = tbl::regclass
+                ) THEN
+                    EXECUTE format(
+                        'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I
+                         FOR EACH ROW EXECUTE FUNCTION notify_hospital_change()',
+                        'trigger_notify_' || tbl, tbl
+                    );
+                END IF;
+            END LOOP;
+        END;
+        $$;
+
+        -- Appointments as every read should see them: a scheduled appointment
+        -- whose day has passed is a no-show. Derived at read time so reads
+        -- never have to write.
+        CREATE OR REPLACE VIEW appointment_view AS
+            SELECT id, patient_id, doctor_id, date, time, reason,
+                   CASE WHEN status = 'scheduled' AND date < CURRENT_DATE
+                        THEN 'no-show' ELSE status END AS status,
+                   created_at, is_deleted, deleted_at
+            FROM appointments;
+    """),
+    Migration(8, 'Indexes for paging, reports and doctor lookups', indexes=[
+        # Sort keys for keyset pagination of the admin tables
+        ('idx_appointments_date_time_id',
+         'appointments(date, time, id) WHERE is_deleted = FALSE'),
+        ('idx_billing_date_id', 'billing(date, id) WHERE is_deleted = FALSE'),
+        ('idx_users_role_name_id', 'users(role, name, id)'),
+        # Date-range filters of the reports page
+        ('idx_prescriptions_date', 'prescriptions(date) WHERE is_deleted = FALSE'),
+        # Doctor-scoped lookups of the doctor dashboard
+        ('idx_prescriptions_doctor_date',
+         'prescriptions(doctor_id, date) WHERE is_deleted = FALSE'),
+    ]),
+    # Pre-aggregated report data, brought up to date by
+    # HospitalDatabase.refresh_report_views(). The unique indexes are what
+    # REFRESH ... CONCURRENTLY needs.
+    Migration(9, 'Materialized report views', sql="""
+        -- Rebuild a report view created before it read appointment_view
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_matviews
+                WHERE matviewname = 'report_doctor_daily' AND definition NOT LIKE '%appointment_view%'
+            ) THEN
+                DROP MATERIALIZED VIEW report_doctor_daily;
+            END IF;
+        END;
+        $$;
+
+        CREATE MATERIALIZED VIEW IF NOT EXISTS report_doctor_daily AS
+            SELECT doctor_id, date, status, COUNT(*) AS count
+            FROM appointment_view
+            WHERE is_deleted = FALSE
+            GROUP BY doctor_id, date, status;
+
+        CREATE MATERIALIZED VIEW IF NOT EXISTS report_medication_daily AS
+            SELECT medication, date, COUNT(*) AS count
+            FROM prescriptions
+            WHERE is_deleted = FALSE
+            GROUP BY medication, date;
+
+        CREATE MATERIALIZED VIEW IF NOT EXISTS report_revenue_daily AS
+            SELECT date, status, SUM(amount) AS amount, COUNT(*) AS count
+            FROM billing
+            WHERE is_deleted = FALSE
+            GROUP BY date, status;
+
+        CREATE TABLE IF NOT EXISTS report_snapshots (
+            view_name TEXT PRIMARY KEY,
+            refreshed_at TIMESTAMP NOT NULL
+        );
+    """, unique_indexes=[
+        ('idx_report_doctor_daily', 'report_doctor_daily(doctor_id, date, status)'),
+        ('idx_report_medication_daily', 'report_medication_daily(date, medication)'),
+        ('idx_report_revenue_daily', 'report_revenue_daily(date, status)'),
+    ]),
+    # Bulk jobs (HospitalDatabase.mark_missed_appointments) set
+    # hospital.bulk_change and send one BULK notification for the statement
+    # instead of one per row. Updates also carry the old doctor_id, so a
+    # reassigned appointment leaves the previous doctor's schedule.
+    Migration(10, 'Quieter, reassignment-aware change feed', sql="""
+        CREATE OR REPLACE FUNCTION notify_hospital_change()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            row_data JSONB;
+        BEGIN
+            IF current_setting('hospital.bulk_change', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                row_data := to_jsonb(OLD);
+            ELSE
+                row_data := to_jsonb(NEW);
+            END IF;
+
+            PERFORM pg_notify('hospital_changes', json_build_object(
+                'table', TG_TABLE_NAME,
+                'op', TG_OP,
+                'id', COALESCE(row_data->>'id', row_data->>'user_id')::INTEGER,
+                'patient_id', (row_data->>'patient_id')::INTEGER,
+                'doctor_id', (row_data->>'doctor_id')::INTEGER,
+                'old_doctor_id', CASE WHEN TG_OP = 'UPDATE'
+                                      THEN (to_jsonb(OLD)->>'doctor_id')::INTEGER END,
+                'date', row_data->>'date'
+            )::TEXT);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+    Migration(11, 'Time-ordered index of free slots', indexes=[
+        # find_earliest_slots(plan='scan') reads free slots of all doctors
+        # off this in (start_ts, doctor_id) order, its own sort order
+        ('idx_slots_free_start', "slots(start_ts, doctor_id) WHERE status = 'free'"),
+    ]),
+]
+
+
+class MigrationRunner:
+    """Brings a database up to the latest version in ``MIGRATIONS``.
+
+    Uses its own autocommit connection without a statement timeout, since
+    concurrent index builds can take a while on big tables. Applied
+    versions are recorded in ``schema_version``.
+    """
+
+    def __init__(self, migrations: Sequence[Migration] = MIGRATIONS, **connect_kwargs):
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self._connect_kwargs = connect_kwargs
+
+    def pending(self) -> List[int]:
+        """Versions not applied yet, without applying them"""
+        conn = psycopg2.connect(**self._connect_kwargs)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+                applied = set()
+                if cursor.fetchone()[0]:
+                    cursor.execute("SELECT version FROM schema_version")
+                    applied = {row[0] for row in cursor.fetchall()}
+            return [m.version for m in self.migrations if m.version not in applied]
+        finally:
+            conn.close()
+
+    def run(self) -> List[int]:
+        """Apply every pending migration and return their versions"""
+        conn = psycopg2.connect(**self._connect_kwargs)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            with conn.cursor() as cursor:
+                # Held for the session; other clients wait here, then find
+                # the migrations already applied. Taken before the CREATE, since
+                # two concurrent CREATE TABLE IF NOT EXISTS can still collide
+                cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK,))
+                try:
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS schema_version (
+                            version INTEGER PRIMARY KEY,
+                            description TEXT NOT NULL,
+                            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    cursor.execute("SELECT version FROM schema_version")
+                    applied = {row[0] for row in cursor.fetchall()}
+                    pending = [m for m in self.migrations if m.version not in applied]
+                    for migration in pending:
+                        self._apply(conn, migration)
+                        print(f"Applied migration {migration.version}: {migration.description}")
+                    return [m.version for m in pending]
+                finally:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK,))
+        finally:
+            conn.close()
+
+    def _apply(self, conn, migration: Migration):
+        with conn.cursor() as cursor:
+            if migration.sql:
+                cursor.execute("BEGIN")
+                try:
+                    cursor.execute(migration.sql)
+                    cursor.execute("COMMIT")
+                except psycopg2.Error:
+                    cursor.execute("ROLLBACK")
+                    raise
+
+            builds = [('INDEX', index) for index in migration.indexes]
+            builds += [('UNIQUE INDEX', index) for index in migration.unique_indexes]
+            for kind, (name, definition) in builds:
+                # A build that failed half way leaves an INVALID index that
+                # IF NOT EXISTS would skip, so drop it and start over
+                cursor.execute("""
+                    SELECT 1 FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = %s AND NOT i.indisvalid
+                """, (name,))
+                if cursor.fetchone():
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                cursor.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+            cursor.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (migration.version, migration.description)
+            )
+
+
+if __name__ == '__main__':
+    # For deployments that start clients with DB_AUTO_MIGRATE=0
+    load_dotenv()
+    MigrationRunner(
+        dbname=os.getenv('DB_NAME', 'hospital_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres'),
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432')
+    ).run()
@@ -0,0 +1,27 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Sequence
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Pack the sort key of the last row on a page into an opaque token.
+
+    Dates and times are stored as their ISO strings; PostgreSQL casts them
+    back when they are compared against the key columns.
+    """
+    payload = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List]:
+    """Unpack a token from ``encode_cursor``; None means the first page"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return values
@@ -0,0 +1,198 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+
+class PoolTimeout(pool.PoolError):
+    """Raised when no connection could be checked out in time"""
+
+
+class PooledConnection(extensions.connection):
+    """psycopg2 connection that remembers the statements PREPAREd on it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are handed out with the ``connection()`` context manager and
+    returned automatically. A connection that comes back with an open or
+    failed transaction is rolled back before anyone else can use it, and a
+    connection that is broken is thrown away and replaced.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = 10.0,
+                 statement_timeout_ms: int = 0, health_check_interval: float = 30.0,
+                 **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: min=%s max=%s" % (minconn, maxconn))
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.health_check_interval = health_check_interval
+        self._connect_kwargs = connect_kwargs
+
+        self._lock = threading.Condition()
+        self._idle: List = []           # [(connection, returned_at)]
+        self._in_use = 0
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._peak_in_use = 0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        kwargs = dict(self._connect_kwargs)
+        if self.statement_timeout_ms:
+            options = kwargs.get('options', '')
+            kwargs['options'] = f"{options} -c statement_timeout={int(self.statement_timeout_ms)}".strip()
+        conn = psycopg2.connect(connection_factory=PooledConnection, **kwargs)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_READ_COMMITTED)
+        return conn
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        """Check a connection before handing it out"""
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self):
+        """Check out a connection, waiting up to ``timeout`` seconds for one"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+
+                if self._in_use + len(self._idle) < self.maxconn:
+                    conn, returned_at = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                self._lock.wait(remaining)
+
+            # Reserve the slot before doing any network I/O outside the lock
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._is_healthy(conn, time.monotonic() - returned_at):
+                with self._lock:
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool"""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._lock:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a ``with`` block"""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken or conn.closed)
+
+    def stats(self) -> Dict:
+        """Pool size, utilisation and wait time metrics"""
+        with self._lock:
+            in_use = self._in_use
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': in_use,
+                'idle': len(self._idle),
+                'peak_in_use': self._peak_in_use,
+                'utilisation': in_use / self.maxconn,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'avg_wait_ms': (self._total_wait / self._checkouts * 1000) if self._checkouts else 0.0,
+                'max_wait_ms': self._max_wait * 1000,
+            }
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            for conn, _ in self._idle:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._idle = []
+            self._lock.notify_all()
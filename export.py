@@ -0,0 +1,78 @@
+"""Export a whole table to CSV:
+
+    python export.py <table> <file.csv> [--include-deleted]
+    python export.py deleted <table> <file.csv>
+
+<table> is one of patients, doctors, appointments, bills or prescriptions;
+the second form exports the soft-deleted rows of any table. Rows are read
+through a server-side cursor (HospitalDatabase.iter_all_*) and written as
+they arrive, so memory use stays flat however large the table. Password
+hashes are never written. If the stream fails partway, the partial file
+is deleted and the script exits non-zero. Uses the database settings
+from .env.
+"""
+import csv
+import os
+import sys
+
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+
+from db import HospitalDatabase  # noqa: E402
+
+EXPORTS = {
+    'patients': HospitalDatabase.iter_all_patients,
+    'doctors': HospitalDatabase.iter_all_doctors,
+    'appointments': HospitalDatabase.iter_all_appointments,
+    'bills': HospitalDatabase.iter_all_bills,
+    'prescriptions': HospitalDatabase.iter_all_prescriptions,
+}
+EXCLUDED_COLUMNS = {'password'}
+
+
+def write_csv(rows, path) -> int:
+    """Write ``rows`` to ``path`` one at a time; returns how many were written.
+
+    Any error while streaming is raised after the partial file is removed.
+    """
+    count = 0
+    try:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = None
+            for row in rows:
+                if writer is None:
+                    columns = [c for c in row.keys() if c not in EXCLUDED_COLUMNS]
+                    writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return count
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != '--include-deleted']
+    include_deleted = len(args) < len(sys.argv) - 1
+    if len(args) == 3 and args[0] == 'deleted':
+        table, path = args[1], args[2]
+        rows = lambda db: db.iter_deleted_records(table)
+    elif len(args) == 2 and args[0] in EXPORTS:
+        table, path = args
+        rows = lambda db: EXPORTS[table](db, include_deleted=include_deleted)
+    else:
+        sys.exit(__doc__)
+
+    db = HospitalDatabase()
+    try:
+        count = write_csv(rows(db), path)
+    except Exception as e:
+        sys.exit(f"Export of {table} failed, {path} not written: {e}")
+    finally:
+        db.pool.closeall()
+    print(f"Rows exported from {table}: {count}")
+
+
+if __name__ == '__main__':
+    main()
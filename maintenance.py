@@ -0,0 +1,28 @@
+"""Nightly housekeeping, meant to be run from cron:
+
+    0 2 * * * cd /path/to/app && python maintenance.py [horizon days]
+
+Extends the bookable slots horizon, marks missed appointments as no-shows
+and refreshes the report views. Uses the database settings from .env.
+"""
+import os
+import sys
+
+os.environ.setdefault('DB_CHANGE_FEED', '0')
+
+from db import HospitalDatabase  # noqa: E402
+
+
+def main():
+    db = HospitalDatabase()
+    try:
+        days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+        print(f"Slots added: {db.extend_slot_horizon(days)}")
+        print(f"Appointments marked no-show: {db.mark_missed_appointments()}")
+        print(f"Report views refreshed: {db.refresh_report_views(force=True)}")
+    finally:
+        db.pool.closeall()
+
+
+if __name__ == '__main__':
+    main()
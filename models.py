@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import List, Optional
+
+
+class Row:
+    """Base of the typed rows HospitalDatabase returns.
+
+    Rows are slotted dataclasses built straight from a tuple cursor, so they
+    carry no per-row dict of repeated column names like RealDictRow does.
+    psycopg2 has already turned DATE, TIME and NUMERIC columns into date,
+    time and Decimal objects, so callers never need to parse them. Rows also
+    answer ``row['name']``, ``row.get('name')`` and ``'name' in row``, so code
+    written against dict rows keeps working.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_cursor(cls, cursor) -> List['Row']:
+        """Build one row per result of ``cursor``'s last query.
+
+        The select list may name any subset of the fields, and columns that
+        aren't fields are dropped. When it names them in field order the
+        tuples are passed straight through.
+        """
+        names = [column.name for column in cursor.description]
+        rows = cursor.fetchall()
+        if names == list(cls.__dataclass_fields__)[:len(names)]:
+            return [cls(*row) for row in rows]
+        known = [(i, name) for i, name in enumerate(names) if name in cls.__dataclass_fields__]
+        return [cls(**{name: row[i] for i, name in known}) for row in rows]
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and key in self.__dataclass_fields__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self else default
+
+    def keys(self):
+        return list(self.__dataclass_fields__)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
+
+
+@dataclass(slots=True)
+class Appointment(Row):
+    id: int
+    patient_id: int
+    doctor_id: int
+    date: date
+    time: time
+    reason: str
+    status: str
+    created_at: Optional[datetime] = None
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    patient_name: Optional[str] = None
+    doctor_name: Optional[str] = None
+    doctor_department: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Bill(Row):
+    id: int
+    patient_id: int
+    appointment_id: Optional[int]
+    amount: Decimal
+    date: date
+    status: str
+    payment_method: Optional[str] = None
+    payment_date: Optional[datetime] = None
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    appointment_date: Optional[date] = None
+    appointment_reason: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Prescription(Row):
+    id: int
+    patient_id: int
+    doctor_id: int
+    date: date
+    medication: str
+    dosage: str
+    status: str
+    notes: Optional[str] = None
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    doctor_name: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MedicalRecord(Row):
+    id: int
+    patient_id: int
+    doctor_id: int
+    date: date
+    diagnosis: str
+    treatment: Optional[str] = None
+    notes: Optional[str] = None
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    doctor_name: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Patient(Row):
+    id: int
+    email: str
+    name: str
+    phone: Optional[str] = None
+    role: str = 'patient'
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    address: Optional[str] = None
+    date_of_birth: Optional[date] = None
+    blood_type: Optional[str] = None
+    insurance: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Doctor(Row):
+    id: int
+    email: str
+    name: str
+    phone: Optional[str] = None
+    role: str = 'doctor'
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    specialization: Optional[str] = None
+    department: Optional[str] = None
+    from_time: Optional[time] = None
+    until_time: Optional[time] = None
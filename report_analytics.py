@@ -0,0 +1,126 @@
+"""The reports page's figures, computed with NumPy over columnar fetches.
+
+Each function takes the column dicts of HospitalDatabase.get_*_columns()
+and returns rows shaped like the matching SQL report, so ReportsPage can
+show either. Group-bys are bincounts over dense indexes. There are no
+per-record Python loops, only the final conversion of one row per patient
+or doctor for display.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List
+
+from db import APPOINTMENT_STATUSES, BILL_STATUSES
+from db_columnar import np
+
+# False without NumPy; the reports page then keeps to the SQL reports
+AVAILABLE = np is not None
+
+_COMPLETED = APPOINTMENT_STATUSES.index('completed')
+_CANCELLED = APPOINTMENT_STATUSES.index('cancelled')
+_PAID = BILL_STATUSES.index('paid')
+_PENDING = BILL_STATUSES.index('pending')
+
+
+def _index_of(ids, keys):
+    """Position of every key in the ``ids`` array, -1 where it isn't there.
+
+    User ids are SERIAL, so a lookup table indexed by id stays small and
+    is far quicker than a binary search for millions of keys.
+    """
+    if not len(ids) or not len(keys):
+        return np.full(len(keys), -1, dtype=np.int64)
+    table = np.full(int(ids.max()) + 1, -1, dtype=np.int64)
+    table[ids] = np.arange(len(ids))
+    in_range = (keys >= 0) & (keys < len(table))
+    return np.where(in_range, table[np.where(in_range, keys, 0)], -1)
+
+
+def _sum_cents(cents, codes, size):
+    """Per-code sums of int64 cents; np.add.at keeps them exact, unlike float weights"""
+    sums = np.zeros(size, dtype=np.int64)
+    known = codes >= 0
+    np.add.at(sums, codes[known], cents[known])
+    return sums
+
+
+def _money(cents) -> Decimal:
+    return Decimal(int(cents)) / 100
+
+
+def financial_summary(bills: Dict) -> Dict:
+    """Total, paid and pending amounts and the bill count, as get_revenue_summary()"""
+    sums = _sum_cents(bills['amount'], bills['status'].astype(np.int64), len(BILL_STATUSES))
+    return {
+        'total': _money(bills['amount'].sum()),
+        'paid': _money(sums[_PAID]),
+        'pending': _money(sums[_PENDING]),
+        'count': len(bills['amount']),
+    }
+
+
+def ages(birth_dates, today: date = None):
+    """Whole years from each datetime64[D] birth date to ``today``; -1 where unknown"""
+    today = np.datetime64(today or date.today(), 'D')
+    years = birth_dates.astype('datetime64[Y]')
+    months = birth_dates.astype('datetime64[M]')
+    month = (months - years).astype(np.int64)
+    day = (birth_dates - months).astype(np.int64)
+    today_month = int((today.astype('datetime64[M]') - today.astype('datetime64[Y]')).astype(np.int64))
+    today_day = int((today - today.astype('datetime64[M]')).astype(np.int64))
+    before_birthday = (month > today_month) | ((month == today_month) & (day > today_day))
+    result = (today.astype('datetime64[Y]') - years).astype(np.int64) - before_birthday
+    return np.where(np.isnat(birth_dates), -1, result)
+
+
+def patient_report(patients: Dict, appointments: Dict, today: date = None) -> List[Dict]:
+    """Age, appointment count and last visit per patient, as get_patient_report()"""
+    n = len(patients['id'])
+    index = _index_of(patients['id'], appointments['patient_id'])
+    known = index >= 0
+    counts = np.bincount(index[known], minlength=n)
+    # Latest visit per patient: a scatter-max over the day numbers
+    last = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last, index[known], appointments['date'][known].view(np.int64))
+    last_visits = last.view('datetime64[D]').astype(object)
+    patient_ages = ages(patients['date_of_birth'], today)
+    birth_dates = patients['date_of_birth'].astype(object)
+    return [
+        {'id': id_, 'name': name, 'date_of_birth': dob,
+         'age': None if age < 0 else age, 'appointments': count, 'last_visit': visit}
+        for id_, name, dob, age, count, visit in zip(
+            patients['id'].tolist(), patients['name'].tolist(), birth_dates,
+            patient_ages.tolist(), counts.tolist(), last_visits
+        )
+    ]
+
+
+def doctor_report(doctors: Dict, appointments: Dict) -> List[Dict]:
+    """Appointment, completed and cancelled counts per doctor, as get_doctor_report()"""
+    n = len(doctors['id'])
+    index = _index_of(doctors['id'], appointments['doctor_id'])
+    known = index >= 0
+    index, status = index[known], appointments['status'][known]
+    total = np.bincount(index, minlength=n)
+    completed = np.bincount(index[status == _COMPLETED], minlength=n)
+    cancelled = np.bincount(index[status == _CANCELLED], minlength=n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Halves round up like SQL ROUND(), not to even like np.round()
+        rate = np.where(total > 0, np.floor(1000.0 * completed / total + 0.5) / 10, 0.0)
+    return [
+        {'id': id_, 'name': name, 'specialization': spec, 'appointments': t,
+         'completed': c, 'cancelled': x, 'completion_rate': r}
+        for id_, name, spec, t, c, x, r in zip(
+            doctors['id'].tolist(), doctors['name'].tolist(), doctors['specialization'].tolist(),
+            total.tolist(), completed.tolist(), cancelled.tolist(), rate.tolist()
+        )
+    ]
+
+
+def top_medications(prescriptions: Dict, limit: int = 3) -> List[Dict]:
+    """Most prescribed medications, as get_top_medications()"""
+    names = prescriptions['medication_labels']
+    counts = np.bincount(prescriptions['medication'], minlength=len(names))
+    # Labels come sorted, so a stable sort on -count breaks ties by name
+    top = np.argsort(-counts, kind='stable')[:limit]
+    return [{'medication': names[i], 'count': int(counts[i])} for i in top.tolist()]
@@ -1,11 +1,18 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-    QGroupBox, QLineEdit, QDateEdit, QTableWidget, QTableWidgetItem,
+    QGroupBox, QLineEdit, QDateEdit, QTableView,
     QHeaderView, QFormLayout, QComboBox, QTextEdit, QTimeEdit, 
     QMessageBox, QInputDialog
 )
 from PyQt5.QtCore import Qt, QDate, QTime
 
+from ..change_feed import ChangeBatcher, get_change_notifier
+from ..loader import DataLoader
+from ..delegates import ActionButtonDelegate
+from ..table_model import PagedTableModel, TableSortProxy
+from ..user_completer import UserSearchCompleter
+from db import BookingConflict
+
 LANGUAGES = {
     'en': {
         'page_title': 'Manage Appointments',
@@ -43,7 +50,9 @@ LANGUAGES = {
         'error_title': 'Error',
         'required_fields': 'Patient and doctor are required',
         'update_error': 'Failed to update appointment: {error}',
-        'save_error': 'Failed to save appointment: {error}'
+        'save_error': 'Failed to save appointment: {error}',
+        'slot_taken': 'The doctor already has an appointment at that time',
+        'save_failed': 'The appointment could not be saved'
     },
     'ru': {
         'page_title': 'Управление записями',
@@ -81,7 +90,9 @@ LANGUAGES = {
         'error_title': 'Ошибка',
         'required_fields': 'Необходимо указать пациента и врача',
         'update_error': 'Ошибка при обновлении записи: {error}',
-        'save_error': 'Ошибка при сохранении записи: {error}'
+        'save_error': 'Ошибка при сохранении записи: {error}',
+        'slot_taken': 'У врача уже есть запись на это время',
+        'save_failed': 'Не удалось сохранить запись'
     }
 }
 
@@ -91,7 +102,13 @@ class ManageAppointmentsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
+        self.current_filters = {}
+        # Other clients' changes, applied in batches rather than per row
+        self.appointment_changes = ChangeBatcher(self.refresh_changed_appointments, parent=self)
+        self.people_changes = ChangeBatcher(lambda ids, reload: self.load_people(), parent=self)
         self.init_ui()
+        get_change_notifier(self.db).changed.connect(self.on_db_change)
         
     def init_ui(self):
         self.setup_main_layout()
@@ -99,6 +116,7 @@ class ManageAppointmentsPage(QWidget):
         self.setup_search_filters()
         self.setup_appointments_table()
         self.setup_appointment_form()
+        self.load_people()
         self.load_appointments()
         
     def setup_main_layout(self):
@@ -139,6 +157,10 @@ class ManageAppointmentsPage(QWidget):
         
         self.search_doctor = QLineEdit()
         self.search_doctor.setPlaceholderText(LANGUAGES[self.lang]['doctor_name'])
+
+        # Suggestions use the same fuzzy name matching as the filters
+        UserSearchCompleter(self.search_patient, self.db, 'patient', self.loader)
+        UserSearchCompleter(self.search_doctor, self.db, 'doctor', self.loader)
         
         self.search_date = QDateEdit()
         self.search_date.setDisplayFormat("yyyy-MM-dd")
@@ -185,14 +207,33 @@ class ManageAppointmentsPage(QWidget):
         self.layout.addWidget(filter_group)
         
     def setup_appointments_table(self):
-        self.appointments_table = QTableWidget()
-        self.appointments_table.setColumnCount(8)
-        self.appointments_table.setHorizontalHeaderLabels(
-            LANGUAGES[self.lang]['table_headers']
-        )
+        headers = LANGUAGES[self.lang]['table_headers']
+        self.appointments_model = PagedTableModel([
+            (headers[0], 'id'),
+            (headers[1], 'patient_name'),
+            (headers[2], 'doctor_name'),
+            (headers[3], 'date'),
+            (headers[4], 'time'),
+            (headers[5], 'reason'),
+            (headers[6], 'status'),
+            (headers[7], None)
+        ], parent=self)
+        self.appointments_proxy = TableSortProxy(self.appointments_model, self)
+
+        self.appointments_table = QTableView()
+        self.appointments_table.setModel(self.appointments_proxy)
+        self.appointments_table.setSortingEnabled(True)
         self.appointments_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.appointments_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.appointments_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.appointments_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.appointments_table.setSelectionBehavior(QTableView.SelectRows)
+
+        self.appointments_actions = ActionButtonDelegate([
+            ('edit', LANGUAGES[self.lang]['edit_button'], 'blue'),
+            ('toggle_cancel', lambda a: LANGUAGES[self.lang]['cancel_button'] if a['status'] != 'cancelled' else LANGUAGES[self.lang]['restore_button'], 'red')
+        ], self.appointments_proxy.row_at, self)
+        self.appointments_actions.clicked.connect(self.on_row_action)
+        self.appointments_table.setItemDelegateForColumn(7, self.appointments_actions)
+        self.appointments_table.setMouseTracking(True)
         
         self.layout.addWidget(self.appointments_table)
         
@@ -207,19 +248,12 @@ class ManageAppointmentsPage(QWidget):
         self.appointment_id.setPlaceholderText(LANGUAGES[self.lang]['auto_generated'])
         self.appointment_id.setReadOnly(True)
         
-        # Get patients and doctors for dropdowns
-        patients = self.db.get_all_patients()
-        doctors = self.db.get_all_doctors()
-        
+        # Patients and doctors are filled in by load_people()
         self.patient_combo = QComboBox()
         self.patient_combo.addItem(LANGUAGES[self.lang]['select_patient'], None)
-        for patient in patients:
-            self.patient_combo.addItem(patient['name'], patient['id'])
             
         self.doctor_combo = QComboBox()
         self.doctor_combo.addItem(LANGUAGES[self.lang]['select_doctor'], None)
-        for doctor in doctors:
-            self.doctor_combo.addItem(doctor['name'], doctor['id'])
         
         self.appointment_date = QDateEdit()
         self.appointment_date.setDisplayFormat("yyyy-MM-dd")
@@ -280,6 +314,31 @@ class ManageAppointmentsPage(QWidget):
         group.setLayout(form)
         self.layout.addWidget(group)
         
+    def load_people(self):
+        """Fetch patients and doctors for the dropdowns in the background"""
+        self.loader.request(
+            'people',
+            lambda: (self.db.get_all_patients(), self.db.get_all_doctors()),
+            on_loaded=self.populate_people
+        )
+
+    def populate_people(self, result):
+        patients, doctors = result
+        selected_patient = self.patient_combo.currentData()
+        selected_doctor = self.doctor_combo.currentData()
+        
+        self.patient_combo.clear()
+        self.patient_combo.addItem(LANGUAGES[self.lang]['select_patient'], None)
+        self.doctor_combo.clear()
+        self.doctor_combo.addItem(LANGUAGES[self.lang]['select_doctor'], None)
+        for patient in patients:
+            self.patient_combo.addItem(patient['name'], patient['id'])
+        for doctor in doctors:
+            self.doctor_combo.addItem(doctor['name'], doctor['id'])
+        
+        self.patient_combo.setCurrentIndex(max(self.patient_combo.findData(selected_patient), 0))
+        self.doctor_combo.setCurrentIndex(max(self.doctor_combo.findData(selected_doctor), 0))
+
     def load_appointments(self):
         filters = {
             'patient_name': self.search_patient.text(),
@@ -287,63 +346,72 @@ class ManageAppointmentsPage(QWidget):
             'date': self.search_date.date().toString("yyyy-MM-dd") if self.search_date.date() else None
         }
         
-        appointments = self.db.get_appointments_with_details(filters)
-        self.appointments_table.setRowCount(len(appointments))
-        
-        for row_idx, appt in enumerate(appointments):
-            items = [
-                QTableWidgetItem(str(appt.get('id', ''))),
-                QTableWidgetItem(appt.get('patient_name', '')),
-                QTableWidgetItem(appt.get('doctor_name', '')),
-                QTableWidgetItem(appt.get('date', '')),
-                QTableWidgetItem(appt.get('time', '')),
-                QTableWidgetItem(appt.get('reason', '')),
-                QTableWidgetItem(appt.get('status', ''))
-            ]
-            
-            # Action buttons
-            edit_btn = QPushButton(LANGUAGES[self.lang]['edit_button'])
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #3b82f6;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #2563eb;
-                }
-            """)
-            edit_btn.clicked.connect(lambda _, a=appt: self.edit_appointment(a))
-            
-            cancel_text = LANGUAGES[self.lang]['cancel_button'] if appt['status'] != 'cancelled' else LANGUAGES[self.lang]['restore_button']
-            cancel_btn = QPushButton(cancel_text)
-            cancel_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #ef4444;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #dc2626;
-                }
-            """)
-            cancel_btn.clicked.connect(lambda _, a=appt: self.toggle_cancel_appointment(a))
-            
-            btn_widget = QWidget()
-            btn_layout = QHBoxLayout(btn_widget)
-            btn_layout.addWidget(edit_btn)
-            btn_layout.addWidget(cancel_btn)
-            btn_layout.setContentsMargins(0, 0, 0, 0)
-            
-            for col_idx, item in enumerate(items):
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                self.appointments_table.setItem(row_idx, col_idx, item)
-            
-            self.appointments_table.setCellWidget(row_idx, 7, btn_widget)
-        
-        self.appointments_table.resizeColumnsToContents()
+        self.current_filters = filters
+        self.appointments_model.set_query(
+            lambda cursor, page_size: self.db.get_appointments_page(filters, page_size, cursor)
+        )
+
+    def on_row_action(self, action, appointment):
+        if action == 'edit':
+            self.edit_appointment(appointment)
+        elif action == 'toggle_cancel':
+            self.toggle_cancel_appointment(appointment)
+
+    def on_db_change(self, change):
+        """Refresh only what another client changed"""
+        table = change.get('table')
+        if change.get('op') == 'RESYNC':
+            self.people_changes.add(change)
+            self.appointment_changes.add(change)
+        elif table in ('users', 'patients', 'doctors'):
+            self.people_changes.add(change)
+        elif table == 'appointments':
+            self.appointment_changes.add(change)
+
+    def refresh_changed_appointments(self, ids, reload):
+        """Fetch every appointment changed in the last burst in one query"""
+        if reload:
+            self.load_appointments()
+            return
+        if self.appointments_model.loader.is_loading() or self.loader.is_loading('appointment_changes'):
+            # A page or the previous batch is still loading and may predate
+            # these changes; try again once it has settled
+            self.appointment_changes.requeue(ids)
+            return
+        ids = sorted(ids)
+        # Filtered in SQL like the listing, so a changed row is shown exactly
+        # when the listing query would return it
+        self.loader.request(
+            'appointment_changes',
+            self.db.get_appointments_with_details, {**self.current_filters, 'ids': ids},
+            on_loaded=lambda rows: self.apply_appointment_changes(ids, rows)
+        )
+
+    def apply_appointment_changes(self, ids, rows):
+        by_id = {appt['id']: appt for appt in rows}
+        for appt_id in ids:
+            self.apply_appointment_change(appt_id, by_id.get(appt_id))
+
+    def apply_appointment_change(self, appt_id, appt):
+        """Update, insert or remove the single row for ``appt_id``.
+
+        ``appt`` is None when the row is gone or no longer matches the filters.
+        """
+        model = self.appointments_model
+        row_idx = model.find_row(lambda a: a['id'] == appt_id)
+        visible = appt is not None
+
+        if row_idx is not None and not visible:
+            model.remove_row(row_idx)
+        elif row_idx is not None:
+            model.set_row(row_idx, appt)
+        elif visible:
+            # Same order as the query: newest first
+            key = (appt['date'], appt['time'], appt['id'])
+            row_idx = sum(1 for a in model.rows() if (a['date'], a['time'], a['id']) > key)
+            # Past the last loaded row it belongs to a page that hasn't been fetched yet
+            if row_idx < model.rowCount() or not model.has_more():
+                model.insert_row(row_idx, appt)
         
     def edit_appointment(self, appointment):
         self.appointment_id.setText(str(appointment.get('id', '')))
@@ -385,10 +453,13 @@ class ManageAppointmentsPage(QWidget):
         
         if reply == QMessageBox.Yes:
             try:
-                self.db.update_appointment_status(appointment['id'], new_status)
+                if not self.db.update_appointment_status(appointment['id'], new_status):
+                    raise RuntimeError(LANGUAGES[self.lang]['save_failed'])
                 success_msg = LANGUAGES[self.lang]['appointment_cancelled'] if new_status == 'cancelled' else LANGUAGES[self.lang]['appointment_restored']
                 QMessageBox.information(self, LANGUAGES[self.lang]['success_title'], success_msg)
                 self.load_appointments()
+            except BookingConflict:
+                QMessageBox.warning(self, LANGUAGES[self.lang]['error_title'], LANGUAGES[self.lang]['slot_taken'])
             except Exception as e:
                 QMessageBox.critical(
                     self, 
@@ -420,7 +491,8 @@ class ManageAppointmentsPage(QWidget):
                     LANGUAGES[self.lang]['appointment_updated']
                 )
             else:  # Create new
-                self.db.add_appointment(appointment_data)
+                if self.db.add_appointment(appointment_data) is None:
+                    raise RuntimeError(LANGUAGES[self.lang]['save_failed'])
                 QMessageBox.information(
                     self, 
                     LANGUAGES[self.lang]['success_title'], 
@@ -429,6 +501,8 @@ class ManageAppointmentsPage(QWidget):
                 
             self.clear_form()
             self.load_appointments()
+        except BookingConflict:
+            QMessageBox.warning(self, LANGUAGES[self.lang]['error_title'], LANGUAGES[self.lang]['slot_taken'])
         except Exception as e:
             QMessageBox.critical(
                 self, 
@@ -1,4 +1,8 @@
 from .needs import *
+from ..loader import DataLoader
+from ..user_completer import UserSearchCompleter
+from ..delegates import ActionButtonDelegate
+from ..table_model import PagedTableModel, TableSortProxy
 
 BILLING_TRANSLATIONS = {
     'en': {
@@ -79,6 +83,7 @@ class ManageBillingPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -124,6 +129,8 @@ class ManageBillingPage(QWidget):
         
         self.search_patient = QLineEdit()
         self.search_patient.setPlaceholderText(BILLING_TRANSLATIONS[self.lang]['filters']['patient_placeholder'])
+        # Suggestions use the same fuzzy name matching as the filter
+        UserSearchCompleter(self.search_patient, self.db, 'patient', self.loader)
         
         self.search_date_from = QDateEdit()
         self.search_date_from.setDisplayFormat("yyyy-MM-dd")
@@ -181,16 +188,39 @@ class ManageBillingPage(QWidget):
         self.layout.addWidget(filter_group)
         
     def setup_billing_table(self):
-        self.billing_table = QTableWidget()
-        self.billing_table.setColumnCount(9)
-        self.billing_table.setHorizontalHeaderLabels(
-            BILLING_TRANSLATIONS[self.lang]['table_headers']
-        )
+        headers = BILLING_TRANSLATIONS[self.lang]['table_headers']
+        self.billing_model = PagedTableModel([
+            (headers[0], 'id'),
+            (headers[1], 'patient_name'),
+            (headers[2], 'date'),
+            (headers[3], self.format_amount),
+            (headers[4], 'status'),
+            (headers[5], 'payment_method'),
+            (headers[6], 'payment_date'),
+            (headers[7], 'appointment_id'),
+            (headers[8], None)
+        ], parent=self)
+        self.billing_proxy = TableSortProxy(self.billing_model, self)
+
+        self.billing_table = QTableView()
+        self.billing_table.setModel(self.billing_proxy)
+        self.billing_table.setSortingEnabled(True)
         self.billing_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.billing_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.billing_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.billing_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.billing_table.setSelectionBehavior(QTableView.SelectRows)
+
+        self.billing_actions = ActionButtonDelegate([
+            ('mark_paid', BILLING_TRANSLATIONS[self.lang]['buttons']['mark_paid'], 'green')
+        ], self.billing_proxy.row_at, self)
+        self.billing_actions.clicked.connect(self.on_row_action)
+        self.billing_table.setItemDelegateForColumn(8, self.billing_actions)
+        self.billing_table.setMouseTracking(True)
         
         self.layout.addWidget(self.billing_table)
+
+    def format_amount(self, bill):
+        amount = float(bill.get('amount') or 0)
+        return f"{amount:.2f}₽" if self.lang == 'ru' else f"${amount:.2f}"
         
     def setup_summary_section(self):
         summary_group = QGroupBox(BILLING_TRANSLATIONS[self.lang]['summary']['title'])
@@ -217,76 +247,33 @@ class ManageBillingPage(QWidget):
         self.layout.addWidget(summary_group)
         
     def load_billing(self):
+        status_index = self.search_status.currentIndex()
         filters = {
             'patient_name': self.search_patient.text(),
             'date_from': self.search_date_from.date().toString("yyyy-MM-dd"),
             'date_to': self.search_date_to.date().toString("yyyy-MM-dd"),
-            'status': self.search_status.currentText() if self.search_status.currentText() != BILLING_TRANSLATIONS[self.lang]['filters']['status_options'][0] else None
+            # Status values are stored in English whatever the UI language
+            'status': BILLING_TRANSLATIONS['en']['filters']['status_options'][status_index] if status_index > 0 else None
         }
         
-        bills = self.db.get_billing_with_details()
-        self.billing_table.setRowCount(len(bills))
-        
-        total = 0
-        paid = 0
-        pending = 0
-        
-        for row_idx, bill in enumerate(bills):
-            amount = float(bill.get('amount', 0))
-            status = bill.get('status', '')
-            
-            total += amount
-            if status == 'paid':
-                paid += amount
-            elif status == 'pending':
-                pending += amount
-            
-            items = [
-                QTableWidgetItem(str(bill.get('id', ''))),
-                QTableWidgetItem(bill.get('patient_name', '')),
-                QTableWidgetItem(bill.get('date', '')),
-                QTableWidgetItem(f"{amount:.2f}₽" if self.lang == 'ru' else f"${amount:.2f}"),
-                QTableWidgetItem(status),
-                QTableWidgetItem(bill.get('payment_method', '')),
-                QTableWidgetItem(bill.get('payment_date', '')),
-                QTableWidgetItem(str(bill.get('appointment_id', '')))
-            ]
-            
-            # Action buttons
-            mark_paid_btn = QPushButton(BILLING_TRANSLATIONS[self.lang]['buttons']['mark_paid'])
-            mark_paid_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #10b981;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #059669;
-                }
-            """)
-            mark_paid_btn.clicked.connect(lambda _, b=bill: self.mark_bill_paid(b))
-            
-            btn_widget = QWidget()
-            btn_layout = QHBoxLayout(btn_widget)
-            btn_layout.addWidget(mark_paid_btn)
-            btn_layout.setContentsMargins(0, 0, 0, 0)
-            
-            for col_idx, item in enumerate(items):
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                self.billing_table.setItem(row_idx, col_idx, item)
-            
-            self.billing_table.setCellWidget(row_idx, 8, btn_widget)
-        
-        # Update summary with proper currency
-        currency_format = {
-            'en': '${amount:.2f}',
-            'ru': '{amount:.2f}₽'
-        }
-        
-        self.total_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['total'].format(amount=total))
-        self.paid_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['paid'].format(amount=paid))
-        self.pending_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['pending'].format(amount=pending))
+        self.billing_model.set_query(
+            lambda cursor, page_size: self.db.get_billing_page(filters, page_size, cursor)
+        )
+        self.loader.request(
+            'summary',
+            self.db.get_billing_summary, filters,
+            on_loaded=self.populate_summary
+        )
+
+    def on_row_action(self, action, bill):
+        if action == 'mark_paid':
+            self.mark_bill_paid(bill)
+
+    def populate_summary(self, summary):
+        """Totals come from the database, since only part of the bills may be loaded"""
+        self.total_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['total'].format(amount=float(summary['total'])))
+        self.paid_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['paid'].format(amount=float(summary['paid'])))
+        self.pending_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['pending'].format(amount=float(summary['pending'])))
         self.overdue_label.setText(BILLING_TRANSLATIONS[self.lang]['summary']['overdue'].format(amount=0))
         
     def mark_bill_paid(self, bill):
@@ -1,4 +1,7 @@
 from .needs import *
+from ..loader import DataLoader
+from ..delegates import ActionButtonDelegate
+from ..table_model import PagedTableModel, TableSortProxy
 
 LANGUAGES = {
     'en': {
@@ -75,6 +78,7 @@ class ManageDoctorsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -114,14 +118,31 @@ class ManageDoctorsPage(QWidget):
         self.layout.addLayout(header)
         
     def setup_doctor_table(self):
-        self.doctors_table = QTableWidget()
-        self.doctors_table.setColumnCount(6)
-        self.doctors_table.setHorizontalHeaderLabels(
-            LANGUAGES[self.lang]['table_headers']
-        )
+        headers = LANGUAGES[self.lang]['table_headers']
+        self.doctors_model = PagedTableModel([
+            (headers[0], 'id'),
+            (headers[1], 'name'),
+            (headers[2], 'specialization'),
+            (headers[3], 'department'),
+            (headers[4], lambda d: d.get('status', LANGUAGES[self.lang]['statuses'][0])),
+            (headers[5], None)
+        ], parent=self)
+        self.doctors_proxy = TableSortProxy(self.doctors_model, self)
+
+        self.doctors_table = QTableView()
+        self.doctors_table.setModel(self.doctors_proxy)
+        self.doctors_table.setSortingEnabled(True)
         self.doctors_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.doctors_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.doctors_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.doctors_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.doctors_table.setSelectionBehavior(QTableView.SelectRows)
+
+        self.doctors_actions = ActionButtonDelegate([
+            ('edit', LANGUAGES[self.lang]['buttons']['edit'], 'blue'),
+            ('delete', LANGUAGES[self.lang]['buttons']['delete'], 'red')
+        ], self.doctors_proxy.row_at, self)
+        self.doctors_actions.clicked.connect(self.on_row_action)
+        self.doctors_table.setItemDelegateForColumn(5, self.doctors_actions)
+        self.doctors_table.setMouseTracking(True)
         
         self.layout.addWidget(self.doctors_table)
         
@@ -209,61 +230,22 @@ class ManageDoctorsPage(QWidget):
         self.layout.addWidget(group)
         
     def load_doctors(self):
-        doctors = self.db.get_all_doctors()
-        self.doctors_table.setRowCount(len(doctors))
-        
-        for row_idx, doctor in enumerate(doctors):
-            items = [
-                QTableWidgetItem(str(doctor.get('id', ''))),
-                QTableWidgetItem(doctor['name']),
-                QTableWidgetItem(doctor['specialization']),
-                QTableWidgetItem(doctor['department']),
-                QTableWidgetItem(doctor.get('status', LANGUAGES[self.lang]['statuses'][0]))
-            ]
-            
-            # Action buttons
-            edit_btn = QPushButton(LANGUAGES[self.lang]['buttons']['edit'])
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #3b82f6;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #2563eb;
-                }
-            """)
-            edit_btn.clicked.connect(lambda _, d=doctor: self.edit_doctor(d))
-            
-            delete_btn = QPushButton(LANGUAGES[self.lang]['buttons']['delete'])
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #ef4444;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #dc2626;
-                }
-            """)
-            delete_btn.clicked.connect(lambda _, d=doctor: self.delete_doctor(d))
-            
-            btn_widget = QWidget()
-            btn_layout = QHBoxLayout(btn_widget)
-            btn_layout.addWidget(edit_btn)
-            btn_layout.addWidget(delete_btn)
-            btn_layout.setContentsMargins(0, 0, 0, 0)
-            
-            for col_idx, item in enumerate(items):
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                self.doctors_table.setItem(row_idx, col_idx, item)
-            
-            self.doctors_table.setCellWidget(row_idx, 5, btn_widget)
-        
-        self.doctors_table.resizeColumnsToContents()
-        
+        self.loader.request(
+            'doctors',
+            self.db.get_all_doctors,
+            on_loaded=self.populate_doctors
+        )
+
+    def populate_doctors(self, doctors):
+        # The doctor list is small and cached, so it's loaded in one go
+        self.doctors_model.set_rows(doctors)
+
+    def on_row_action(self, action, doctor):
+        if action == 'edit':
+            self.edit_doctor(doctor)
+        elif action == 'delete':
+            self.delete_doctor(doctor)
+
     def edit_doctor(self, doctor):
         self.doctor_id.setText(str(doctor.get('id', '')))
         self.doctor_name.setText(doctor['name'])
@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QTableWidget, QTableWidgetItem, QPushButton,
+                            QTableWidget, QTableWidgetItem, QTableView, QPushButton,
                             QFormLayout, QLineEdit, QComboBox, QDateEdit, QFileDialog,
                             QTextEdit, QTabWidget, QMessageBox, QHeaderView, QGroupBox)
 from PyQt5.QtCore import Qt, QDate
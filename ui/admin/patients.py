@@ -1,5 +1,6 @@
 from .needs import *
-from datetime import date
+from ..delegates import ActionButtonDelegate
+from ..table_model import PagedTableModel, TableSortProxy
 
 LANGUAGES = {
     'en': {
@@ -118,14 +119,30 @@ class ManagePatientsPage(QWidget):
         self.layout.addLayout(header)
         
     def setup_patient_table(self):
-        self.patients_table = QTableWidget()
-        self.patients_table.setColumnCount(5)
-        self.patients_table.setHorizontalHeaderLabels(
-            LANGUAGES[self.lang]['table_headers']
-        )
+        headers = LANGUAGES[self.lang]['table_headers']
+        self.patients_model = PagedTableModel([
+            (headers[0], 'id'),
+            (headers[1], 'name'),
+            (headers[2], self.patient_age),
+            (headers[3], 'phone'),
+            (headers[4], None)
+        ], parent=self)
+        self.patients_proxy = TableSortProxy(self.patients_model, self)
+
+        self.patients_table = QTableView()
+        self.patients_table.setModel(self.patients_proxy)
+        self.patients_table.setSortingEnabled(True)
         self.patients_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.patients_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.patients_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.patients_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.patients_table.setSelectionBehavior(QTableView.SelectRows)
+
+        self.patients_actions = ActionButtonDelegate([
+            ('edit', LANGUAGES[self.lang]['buttons']['edit'], 'blue'),
+            ('delete', LANGUAGES[self.lang]['buttons']['delete'], 'red')
+        ], self.patients_proxy.row_at, self)
+        self.patients_actions.clicked.connect(self.on_row_action)
+        self.patients_table.setItemDelegateForColumn(4, self.patients_actions)
+        self.patients_table.setMouseTracking(True)
         
         self.layout.addWidget(self.patients_table)
         
@@ -220,69 +237,22 @@ class ManagePatientsPage(QWidget):
         self.layout.addWidget(group)
         
     def load_patients(self):
-        patients = self.db.get_all_patients()
-        self.patients_table.setRowCount(len(patients))
-        
-        for row_idx, patient in enumerate(patients):
-            dob_python = patient.get('date_of_birth', None)
-            
-            if dob_python and isinstance(dob_python, date):
-                dob_str = dob_python.strftime("%Y-%m-%d")
-                dob = QDate.fromString(dob_str, "yyyy-MM-dd")
-                age = QDate.currentDate().year() - dob.year() if dob.isValid() else LANGUAGES[self.lang]['messages']['age_na']
-            else:
-                age = LANGUAGES[self.lang]['messages']['age_na']
-            
-            items = [
-                QTableWidgetItem(str(patient.get('id', ''))),
-                QTableWidgetItem(patient['name']),
-                QTableWidgetItem(str(age)),
-                QTableWidgetItem(patient.get('phone', ''))
-            ]
-            
-            # Action buttons
-            edit_btn = QPushButton(LANGUAGES[self.lang]['buttons']['edit'])
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #3b82f6;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #2563eb;
-                }
-            """)
-            edit_btn.clicked.connect(lambda _, p=patient: self.edit_patient(p))
-            
-            delete_btn = QPushButton(LANGUAGES[self.lang]['buttons']['delete'])
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #ef4444;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                }
-                QPushButton:hover {
-                    background-color: #dc2626;
-                }
-            """)
-            delete_btn.clicked.connect(lambda _, p=patient: self.delete_patient(p))
-            
-            btn_widget = QWidget()
-            btn_layout = QHBoxLayout(btn_widget)
-            btn_layout.addWidget(edit_btn)
-            btn_layout.addWidget(delete_btn)
-            btn_layout.setContentsMargins(0, 0, 0, 0)
-            
-            for col_idx, item in enumerate(items):
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                self.patients_table.setItem(row_idx, col_idx, item)
-            
-            self.patients_table.setCellWidget(row_idx, 4, btn_widget)
-        
-        self.patients_table.resizeColumnsToContents()
-        
+        self.patients_model.set_query(
+            lambda cursor, page_size: self.db.get_patients_page(page_size, cursor)
+        )
+
+    def patient_age(self, patient):
+        dob = patient.get('date_of_birth')
+        if dob is None:
+            return LANGUAGES[self.lang]['messages']['age_na']
+        return QDate.currentDate().year() - dob.year
+
+    def on_row_action(self, action, patient):
+        if action == 'edit':
+            self.edit_patient(patient)
+        elif action == 'delete':
+            self.delete_patient(patient)
+
     def edit_patient(self, patient):
         self.patient_id.setText(str(patient.get('id', '')))
         self.patient_name.setText(patient['name'])
@@ -293,9 +263,9 @@ class ManagePatientsPage(QWidget):
         if index >= 0:
             self.patient_gender.setCurrentIndex(index)
             
-        if 'date_of_birth' in patient and patient['date_of_birth']:
-            dob_str = patient['date_of_birth'].strftime("%Y-%m-%d") if isinstance(patient['date_of_birth'], date) else patient['date_of_birth']
-            self.patient_dob.setDate(QDate.fromString(dob_str, "yyyy-MM-dd"))
+        dob = patient.get('date_of_birth')
+        if dob:
+            self.patient_dob.setDate(QDate(dob.year, dob.month, dob.day))
             
         index = self.patient_blood_type.findText(patient.get('blood_type', LANGUAGES[self.lang]['blood_types'][-1]))
         if index >= 0:
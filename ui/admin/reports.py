@@ -2,7 +2,10 @@ from .needs import *
 from PyQt5.QtWidgets import QFileDialog
 from PyQt5.QtCore import Qt, QDate
 import csv
-from datetime import datetime, timedelta
+import os
+
+import report_analytics
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -44,8 +47,12 @@ LANGUAGES = {
             'summary': {
                 'patients': 'Total Patients: {total} | Active Patients: {active}',
                 'doctors': 'Total Appointments: {total} | Avg Completion Rate: {rate:.1f}%',
-                'prescriptions': 'Total Prescriptions: {total} | Top Medications: {meds}'
-            }
+                'prescriptions': 'Total Prescriptions: {total} | Top Medications: {meds}',
+                'financial': 'Revenue: ${total:.2f} | Paid: ${paid:.2f} | Pending: ${pending:.2f}'
+            },
+            'snapshot': 'Figures as of {time}',
+            'snapshot_mixed': 'Totals as of {time}; the rows are live',
+            'refreshing': ' (updating...)'
         },
         'scheduled': 'scheduled',
         'completed': 'completed',
@@ -96,8 +103,12 @@ LANGUAGES = {
             'summary': {
                 'patients': 'Всего пациентов: {total} | Активных: {active}',
                 'doctors': 'Всего записей: {total} | Средний процент завершения: {rate:.1f}%',
-                'prescriptions': 'Всего рецептов: {total} | Популярные лекарства: {meds}'
-            }
+                'prescriptions': 'Всего рецептов: {total} | Популярные лекарства: {meds}',
+                'financial': 'Выручка: {total:.2f}₽ | Оплачено: {paid:.2f}₽ | Ожидает: {pending:.2f}₽'
+            },
+            'snapshot': 'Данные на {time}',
+            'snapshot_mixed': 'Итоги на {time}; строки — текущие данные',
+            'refreshing': ' (обновляется...)'
         },
         'scheduled': 'запланировано',
         'completed': 'завершено',
@@ -117,6 +128,15 @@ class ReportsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
+        # Refreshes run apart from the report loader, and without its busy cursor
+        self.refresher = DataLoader()
+        self.last_report = None
+        # With NumPy installed the figures are computed on the client from
+        # columnar fetches (live data); REPORT_ANALYTICS=sql keeps them in
+        # the database and its report views
+        self.client_analytics = (report_analytics.AVAILABLE
+                                 and os.getenv('REPORT_ANALYTICS', 'client') != 'sql')
         self.init_ui()
         
     def init_ui(self):
@@ -226,8 +246,13 @@ class ReportsPage(QWidget):
         self.summary_label.setStyleSheet("font-size: 14px; font-weight: bold;")
         self.summary_label.setAlignment(Qt.AlignRight)
         
+        self.freshness_label = QLabel()
+        self.freshness_label.setStyleSheet("font-size: 12px; color: #6b7280;")
+        self.freshness_label.setAlignment(Qt.AlignRight)
+        
         self.layout.addWidget(self.results_table)
         self.layout.addWidget(self.summary_label)
+        self.layout.addWidget(self.freshness_label)
         
     def generate_report(self):
         report_type_index = self.report_type.currentIndex()
@@ -236,25 +261,83 @@ class ReportsPage(QWidget):
         
         date_range_index = self.date_range.currentIndex()
         date_range = LANGUAGES[self.lang]['date_ranges'][date_range_index]
+        from_date, to_date = self.get_dates(date_range)
         
+        # (fetch on a worker thread, render on the GUI thread; the last item
+        # is the freshness message of reports that read the materialized
+        # report views: 'snapshot' if all of it does, 'snapshot_mixed' if
+        # only the totals do)
+        reports = {
+            report_types[0]: (self.fetch_financial_report, self.show_financial_report, 'snapshot_mixed'),     # Financial Summary
+            report_types[1]: (self.fetch_patient_report, self.show_patient_report, None),                     # Patient Statistics
+            report_types[2]: (self.fetch_doctor_report, self.show_doctor_report, 'snapshot'),                 # Doctor Performance
+            report_types[3]: (self.fetch_appointment_report, self.show_appointment_report, None),             # Appointment Analysis
+            report_types[4]: (self.fetch_prescription_report, self.show_prescription_report, 'snapshot_mixed'),  # Prescription Report
+        }
+        if self.client_analytics:
+            reports.update({
+                report_types[0]: (self.analyse_financial_report, self.show_financial_report, None),
+                report_types[1]: (self.analyse_patient_report, self.show_patient_report, None),
+                report_types[2]: (self.analyse_doctor_report, self.show_doctor_report, None),
+                report_types[4]: (self.analyse_prescription_report, self.show_prescription_report, None),
+            })
+        if report_type not in reports:
+            return
+        self.last_report = (*reports[report_type], from_date, to_date)
+        self.run_report()
+
+    def run_report(self):
+        fetch, show, snapshot, from_date, to_date = self.last_report
+        self.loader.request(
+            'report',
+            self.fetch_report, fetch, from_date, to_date, snapshot is not None,
+            on_loaded=lambda result: self.show_report(show, snapshot, *result),
+            on_failed=self.show_report_error
+        )
+        if snapshot and not self.refresher.is_loading():
+            # Never waited for: the report shows the current snapshot now and
+            # is fetched again if this brings in a newer one
+            self.refresher.request(
+                'refresh', self.db.refresh_report_views,
+                on_loaded=self.on_views_refreshed
+            )
+
+    def fetch_report(self, fetch, from_date, to_date, uses_snapshot):
+        """Run ``fetch``, noting when the report views it reads were refreshed"""
+        refreshed_at = self.db.get_report_freshness() if uses_snapshot else None
+        return fetch(from_date, to_date), refreshed_at
+
+    def on_views_refreshed(self, refreshed):
+        if self.last_report and self.last_report[2]:
+            if refreshed:
+                self.run_report()
+            else:
+                # Fresh enough already, or another client is refreshing
+                self.freshness_label.setText(self.freshness_label.text().replace(
+                    LANGUAGES[self.lang]['messages']['refreshing'], ''
+                ))
+
+    def show_report(self, show, snapshot, data, refreshed_at):
+        self.summary_label.clear()
+        freshness = ""
+        if snapshot:
+            messages = LANGUAGES[self.lang]['messages']
+            time = refreshed_at.strftime("%Y-%m-%d %H:%M") if refreshed_at else "-"
+            freshness = messages[snapshot].format(time=time)
+            if self.refresher.is_loading():
+                freshness += messages['refreshing']
+        self.freshness_label.setText(freshness)
         try:
-            if report_type == report_types[0]:  # Financial Summary
-                self.generate_financial_report(date_range)
-            elif report_type == report_types[1]:  # Patient Statistics
-                self.generate_patient_report(date_range)
-            elif report_type == report_types[2]:  # Doctor Performance
-                self.generate_doctor_report(date_range)
-            elif report_type == report_types[3]:  # Appointment Analysis
-                self.generate_appointment_report(date_range)
-            elif report_type == report_types[4]:  # Prescription Report
-                self.generate_prescription_report(date_range)
-                
+            show(data)
         except Exception as e:
-            QMessageBox.critical(
-                self, 
-                LANGUAGES[self.lang]['messages']['report_error'].split(':')[0],
-                LANGUAGES[self.lang]['messages']['report_error'].format(error=str(e))
-            )
+            self.show_report_error(e)
+
+    def show_report_error(self, error):
+        QMessageBox.critical(
+            self, 
+            LANGUAGES[self.lang]['messages']['report_error'].split(':')[0],
+            LANGUAGES[self.lang]['messages']['report_error'].format(error=str(error))
+        )
     
     def get_dates(self, date_range):
         today = QDate.currentDate()
@@ -284,14 +367,17 @@ class ReportsPage(QWidget):
             )
         return (None, None)
     
-    def generate_financial_report(self, date_range):
-        from_date, to_date = self.get_dates(date_range)
-        
-        bills = self.db.get_billing_with_details({
-            'date_from': from_date,
-            'date_to': to_date
-        })
-        
+    def fetch_financial_report(self, from_date, to_date):
+        return {
+            'bills': self.db.get_billing_with_details({
+                'date_from': from_date,
+                'date_to': to_date
+            }),
+            'revenue': self.db.get_revenue_summary(from_date, to_date)
+        }
+
+    def show_financial_report(self, report):
+        bills = report['bills']
         headers = LANGUAGES[self.lang]['table_headers']['financial']
         self.results_table.setColumnCount(len(headers))
         self.results_table.setHorizontalHeaderLabels(headers)
@@ -311,93 +397,55 @@ class ReportsPage(QWidget):
             for col_idx, item in enumerate(items):
                 item.setFlags(item.flags() & ~Qt.ItemIsEditable)
                 self.results_table.setItem(row_idx, col_idx, item)
+        
+        revenue = report['revenue']
+        self.summary_label.setText(
+            LANGUAGES[self.lang]['messages']['summary']['financial'].format(
+                total=float(revenue['total']),
+                paid=float(revenue['paid']),
+                pending=float(revenue['pending'])
+            )
+        )
     
-    def generate_patient_report(self, date_range):
-        from_date, to_date = self.get_dates(date_range)
-        patients = self.db.get_all_patients()
-        appointments = self.db.get_all_appointments()
-
-        patient_stats = []
-
-        for patient in patients:
-            patient_appointments = []
-            for appt in appointments:
-                if appt['patient_id'] == patient['id']:
-                    try:
-                        # Get appointment date
-                        appt_date = appt['date']
+    def analyse_financial_report(self, from_date, to_date):
+        return {
+            'bills': self.db.get_billing_with_details({
+                'date_from': from_date,
+                'date_to': to_date
+            }),
+            'revenue': report_analytics.financial_summary(self.db.get_bill_columns(from_date, to_date))
+        }
 
-                        # Normalize appt_date to datetime.date
-                        if isinstance(appt_date, str):
-                            appt_date = datetime.strptime(appt_date, "%Y-%m-%d").date()
-                        elif isinstance(appt_date, datetime):
-                            appt_date = appt_date.date()
+    def fetch_patient_report(self, from_date, to_date):
+        return self.db.get_patient_report(from_date, to_date)
 
-                        # Normalize from_date and to_date if needed
-                        fd = from_date
-                        td = to_date
-
-                        # Optional: convert from_date/to_date from string to date if passed as string
-                        if isinstance(fd, str):
-                            fd = datetime.strptime(fd, "%Y-%m-%d").date()
-                        if isinstance(td, str):
-                            td = datetime.strptime(td, "%Y-%m-%d").date()
-
-                        # Now all dates are datetime.date objects - safe to compare
-                        include = True
-                        if fd is not None and appt_date < fd:
-                            include = False
-                        if td is not None and appt_date > td:
-                            include = False
-
-                        if include:
-                            patient_appointments.append(appt)
-
-                    except Exception as e:
-                        print("Error parsing appointment date:", e)
-                        continue
-
-            # Handle last visit
-            if patient_appointments:
-                last_visit_date = max(a['date'] for a in patient_appointments)
-
-                if isinstance(last_visit_date, str):
-                    last_visit_date = datetime.strptime(last_visit_date, "%Y-%m-%d").date()
-                elif isinstance(last_visit_date, datetime):
-                    last_visit_date = last_visit_date.date()
-
-                last_visit = last_visit_date.strftime("%Y-%m-%d")
-            else:
-                last_visit = LANGUAGES[self.lang]['messages']['summary']['patients'].split('|')[0].split(':')[0] + 'Never'
-
-            patient_stats.append({
-                'id': patient['id'],
-                'name': patient['name'],
-                'appointments': len(patient_appointments),
-                'last_visit': last_visit
-            })
+    def analyse_patient_report(self, from_date, to_date):
+        return report_analytics.patient_report(
+            self.db.get_patient_columns(),
+            self.db.get_appointment_columns(from_date, to_date)
+        )
 
+    def show_patient_report(self, patient_stats):
+        never = LANGUAGES[self.lang]['messages']['summary']['patients'].split('|')[0].split(':')[0] + 'Never'
         headers = LANGUAGES[self.lang]['table_headers']['patient']
         self.results_table.setColumnCount(len(headers))
         self.results_table.setHorizontalHeaderLabels(headers)
         self.results_table.setRowCount(len(patient_stats))
         
         for row_idx, stat in enumerate(patient_stats):
-            age = self.calculate_age(patient['date_of_birth']) if 'date_of_birth' in patient else ""
-            
             items = [
                 QTableWidgetItem(str(stat['id'])),
                 QTableWidgetItem(stat['name']),
-                QTableWidgetItem(age),
+                QTableWidgetItem("" if stat['age'] is None else str(stat['age'])),
                 QTableWidgetItem(str(stat['appointments'])),
-                QTableWidgetItem(stat['last_visit'])
+                QTableWidgetItem(stat['last_visit'].strftime("%Y-%m-%d") if stat['last_visit'] else never)
             ]
             
             for col_idx, item in enumerate(items):
                 item.setFlags(item.flags() & ~Qt.ItemIsEditable)
                 self.results_table.setItem(row_idx, col_idx, item)
         
-        total_patients = len(patients)
+        total_patients = len(patient_stats)
         active_patients = len([p for p in patient_stats if p['appointments'] > 0])
         
         self.summary_label.setText(
@@ -407,48 +455,16 @@ class ReportsPage(QWidget):
             )
         )
     
-    def calculate_age(self, dob):
-        try:
-            if isinstance(dob, str):
-                dob_date = QDate.fromString(dob, "yyyy-MM-dd")
-            else:
-                dob_date = QDate(dob.year, dob.month, dob.day)
-            return str(QDate.currentDate().year() - dob_date.year())
-        except:
-            return "N/A"
-    
-    def generate_doctor_report(self, date_range):
-        from_date, to_date = self.get_dates(date_range)
-        doctors = self.db.get_all_doctors()
-        appointments = self.db.get_all_appointments()
-        
-        doctor_stats = []
-        for doctor in doctors:
-            doctor_appointments = []
-            for appt in appointments:
-                if appt['doctor_id'] == doctor['id']:
-                    try:
-                        appt_date = appt['date'] if isinstance(appt['date'], str) else appt['date'].strftime("%Y-%m-%d")
-                        if (from_date is None or appt_date >= from_date) and \
-                           (to_date is None or appt_date <= to_date):
-                            doctor_appointments.append(appt)
-                    except:
-                        continue
-            
-            completed = len([a for a in doctor_appointments if a['status'] == 'completed'])
-            cancelled = len([a for a in doctor_appointments if a['status'] == 'cancelled'])
-            
-            rate = completed / len(doctor_appointments) * 100 if doctor_appointments else 0
-            doctor_stats.append({
-                'id': doctor['id'],
-                'name': doctor['name'],
-                'specialization': doctor['specialization'],
-                'appointments': len(doctor_appointments),
-                'completed': completed,
-                'cancelled': cancelled,
-                'completion_rate': f"{rate:.1f}%"
-            })
-        
+    def fetch_doctor_report(self, from_date, to_date):
+        return self.db.get_doctor_report(from_date, to_date)
+
+    def analyse_doctor_report(self, from_date, to_date):
+        return report_analytics.doctor_report(
+            self.db.get_doctor_columns(),
+            self.db.get_appointment_columns(from_date, to_date)
+        )
+
+    def show_doctor_report(self, doctor_stats):
         headers = LANGUAGES[self.lang]['table_headers']['doctor']
         self.results_table.setColumnCount(len(headers))
         self.results_table.setHorizontalHeaderLabels(headers)
@@ -462,7 +478,7 @@ class ReportsPage(QWidget):
                 QTableWidgetItem(str(stat['appointments'])),
                 QTableWidgetItem(str(stat['completed'])),
                 QTableWidgetItem(str(stat['cancelled'])),
-                QTableWidgetItem(stat['completion_rate'])
+                QTableWidgetItem(f"{float(stat['completion_rate']):.1f}%")
             ]
             
             for col_idx, item in enumerate(items):
@@ -470,7 +486,7 @@ class ReportsPage(QWidget):
                 self.results_table.setItem(row_idx, col_idx, item)
         
         total_appointments = sum(d['appointments'] for d in doctor_stats)
-        avg_completion = sum(float(d['completion_rate'].strip('%')) for d in doctor_stats) / len(doctors) if doctors else 0
+        avg_completion = sum(float(d['completion_rate']) for d in doctor_stats) / len(doctor_stats) if doctor_stats else 0
         
         self.summary_label.setText(
             LANGUAGES[self.lang]['messages']['summary']['doctors'].format(
@@ -479,16 +495,16 @@ class ReportsPage(QWidget):
             )
         )
     
-    def generate_appointment_report(self, date_range):
-        from_date, to_date = self.get_dates(date_range)
+    def fetch_appointment_report(self, from_date, to_date):
         filters = {}
         if from_date:
             filters['date_from'] = from_date
         if to_date:
             filters['date_to'] = to_date
             
-        appointments = self.db.get_appointments_with_details(filters)
-        
+        return self.db.get_appointments_with_details(filters)
+
+    def show_appointment_report(self, appointments):
         headers = LANGUAGES[self.lang]['table_headers']['appointment']
         self.results_table.setColumnCount(len(headers))
         self.results_table.setHorizontalHeaderLabels(headers)
@@ -510,24 +526,22 @@ class ReportsPage(QWidget):
                 item.setFlags(item.flags() & ~Qt.ItemIsEditable)
                 self.results_table.setItem(row_idx, col_idx, item)
     
-    def generate_prescription_report(self, date_range):
-        from_date, to_date = self.get_dates(date_range)
-        prescriptions = self.db.get_all_prescriptions()
-        
-        filtered_prescriptions = []
-        for rx in prescriptions:
-            try:
-                rx_date = rx['date'] if isinstance(rx['date'], str) else rx['date'].strftime("%Y-%m-%d")
-                if (from_date is None or rx_date >= from_date) and \
-                   (to_date is None or rx_date <= to_date):
-                    filtered_prescriptions.append(rx)
-            except:
-                continue
-        
-        med_counts = {}
-        for p in filtered_prescriptions:
-            med = p['medication']
-            med_counts[med] = med_counts.get(med, 0) + 1
+    def fetch_prescription_report(self, from_date, to_date):
+        return {
+            'prescriptions': self.db.get_prescriptions_in_range(from_date, to_date),
+            'top_medications': self.db.get_top_medications(from_date, to_date, limit=3)
+        }
+
+    def analyse_prescription_report(self, from_date, to_date):
+        return {
+            'prescriptions': self.db.get_prescriptions_in_range(from_date, to_date),
+            'top_medications': report_analytics.top_medications(
+                self.db.get_prescription_columns(from_date, to_date), limit=3
+            )
+        }
+
+    def show_prescription_report(self, report):
+        filtered_prescriptions = report['prescriptions']
         
         headers = LANGUAGES[self.lang]['table_headers']['prescription']
         self.results_table.setColumnCount(len(headers))
@@ -549,8 +563,7 @@ class ReportsPage(QWidget):
                 item.setFlags(item.flags() & ~Qt.ItemIsEditable)
                 self.results_table.setItem(row_idx, col_idx, item)
         
-        top_meds = sorted(med_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-        med_summary = " | ".join(f"{med}: {count}" for med, count in top_meds)
+        med_summary = " | ".join(f"{m['medication']}: {m['count']}" for m in report['top_medications'])
         
         self.summary_label.setText(
             LANGUAGES[self.lang]['messages']['summary']['prescriptions'].format(
@@ -97,6 +97,24 @@ class AdminDashboard(Dashboard):
             QWidget().setLayout(self.layout())
 
         super().init_ui()
+        self.loader.request('dashboard', self.fetch_data, on_loaded=self.on_data_loaded)
+
+    def fetch_data(self):
+        """Fetch everything the dashboard shows (runs on a worker thread)"""
+        kpis = self.db.get_admin_kpis()
+        return {
+            'new_doctors': self.db.get_last_doctors(),
+            'new_patients': self.db.get_last_patients(),
+            'new_appointments': self.db.get_last_appointments(),
+            'new_bills': self.db.get_last_bills(),
+            'total_doctors': kpis['total_doctors'],
+            'total_patients': kpis['total_patients'],
+            'today_appointments': kpis['today_appointments'],
+            'monthly_revenue': float(kpis['monthly_revenue'])
+        }
+
+    def on_data_loaded(self, data):
+        self.data = data
         self.load_activities()
         self.setup_ui_components()
 
@@ -126,11 +144,10 @@ class AdminDashboard(Dashboard):
             """Combine DATE and TIME fields into a single datetime object."""
             return datetime.combine(record['creation_date'], record['creation_time'])
 
-        # Fetch data from database
-        self.new_doctors = self.db.get_last_doctors()
-        self.new_patients = self.db.get_last_patients()
-        self.new_appointments = self.db.get_last_appointments()
-        self.new_bills = self.db.get_last_bills()
+        self.new_doctors = self.data['new_doctors']
+        self.new_patients = self.data['new_patients']
+        self.new_appointments = self.data['new_appointments']
+        self.new_bills = self.data['new_bills']
 
         temp_activities = []
         messages = DASHBOARD_TRANSLATIONS[self.lang]['activity_messages']
@@ -217,12 +234,10 @@ class AdminDashboard(Dashboard):
     def setup_stats_cards(self):
         cards_layout = QHBoxLayout()
 
-        total_doctors = len(self.db.get_all_doctors())
-        total_patients = len(self.db.get_all_patients())
-        today_appointments = len([a for a in self.db.get_all_appointments() 
-                                if a['date'] == datetime.now().strftime('%Y-%m-%d')])
-        monthly_revenue = sum(b['amount'] for b in self.db.get_all_bills() 
-                            if b['date'].year == (datetime.now().year))
+        total_doctors = self.data['total_doctors']
+        total_patients = self.data['total_patients']
+        today_appointments = self.data['today_appointments']
+        monthly_revenue = self.data['monthly_revenue']
 
         stats = [
             (DASHBOARD_TRANSLATIONS[self.lang]['stats_cards']['doctors'], 
@@ -0,0 +1,76 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class ChangeNotifier(QObject):
+    """Re-emits database change notifications as a Qt signal.
+
+    The listener thread calls ``_forward``; because the notifier lives on
+    the GUI thread, Qt queues the ``changed`` emission so connected slots
+    always run on the GUI thread.
+    """
+
+    changed = pyqtSignal(dict)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.db.subscribe_changes(self._forward)
+
+    def _forward(self, change):
+        self.changed.emit(change)
+
+
+class ChangeBatcher(QObject):
+    """Coalesces bursts of change notifications into one refresh.
+
+    ``add(change)`` collects the changed row ids, and ``delay_ms`` after the
+    first one ``flush(ids, reload)`` is called once with all of them. A
+    RESYNC or BULK notification, or more than ``max_ids`` rows, sets
+    ``reload`` instead: the page should then load everything again rather
+    than fetch rows one by one.
+    """
+
+    def __init__(self, flush, delay_ms=250, max_ids=200, parent=None):
+        super().__init__(parent)
+        self._flush = flush
+        self.max_ids = max_ids
+        self._ids = set()
+        self._reload = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._fire)
+
+    def add(self, change):
+        if change.get('op') in ('RESYNC', 'BULK') or change.get('id') is None:
+            self._reload = True
+        else:
+            self._ids.add(change['id'])
+        self._schedule()
+
+    def requeue(self, ids, reload=False):
+        """Put back a batch the page can't take yet; it is flushed again ``delay_ms`` later"""
+        self._ids.update(ids)
+        self._reload = self._reload or reload
+        self._schedule()
+
+    def _schedule(self):
+        # Not restarted by later changes, so a steady stream still flushes
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _fire(self):
+        ids, reload = self._ids, self._reload or len(self._ids) > self.max_ids
+        self._ids, self._reload = set(), False
+        self._flush(ids, reload)
+
+
+_notifiers = {}
+
+
+def get_change_notifier(db):
+    """Shared notifier for ``db``, created on first use (call from the GUI thread)"""
+    key = id(db)
+    if key not in _notifiers:
+        _notifiers[key] = ChangeNotifier(db)
+    return _notifiers[key]
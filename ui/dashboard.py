@@ -2,10 +2,13 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap
 
+from .loader import DataLoader
+
 
 LANGUAGES = {
     'en': {
         'dashboard_title': '{} Dashboard',
+        'loading': 'Loading...',
         'card_stylesheet': """
             QWidget#card {{
                 background: white;
@@ -17,6 +20,7 @@ LANGUAGES = {
     },
     'ru': {
         'dashboard_title': 'Панель {}',
+        'loading': 'Загрузка...',
         'card_stylesheet': """
             QWidget#card {{
                 background: white;
@@ -36,6 +40,8 @@ class Dashboard(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
+        self.loader.loading_changed.connect(self.set_loading)
         self.init_ui()
         
     def init_ui(self):
@@ -48,7 +54,17 @@ class Dashboard(QWidget):
         title.setStyleSheet("font-size: 18px; font-weight: bold;")
         header.addWidget(title)
         
+        self.loading_label = QLabel(LANGUAGES[self.lang]['loading'])
+        self.loading_label.setStyleSheet("color: #6b7280;")
+        self.loading_label.setVisible(self.loader.is_loading())
+        header.addStretch()
+        header.addWidget(self.loading_label)
+        
         self.layout.addLayout(header)
+
+    def set_loading(self, loading):
+        """Show or hide the loading indicator in the header"""
+        self.loading_label.setVisible(loading)
         
     def create_card(self, title, value, icon, color):
         card = QWidget()
@@ -0,0 +1,128 @@
+from PyQt5.QtCore import QEvent, QRect, QSize, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QCursor, QPainter, QTextDocument
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate
+
+# (background, hover background) for each button colour used by the pages
+BUTTON_COLORS = {
+    'blue': ('#3b82f6', '#2563eb'),
+    'red': ('#ef4444', '#dc2626'),
+    'green': ('#10b981', '#059669'),
+}
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Paints a row's action buttons in one cell, without creating widgets.
+
+    ``actions`` is a list of ``(key, label, color)`` tuples; ``label`` may be
+    a callable taking the row and returning the text, or None to hide the
+    button for that row. ``row_getter(index)`` returns the row behind a
+    cell. A click emits ``clicked(key, row)``.
+    """
+
+    clicked = pyqtSignal(str, object)
+
+    PADDING = 10
+    SPACING = 5
+    MARGIN = 4
+
+    def __init__(self, actions, row_getter, parent=None):
+        super().__init__(parent)
+        self.actions = list(actions)
+        self.row_getter = row_getter
+
+    def _buttons(self, option, index):
+        """Return ``[(key, text, color, rect)]`` for the buttons in a cell"""
+        row = self.row_getter(index)
+        metrics = option.fontMetrics
+        rect = option.rect
+        height = min(rect.height() - 2 * self.MARGIN, metrics.height() + 10)
+        top = rect.top() + (rect.height() - height) // 2
+        left = rect.left() + self.MARGIN
+
+        buttons = []
+        for key, label, color in self.actions:
+            text = label(row) if callable(label) else label
+            if not text:
+                continue
+            width = metrics.horizontalAdvance(text) + 2 * self.PADDING
+            buttons.append((key, text, color, QRect(left, top, width, height)))
+            left += width + self.SPACING
+        return buttons
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+
+        view = option.widget
+        cursor = view.viewport().mapFromGlobal(QCursor.pos()) if view is not None else None
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        for _, text, color, rect in self._buttons(option, index):
+            normal, hover = BUTTON_COLORS.get(color, (color, color))
+            hovered = cursor is not None and rect.contains(cursor)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(hover if hovered else normal))
+            painter.drawRoundedRect(rect, 3, 3)
+            painter.setPen(QColor('white'))
+            painter.drawText(rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        buttons = self._buttons(option, index)
+        if not buttons:
+            return super().sizeHint(option, index)
+        width = buttons[-1][3].right() - option.rect.left() + self.MARGIN
+        return QSize(width, option.fontMetrics.height() + 10 + 2 * self.MARGIN)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove and option.widget is not None:
+            # Repaint so the hover colour follows the mouse
+            option.widget.viewport().update(option.rect)
+            return False
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+
+        for key, _, _, rect in self._buttons(option, index):
+            if rect.contains(event.pos()):
+                row = self.row_getter(index)
+                # Emit after the view has finished with this event, since
+                # handlers often reload the model under it
+                QTimer.singleShot(0, lambda: self.clicked.emit(key, row))
+                return True
+        return False
+
+
+class RichTextDelegate(QStyledItemDelegate):
+    """Renders a cell's text as HTML, e.g. search snippets with <b> highlights.
+
+    The text is trusted markup: anything user-typed in it must already be
+    escaped, as search_medical_records() does for its snippets.
+    """
+
+    def _document(self, option, index, width=-1):
+        doc = QTextDocument()
+        doc.setDefaultFont(option.font)
+        doc.setDocumentMargin(2)
+        doc.setHtml(index.data(Qt.DisplayRole) or '')
+        doc.setTextWidth(width)
+        return doc
+
+    def paint(self, painter, option, index):
+        self.initStyleOption(option, index)
+        doc = self._document(option, index, option.rect.width())
+
+        # Let the style draw the background and selection, but not the text
+        option.text = ''
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        painter.setClipRect(option.rect.translated(-option.rect.topLeft()))
+        doc.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        self.initStyleOption(option, index)
+        doc = self._document(option, index)
+        return QSize(int(doc.idealWidth()), int(doc.size().height()))
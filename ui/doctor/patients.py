@@ -1,4 +1,8 @@
 from .needs import *
+from PyQt5.QtWidgets import QTableView
+from ..delegates import ActionButtonDelegate, RichTextDelegate
+from ..loader import DataLoader
+from ..table_model import PagedTableModel
 
 LANGUAGES = {
     'en': {
@@ -16,7 +20,10 @@ LANGUAGES = {
         },
         'medical_records': {
             'no_records': 'No records'
-        }
+        },
+        'search_placeholder': 'Search records: diagnosis, treatment, notes...',
+        'search_button': 'Search',
+        'search_headers': ['Date', 'Patient', 'Match']
     },
     'ru': {
         'page_title': 'Мои пациенты',
@@ -33,7 +40,10 @@ LANGUAGES = {
         },
         'medical_records': {
             'no_records': 'Нет записей'
-        }
+        },
+        'search_placeholder': 'Поиск по записям: диагноз, лечение, примечания...',
+        'search_button': 'Поиск',
+        'search_headers': ['Дата', 'Пациент', 'Совпадение']
     }
 }
 
@@ -43,6 +53,8 @@ class MyPatientsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.patients = []
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -59,27 +71,86 @@ class MyPatientsPage(QWidget):
         self.table.setHorizontalHeaderLabels(LANGUAGES[self.lang]['table_headers'])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
+
+        self.actions = ActionButtonDelegate([
+            ('view', LANGUAGES[self.lang]['view_button'], 'blue')
+        ], lambda index: self.patients[index.row()], self)
+        self.actions.clicked.connect(lambda action, patient: self.view_patient(patient))
+        self.table.setItemDelegateForColumn(3, self.actions)
+        self.table.setMouseTracking(True)
         
         layout.addWidget(self.table)
+        self.setup_record_search(layout)
         self.load_patients()
+
+    def setup_record_search(self, layout):
+        """Full-text search across the records of all of the doctor's patients"""
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText(LANGUAGES[self.lang]['search_placeholder'])
+        self.search_input.returnPressed.connect(self.search_records)
+        search_btn = QPushButton(LANGUAGES[self.lang]['search_button'])
+        search_btn.clicked.connect(self.search_records)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(search_btn)
+        layout.addLayout(search_layout)
+
+        headers = LANGUAGES[self.lang]['search_headers']
+        self.search_model = PagedTableModel([
+            (headers[0], 'date'),
+            (headers[1], 'patient_name'),
+            (headers[2], 'snippet'),
+        ], page_size=50, parent=self)
+        self.search_results = QTableView()
+        self.search_results.setModel(self.search_model)
+        self.search_results.setItemDelegateForColumn(2, RichTextDelegate(self))
+        self.search_results.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.search_results.horizontalHeader().setStretchLastSection(True)
+        self.search_results.setEditTriggers(QTableView.NoEditTriggers)
+        self.search_results.setSelectionBehavior(QTableView.SelectRows)
+        self.search_results.hide()
+        layout.addWidget(self.search_results)
+
+    def search_records(self):
+        text = self.search_input.text().strip()
+        if not text:
+            self.search_model.set_rows([])
+            self.search_results.hide()
+            return
+        # Best matches first; further pages load as the results are scrolled
+        self.search_model.set_query(
+            lambda cursor, page_size: self.db.search_medical_records(
+                text, doctor_id=self.user_data['id'], limit=page_size, cursor=cursor
+            )
+        )
+        self.search_results.show()
         
     def load_patients(self):
-        # Get unique patient IDs for this doctor
-        patient_ids = {a['patient_id'] for a in self.db.get_doctor_appointments(self.user_data['id'])}
-        patients = [self.db.get_patient_by_id(pid) for pid in patient_ids if pid]
+        self.loader.request('patients', self.fetch_patients, on_loaded=self.populate_patients)
+
+    def fetch_patients(self):
+        """Runs on the loader thread: patients, their last visits and latest records"""
+        # One query per entity type, whatever the number of patients
+        appointments = self.db.get_doctor_appointments(self.user_data['id'])
+        last_visits = {}
+        for a in appointments:
+            if a['patient_id'] and (a['patient_id'] not in last_visits or a['date'] > last_visits[a['patient_id']]):
+                last_visits[a['patient_id']] = a['date']
+        
+        patients = list(self.db.get_patients_by_ids(last_visits).values())
+        return patients, last_visits, self.db.get_latest_medical_records(last_visits)
+
+    def populate_patients(self, result):
+        self.patients, last_visits, latest_records = result
         
-        self.table.setRowCount(len(patients))
+        self.table.setRowCount(len(self.patients))
         
-        for row, patient in enumerate(patients):
+        for row, patient in enumerate(self.patients):
             # Patient name
             self.table.setItem(row, 0, QTableWidgetItem(patient['name']))
             
             # Last visit date
-            last_appt = max(
-                (a['date'] for a in self.db.get_patient_appointments(patient['id'])
-                if a['doctor_id'] == self.user_data['id']),
-                default=LANGUAGES[self.lang]['patient_info']['never']
-            )
+            last_appt = last_visits.get(patient['id'], LANGUAGES[self.lang]['patient_info']['never'])
             
             last_appt_str = (
                 last_appt.strftime("%Y-%m-%d") 
@@ -89,29 +160,13 @@ class MyPatientsPage(QWidget):
             self.table.setItem(row, 1, QTableWidgetItem(last_appt_str))
             
             # Medical condition
-            records = self.db.get_patient_medical_records(patient['id'])
+            record = latest_records.get(patient['id'])
             condition = (
-                records[-1]['diagnosis'] 
-                if records 
+                record['diagnosis'] 
+                if record 
                 else LANGUAGES[self.lang]['medical_records']['no_records']
             )
             self.table.setItem(row, 2, QTableWidgetItem(condition))
-            
-            # View button
-            btn = QPushButton(LANGUAGES[self.lang]['view_button'])
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #3b82f6;
-                    color: white;
-                    padding: 5px 10px;
-                    border-radius: 4px;
-                }
-                QPushButton:hover {
-                    background-color: #2563eb;
-                }
-            """)
-            btn.clicked.connect(lambda _, p=patient: self.view_patient(p))
-            self.table.setCellWidget(row, 3, btn)
     
     def view_patient(self, patient):
         dialog = QDialog(self)
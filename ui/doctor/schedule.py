@@ -7,6 +7,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor
 import datetime as dt
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -43,6 +44,7 @@ class DoctorSchedulePage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -101,34 +103,24 @@ class DoctorSchedulePage(QWidget):
             print(f"Invalid date: {e}")
             return
 
-        all_appointments = self.db.get_doctor_appointments(self.user_data['id'])
-        appointments = []
+        self.loader.request(
+            'appointments',
+            self.db.get_doctor_appointments, self.user_data['id'],
+            on_loaded=lambda rows: self.populate_appointments(rows, selected_date)
+        )
 
-        for appt in all_appointments:
-            # Handle different date formats (datetime.date vs string)
-            appt_date = appt['date']
-            if isinstance(appt_date, str):
-                try:
-                    appt_date = dt.datetime.strptime(appt_date, "%Y-%m-%d").date()
-                except ValueError:
-                    continue
-                    
-            if appt_date == selected_date:
-                appointments.append(appt)
+    def populate_appointments(self, all_appointments, selected_date):
+        # Appointment rows already carry date and time objects
+        appointments = [appt for appt in all_appointments if appt.date == selected_date]
 
         self.table.setRowCount(len(appointments))
         
         for row, appt in enumerate(appointments):
-            patient = self.db.get_patient_by_id(appt['patient_id'])
-            
             # Time column
-            time_str = appt.get('time', '')
-            if isinstance(time_str, dt.time):
-                time_str = time_str.strftime("%H:%M")
-            self.table.setItem(row, 0, QTableWidgetItem(time_str))
+            self.table.setItem(row, 0, QTableWidgetItem(appt.time.strftime("%H:%M")))
             
             # Patient column
-            patient_name = patient['name'] if patient else LANGUAGES[self.lang]['unknown_patient']
+            patient_name = appt.get('patient_name') or LANGUAGES[self.lang]['unknown_patient']
             self.table.setItem(row, 1, QTableWidgetItem(patient_name))
             
             # Reason column
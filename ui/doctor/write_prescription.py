@@ -1,4 +1,5 @@
 from .needs import *
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -45,6 +46,7 @@ class WritePrescriptionPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -66,9 +68,7 @@ class WritePrescriptionPage(QWidget):
         
         # Patient selection
         self.patient_combo = QComboBox()
-        patient_ids = {a['patient_id'] for a in self.db.get_doctor_appointments(self.user_data['id'])}
-        patients = [self.db.get_patient_by_id(pid) for pid in patient_ids if pid]
-        self.patient_combo.addItems([p['name'] for p in patients])
+        self.loader.request('patients', self.fetch_patients, on_loaded=self.populate_patients)
         
         # Medication fields
         self.medication_input = QLineEdit()
@@ -102,6 +102,14 @@ class WritePrescriptionPage(QWidget):
         submit_btn.clicked.connect(self.submit_prescription)
         layout.addWidget(submit_btn, alignment=Qt.AlignRight)
         
+    def fetch_patients(self):
+        """Runs on the loader thread: the patients this doctor has seen"""
+        patient_ids = {a['patient_id'] for a in self.db.get_doctor_appointments(self.user_data['id'])}
+        return list(self.db.get_patients_by_ids(patient_ids).values())
+
+    def populate_patients(self, patients):
+        self.patient_combo.addItems([p['name'] for p in patients])
+
     def submit_prescription(self):
         patient_name = self.patient_combo.currentText()
         patients = self.db.get_all_patients()
@@ -1,5 +1,8 @@
 from .doctor.needs import *
 from .dashboard import Dashboard
+from .change_feed import ChangeBatcher, get_change_notifier
+from .delegates import ActionButtonDelegate
+from db import BookingConflict
 
 LANGUAGES = {
     'en': {
@@ -52,6 +55,8 @@ LANGUAGES = {
         'select_patient': "Please select a valid patient",
         'enter_reason': "Please enter a reason for the appointment",
         'update_failed': "Failed to update appointment",
+        'add_failed': "Failed to add appointment",
+        'slot_taken': "You already have an appointment at that time",
         
         # Prescription Dialog
         'prescription_title': "Prescription for {}",
@@ -82,6 +87,8 @@ LANGUAGES = {
         'id_label': "ID",
         'dob_label': "Date of Birth",
         'blood_type_label': "Blood Type",
+        'for': "for",
+        'last_visit': "Last visit",
         'insurance_label': "Insurance",
         'none': "None",
         'unknown': "Unknown",
@@ -144,6 +151,8 @@ LANGUAGES = {
         'select_patient': "Выберите пациента",
         'enter_reason': "Укажите причину визита",
         'update_failed': "Ошибка обновления записи",
+        'add_failed': "Ошибка при добавлении записи",
+        'slot_taken': "У вас уже есть запись на это время",
         
         # Prescription Dialog
         'prescription_title': "Рецепт для {}",
@@ -174,6 +183,8 @@ LANGUAGES = {
         'id_label': "ID",
         'dob_label': "Дата рождения",
         'blood_type_label': "Группа крови",
+        'for': "для",
+        'last_visit': "Последний визит",
         'insurance_label': "Страховка",
         'none': "Нет",
         'unknown': "Неизвестно",
@@ -196,32 +207,41 @@ class DoctorDashboard(Dashboard):
         self.doctor_id = user_data['id']
         self.today = datetime.now().strftime('%Y-%m-%d')
         super().__init__("doctor", user_data, db) 
+        # Other clients' changes, applied in batches rather than per row
+        self.schedule_changes = ChangeBatcher(self.refresh_changed_schedule, parent=self)
+        get_change_notifier(self.db).changed.connect(self.on_db_change)
         
     def init_ui(self):
         if self.layout():
             QWidget().setLayout(self.layout())
             
         super().init_ui()
-        self.load_data()
-        self.setup_ui_components()
-
-    def load_data(self):
-        """Load all necessary data from database"""
-        self.appointments = self.db.get_todays_appointments(self.doctor_id, self.today)
-        self.all_appointments = self.db.get_doctor_appointments(self.doctor_id)
-        self.patients = self.get_unique_patients()
-        self.prescriptions = [p for p in self.db.get_all_prescriptions() 
-                             if p['doctor_id'] == self.doctor_id]
-
-    def get_unique_patients(self):
-        """Get unique patients for this doctor"""
-        patient_ids = {a['patient_id'] for a in self.all_appointments if a.get('patient_id')}
-        patients = {}
-        for pid in patient_ids:
-            patient = self.db.get_patient_by_id(pid)
-            if patient:  # Only add valid patients
-                patients[pid] = patient
-        return patients
+        self.load_data(then=self.setup_ui_components)
+
+    def load_data(self, then=None):
+        """Load all necessary data from database in the background"""
+        self.loader.request(
+            'dashboard',
+            self.fetch_data, self.doctor_id, self.today,
+            on_loaded=lambda data: self.apply_data(data, then)
+        )
+
+    def fetch_data(self, doctor_id, today):
+        """Runs on a worker thread"""
+        return self.db.get_doctor_dashboard(doctor_id, today) or {
+            'schedule': [], 'status_counts': {}, 'monthly_prescriptions': 0,
+            'patients': [], 'active_prescriptions': []
+        }
+
+    def apply_data(self, data, then=None):
+        self.appointments = data['schedule']
+        self.status_counts = data['status_counts']
+        self.monthly_prescriptions = data['monthly_prescriptions']
+        # Unique patients for this doctor
+        self.patients = {p['id']: p for p in data['patients']}
+        self.active_prescriptions = data['active_prescriptions']
+        if then:
+            then()
 
     def setup_ui_components(self):
         """Setup all UI components"""
@@ -236,8 +256,7 @@ class DoctorDashboard(Dashboard):
 
         active_patients = len(self.patients)
         today_appts = len(self.appointments)
-        monthly_prescriptions = len([p for p in self.prescriptions 
-                                   if p['date'].strftime('%Y-%m') == self.today[:7]])
+        monthly_prescriptions = self.monthly_prescriptions
         
         stats = [
             (LANGUAGES[self.lang]['today_appts'], str(today_appts), "appointment", "blue"),
@@ -291,6 +310,14 @@ class DoctorDashboard(Dashboard):
         self.schedule_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.schedule_table.verticalHeader().setVisible(False)
         self.schedule_table.setSelectionBehavior(QTableWidget.SelectRows)
+
+        self.schedule_actions = ActionButtonDelegate([
+            ('complete', LANGUAGES[self.lang]['complete_btn'], 'green'),
+            ('prescribe', LANGUAGES[self.lang]['prescribe_btn'], 'blue')
+        ], lambda index: self.appointments[index.row()], self)
+        self.schedule_actions.clicked.connect(self.on_schedule_action)
+        self.schedule_table.setItemDelegateForColumn(4, self.schedule_actions)
+        self.schedule_table.setMouseTracking(True)
         
         self.update_schedule_table()
 
@@ -308,52 +335,90 @@ class DoctorDashboard(Dashboard):
         self.schedule_table.setRowCount(len(self.appointments))
         
         for row_idx, appt in enumerate(self.appointments):
-            patient = self.db.get_patient_by_id(appt['patient_id'])
-            time_str = appt['time'].strftime("%H:%M") if hasattr(appt['time'], 'strftime') else str(appt['time'])
-
-            time_item = QTableWidgetItem(time_str)
-            patient_item = QTableWidgetItem(patient['name'] if patient else LANGUAGES[self.lang]['unknown'])
-            reason_item = QTableWidgetItem(appt['reason'])
-            status_item = QTableWidgetItem(LANGUAGES[self.lang][appt['status']])
-
-            if appt['status'] == 'completed':
-                status_item.setForeground(Qt.darkGreen)
-            elif appt['status'] == 'scheduled':
-                status_item.setForeground(Qt.darkYellow)
-            elif appt['status'] == 'cancelled':
-                status_item.setForeground(Qt.red)
-
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(0, 0, 0, 0)
-            action_layout.setSpacing(5)
-            
-            complete_btn = QPushButton(LANGUAGES[self.lang]['complete_btn'])
-            complete_btn.setStyleSheet("""
-                background-color: #10b981; 
-                color: white; 
-                padding: 2px 5px;
-                border-radius: 3px;
-            """)
-            complete_btn.clicked.connect(lambda _, a=appt: self.update_appointment_status(a['id'], 'completed'))
-
-            prescribe_btn = QPushButton(LANGUAGES[self.lang]['prescribe_btn'])
-            prescribe_btn.setStyleSheet("""
-                background-color: #3b82f6; 
-                color: white; 
-                padding: 2px 5px;
-                border-radius: 3px;
-            """)
-            prescribe_btn.clicked.connect(lambda _, a=appt: self.show_prescription_dialog(a['patient_id']))
-
-            action_layout.addWidget(complete_btn)
-            action_layout.addWidget(prescribe_btn)
-
-            self.schedule_table.setItem(row_idx, 0, time_item)
-            self.schedule_table.setItem(row_idx, 1, patient_item)
-            self.schedule_table.setItem(row_idx, 2, reason_item)
-            self.schedule_table.setItem(row_idx, 3, status_item)
-            self.schedule_table.setCellWidget(row_idx, 4, action_widget)
+            self.set_schedule_row(row_idx, appt)
+
+    def set_schedule_row(self, row_idx, appt):
+        """Fill one row of the schedule table"""
+        patient = self.patients.get(appt['patient_id'])
+        patient_name = appt.get('patient_name') or (patient['name'] if patient else LANGUAGES[self.lang]['unknown'])
+        time_str = appt['time'].strftime("%H:%M") if hasattr(appt['time'], 'strftime') else str(appt['time'])
+
+        time_item = QTableWidgetItem(time_str)
+        patient_item = QTableWidgetItem(patient_name)
+        reason_item = QTableWidgetItem(appt['reason'])
+        status_item = QTableWidgetItem(LANGUAGES[self.lang][appt['status']])
+
+        if appt['status'] == 'completed':
+            status_item.setForeground(Qt.darkGreen)
+        elif appt['status'] == 'scheduled':
+            status_item.setForeground(Qt.darkYellow)
+        elif appt['status'] == 'cancelled':
+            status_item.setForeground(Qt.red)
+
+        self.schedule_table.setItem(row_idx, 0, time_item)
+        self.schedule_table.setItem(row_idx, 1, patient_item)
+        self.schedule_table.setItem(row_idx, 2, reason_item)
+        self.schedule_table.setItem(row_idx, 3, status_item)
+
+    def on_schedule_action(self, action, appt):
+        if action == 'complete':
+            self.update_appointment_status(appt['id'], 'completed')
+        elif action == 'prescribe':
+            self.show_prescription_dialog(appt['patient_id'])
+
+    def on_db_change(self, change):
+        """Queue a refresh of the schedule rows another client changed"""
+        if change.get('op') == 'RESYNC':
+            self.schedule_changes.add(change)
+            return
+        if change.get('table') != 'appointments':
+            return
+        # The old doctor_id too, so a reassigned appointment leaves this schedule
+        shown = hasattr(self, 'appointments') and any(a['id'] == change.get('id') for a in self.appointments)
+        if (change.get('op') == 'BULK' or shown
+                or self.doctor_id in (change.get('doctor_id'), change.get('old_doctor_id'))):
+            self.schedule_changes.add(change)
+
+    def refresh_changed_schedule(self, ids, reload):
+        """Fetch every schedule row changed in the last burst in one query"""
+        busy = self.loader.is_loading('dashboard') or self.loader.is_loading('schedule_changes')
+        if not hasattr(self, 'schedule_table') or busy:
+            # A load in flight may predate these changes; try again once it has settled
+            self.schedule_changes.requeue(ids, reload)
+            return
+        if reload:
+            self.load_data(then=self.update_schedule_table)
+            return
+        ids = sorted(ids)
+        self.loader.request(
+            'schedule_changes',
+            self.db.get_appointments_with_details, {'ids': ids},
+            on_loaded=lambda rows: self.apply_schedule_changes(ids, rows)
+        )
+
+    def apply_schedule_changes(self, ids, rows):
+        by_id = {appt['id']: appt for appt in rows}
+        for appt_id in ids:
+            self.apply_schedule_change(appt_id, by_id.get(appt_id))
+
+    def apply_schedule_change(self, appt_id, appt):
+        """Update, insert or remove the single row for ``appt_id``"""
+        row_idx = next((i for i, a in enumerate(self.appointments) if a['id'] == appt_id), None)
+        on_schedule = (appt is not None and appt['doctor_id'] == self.doctor_id
+                       and str(appt['date']) == self.today)
+
+        if row_idx is not None and not on_schedule:
+            del self.appointments[row_idx]
+            self.schedule_table.removeRow(row_idx)
+        elif row_idx is not None:
+            self.appointments[row_idx] = appt
+            self.set_schedule_row(row_idx, appt)
+        elif on_schedule:
+            # Keep the table ordered by time
+            row_idx = sum(1 for a in self.appointments if a['time'] <= appt['time'])
+            self.appointments.insert(row_idx, appt)
+            self.schedule_table.insertRow(row_idx)
+            self.set_schedule_row(row_idx, appt)
 
     def create_patient_alerts_widget(self):
         """Create the patient alerts widget"""
@@ -442,38 +507,28 @@ class DoctorDashboard(Dashboard):
                     'action': lambda _, p=pid: self.view_patient_report(p)
                 })
         
-        for presc in self.prescriptions:
-            if presc['status'] == 'active':
-                if (datetime.now().date() - presc['date']).days > 25:
-                    patient = self.db.get_patient_by_id(presc['patient_id'])
-                    if patient:
-                        alerts.append({
-                            'title': LANGUAGES[self.lang]['expiring_prescription'],
-                            'details': f"{presc['medication']} {LANGUAGES[self.lang]['for']} {patient['name']}",
-                            'status': LANGUAGES[self.lang]['attention'],
-                            'color': "orange",
-                            'action_text': LANGUAGES[self.lang]['renew_prescription'],
-                            'action': lambda _, p=presc['patient_id']: self.show_prescription_dialog(p)
-                        })
+        for presc in self.active_prescriptions:
+            if (datetime.now().date() - presc['date']).days > 25:
+                alerts.append({
+                    'title': LANGUAGES[self.lang]['expiring_prescription'],
+                    'details': f"{presc['medication']} {LANGUAGES[self.lang]['for']} {presc['patient_name']}",
+                    'status': LANGUAGES[self.lang]['attention'],
+                    'color': "orange",
+                    'action_text': LANGUAGES[self.lang]['renew_prescription'],
+                    'action': lambda _, p=presc['patient_id']: self.show_prescription_dialog(p)
+                })
         
         for pid, patient in self.patients.items():
-            last_appt = None
-            for appt in sorted(self.all_appointments, key=lambda x: x['date'], reverse=True):
-                if appt['patient_id'] == pid and appt['status'] == 'completed':
-                    last_appt = appt
-                    break
-            
-            if last_appt:
-                last_date = last_appt['date']
-                if (datetime.now().date() - last_date).days > 180:
-                    alerts.append({
-                        'title': LANGUAGES[self.lang]['followup_needed'],
-                        'details': f"{patient['name']} ({LANGUAGES[self.lang]['last_visit']}: {last_appt['date']})",
-                        'status': LANGUAGES[self.lang]['reminder'],
-                        'color': "blue",
-                        'action_text': LANGUAGES[self.lang]['schedule_visit'],
-                        'action': lambda _, p=pid: self.schedule_follow_up(p)
-                    })
+            last_visit = patient.get('last_visit')
+            if last_visit and (datetime.now().date() - last_visit).days > 180:
+                alerts.append({
+                    'title': LANGUAGES[self.lang]['followup_needed'],
+                    'details': f"{patient['name']} ({LANGUAGES[self.lang]['last_visit']}: {last_visit})",
+                    'status': LANGUAGES[self.lang]['reminder'],
+                    'color': "blue",
+                    'action_text': LANGUAGES[self.lang]['schedule_visit'],
+                    'action': lambda _, p=pid: self.schedule_follow_up(p)
+                })
         
         return alerts
 
@@ -486,17 +541,20 @@ class DoctorDashboard(Dashboard):
         stats_title = QLabel(LANGUAGES[self.lang]['stats_title'])
         stats_title.setStyleSheet("font-size: 16px; font-weight: bold;")
         
-        completed = len([a for a in self.all_appointments if a['status'] == 'completed'])
-        cancelled = len([a for a in self.all_appointments if a['status'] == 'cancelled'])
-        scheduled = len([a for a in self.all_appointments if a['status'] == 'scheduled'])
-        total = len(self.all_appointments)
+        completed = self.status_counts.get('completed', 0)
+        cancelled = self.status_counts.get('cancelled', 0)
+        scheduled = self.status_counts.get('scheduled', 0)
+        total = sum(self.status_counts.values())
+
+        def share(count):
+            return count / total * 100 if total else 0.0
         
         stats_html = f"""
         <div style='font-size: 14px; line-height: 1.6;'>
             <p><b>{LANGUAGES[self.lang]['total_appts']}:</b> {total}</p>
-            <p><b>{LANGUAGES[self.lang]['completed']}:</b> {completed} ({completed/total*100:.1f}%)</p>
-            <p><b>{LANGUAGES[self.lang]['cancelled']}:</b> {cancelled} ({cancelled/total*100:.1f}%)</p>
-            <p><b>{LANGUAGES[self.lang]['scheduled']}:</b> {scheduled} ({scheduled/total*100:.1f}%)</p>
+            <p><b>{LANGUAGES[self.lang]['completed']}:</b> {completed} ({share(completed):.1f}%)</p>
+            <p><b>{LANGUAGES[self.lang]['cancelled']}:</b> {cancelled} ({share(cancelled):.1f}%)</p>
+            <p><b>{LANGUAGES[self.lang]['scheduled']}:</b> {scheduled} ({share(scheduled):.1f}%)</p>
         </div>
         """
         
@@ -585,21 +643,31 @@ class DoctorDashboard(Dashboard):
             "status": "scheduled"
         }
         
-        self.db.add_appointment(appointment)
+        if not self.add_appointment(appointment):
+            return
         QMessageBox.information(self, LANGUAGES[self.lang]['success_title'], 
                               LANGUAGES[self.lang]['appt_added'])
         
-        self.load_data()
-        self.update_schedule_table()
+        self.load_data(then=self.update_schedule_table)
         dialog.accept()
 
+    def add_appointment(self, appointment):
+        """Save an appointment, warning and returning False if it fails"""
+        try:
+            if self.db.add_appointment(appointment) is not None:
+                return True
+            message = LANGUAGES[self.lang]['add_failed']
+        except BookingConflict:
+            message = LANGUAGES[self.lang]['slot_taken']
+        QMessageBox.warning(self, LANGUAGES[self.lang]['error_title'], message)
+        return False
+
     def update_appointment_status(self, appointment_id, status):
         """Update appointment status in database"""
         if self.db.update_appointment_status(appointment_id, status):
             QMessageBox.information(self, LANGUAGES[self.lang]['success_title'], 
                                   LANGUAGES[self.lang]['status_updated'].format(status))
-            self.load_data()
-            self.update_schedule_table()
+            self.load_data(then=self.update_schedule_table)
         else:
             QMessageBox.warning(self, LANGUAGES[self.lang]['error_title'], 
                               LANGUAGES[self.lang]['update_failed'])
@@ -719,10 +787,9 @@ class DoctorDashboard(Dashboard):
         if records:
             records_html = "<ul>"
             for record in sorted(records, key=lambda x: x['date'], reverse=True):
-                doctor = self.db.get_doctor_by_id(record['doctor_id'])
                 records_html += f"""
                 <li>
-                    <b>{record['date']}</b> - {doctor['name'] if doctor else LANGUAGES[self.lang]['unknown']}<br>
+                    <b>{record['date']}</b> - {record.get('doctor_name') or LANGUAGES[self.lang]['unknown']}<br>
                     <b>{LANGUAGES[self.lang]['diagnosis_label']}:</b> {record['diagnosis']}<br>
                     <b>{LANGUAGES[self.lang]['treatment_label']}:</b> {record['treatment']}
                 </li>
@@ -806,12 +873,12 @@ class DoctorDashboard(Dashboard):
             "status": "scheduled"
         }
         
-        self.db.add_appointment(appointment)
+        if not self.add_appointment(appointment):
+            return
         QMessageBox.information(self, 
                               LANGUAGES[self.lang]['success_title'], 
                               LANGUAGES[self.lang]['followup_scheduled'])
         
-        self.load_data()
-        self.update_schedule_table()
+        self.load_data(then=self.update_schedule_table)
         dialog.accept()
 
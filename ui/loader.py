@@ -0,0 +1,131 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QWidget
+
+
+class _LoaderSignals(QObject):
+    """Signals a worker uses to hand its result back to the GUI thread"""
+    finished = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, object)
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, key, generation, fn, args, kwargs, signals, is_stale):
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = signals
+        self.is_stale = is_stale
+
+    @pyqtSlot()
+    def run(self):
+        # Superseded while still queued, don't bother hitting the database
+        if self.is_stale(self.key, self.generation):
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.key, self.generation, e)
+        else:
+            self.signals.finished.emit(self.key, self.generation, result)
+
+
+class DataLoader(QObject):
+    """Run database calls on a thread pool and deliver results as signals.
+
+    Each request has a key (for example ``"appointments"``). Issuing a new
+    request with the same key cancels the previous one: if the old call is
+    still queued it is skipped, and if it is already running its result is
+    dropped when it arrives. Results always reach the slots on the GUI
+    thread, so pages can update widgets directly.
+    """
+
+    loaded = pyqtSignal(str, object)
+    failed = pyqtSignal(str, object)
+    loading_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, thread_pool=None):
+        super().__init__(parent)
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self._generations = {}
+        self._pending = set()
+        self._callbacks = {}
+
+        self._signals = _LoaderSignals()
+        self._signals.finished.connect(self._on_finished, Qt.QueuedConnection)
+        self._signals.failed.connect(self._on_failed, Qt.QueuedConnection)
+
+    def request(self, key, fn, *args, on_loaded=None, on_failed=None, **kwargs):
+        """Schedule ``fn(*args, **kwargs)`` on a worker thread under ``key``"""
+        was_loading = self.is_loading()
+
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        self._callbacks[key] = (on_loaded, on_failed)
+        self._pending.add(key)
+
+        # The pool owns the task (auto-delete), we only keep its generation
+        task = _LoadTask(key, generation, fn, args, kwargs, self._signals, self._is_stale)
+        self.thread_pool.start(task)
+
+        if not was_loading:
+            self._set_loading(True)
+
+    def cancel(self, key=None):
+        """Drop the pending request for ``key``, or every request if no key is given"""
+        was_loading = self.is_loading()
+        keys = [key] if key is not None else list(self._pending)
+        for k in keys:
+            if k in self._pending:
+                self._pending.discard(k)
+                self._generations[k] = self._generations.get(k, 0) + 1
+                self._callbacks.pop(k, None)
+        if was_loading and not self._pending:
+            self._set_loading(False)
+
+    def is_loading(self, key=None):
+        if key is None:
+            return bool(self._pending)
+        return key in self._pending
+
+    def _is_stale(self, key, generation):
+        # Called from worker threads; a plain dict read is safe under the GIL
+        return self._generations.get(key) != generation
+
+    def _is_current(self, key, generation):
+        return not self._is_stale(key, generation) and key in self._pending
+
+    def _settle(self, key):
+        self._pending.discard(key)
+        callbacks = self._callbacks.pop(key, (None, None))
+        if not self._pending:
+            self._set_loading(False)
+        return callbacks
+
+    def _on_finished(self, key, generation, result):
+        if not self._is_current(key, generation):
+            return
+        on_loaded, _ = self._settle(key)
+        if on_loaded:
+            on_loaded(result)
+        self.loaded.emit(key, result)
+
+    def _on_failed(self, key, generation, error):
+        if not self._is_current(key, generation):
+            return
+        _, on_failed = self._settle(key)
+        print(f"Error loading {key}: {error}")
+        if on_failed:
+            on_failed(error)
+        self.failed.emit(key, error)
+
+    def _set_loading(self, loading):
+        owner = self.parent()
+        if isinstance(owner, QWidget):
+            if loading:
+                owner.setCursor(Qt.BusyCursor)
+            else:
+                owner.unsetCursor()
+        self.loading_changed.emit(loading)
@@ -1,7 +1,9 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QStackedWidget, QMenu, QAction, QMessageBox)
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QEvent, QTimer
 from PyQt5.QtGui import QIcon, QPixmap
+import os
+import time
 
 from .doctor_dash import DoctorDashboard
 from .patient_dash import PatientDashboard
@@ -95,6 +97,10 @@ class MainWindow(QMainWindow):
         self.role = role
         self.db = db
         self.lang = lang
+        # Build a page in the background when its nav button is hovered
+        self.prefetch_on_hover = os.getenv('UI_PREFETCH_ON_HOVER', '1') != '0'
+        # Print each page's build and first-paint times as it is first shown
+        self.log_page_timings = os.getenv('UI_PAGE_TIMINGS', '0') == '1'
         
         self.setWindowTitle(LANGUAGES[self.lang]['window_title'])
         self.setMinimumSize(1200, 800)
@@ -319,7 +325,18 @@ class MainWindow(QMainWindow):
         parent_layout.addWidget(top_bar)
 
     def init_pages(self):
-        # Add dashboard
+        """Build the dashboard now and register factories for every other page.
+
+        The rest are only built the first time they are opened (or prefetched
+        when their nav button is hovered). Building a page only creates its
+        widgets; each page fetches its data on its own DataLoader.
+        """
+        self.other_pages = {}
+        self.page_factories = {}
+        self.page_timings = {}
+        self._paint_pending = {}
+
+        started = time.perf_counter()
         if self.role == "patient":
             self.dashboard = PatientDashboard(self.user_data, self.db, self.lang)
         elif self.role == "doctor":
@@ -327,77 +344,96 @@ class MainWindow(QMainWindow):
             self.dashboard.main_window = self
         else:
             self.dashboard = AdminDashboard(self.user_data, self.db, self.lang)
+        self.record_build("dashboard", self.dashboard, started)
         
         self.content_stack.addWidget(self.dashboard)
         
-        self.other_pages = {}
-        
         if self.role == "doctor":
-            profile_page = DoctorProfilePage(self.user_data, self.db, self.lang)
-            self.other_pages["profile"] = profile_page
-            self.content_stack.addWidget(profile_page)
-            
-            schedule_page = DoctorSchedulePage(self.user_data, self.db, self.lang)
-            self.other_pages["schedule"] = schedule_page
-            self.content_stack.addWidget(schedule_page)
-            
-            patients_page = MyPatientsPage(self.user_data, self.db, self.lang)
-            self.other_pages["my-patients"] = patients_page
-            self.content_stack.addWidget(patients_page)
-            
-            prescription_page = WritePrescriptionPage(self.user_data, self.db, self.lang)
-            self.other_pages["write-prescription"] = prescription_page
-            self.content_stack.addWidget(prescription_page)
-        
+            pages = {
+                "profile": DoctorProfilePage,
+                "schedule": DoctorSchedulePage,
+                "my-patients": MyPatientsPage,
+                "write-prescription": WritePrescriptionPage,
+            }
         elif self.role == "patient":
-            profile_page = PatientProfilePage(self.user_data, self.db, self.lang)
-            self.other_pages["profile"] = profile_page
-            self.content_stack.addWidget(profile_page)
+            pages = {
+                "profile": PatientProfilePage,
+                "appointments": PatientAppointmentsPage,
+                "prescriptions": PatientPrescriptionsPage,
+                "medical-records": PatientMedicalRecordsPage,
+                "billing": PatientBillingPage,
+            }
+        elif self.role == 'admin':
+            pages = {
+                "profile": AdminProfilePage,
+                "manage-doctors": ManageDoctorsPage,
+                "manage-patients": ManagePatientsPage,
+                "reports": ReportsPage,
+                "manage-appointments": ManageAppointmentsPage,
+                # "manage-billing": ManageBillingPage,
+                # "settings": SettingsPage,
+            }
+        else:
+            pages = {}
 
-            appointments_page = PatientAppointmentsPage(self.user_data, self.db, self.lang)
-            self.other_pages["appointments"] = appointments_page
-            self.content_stack.addWidget(appointments_page)
+        for name, page_class in pages.items():
+            self.page_factories[name] = (
+                lambda page_class=page_class: page_class(self.user_data, self.db, self.lang)
+            )
 
-            prescriptions_page = PatientPrescriptionsPage(self.user_data, self.db, self.lang)
-            self.other_pages["prescriptions"] = prescriptions_page
-            self.content_stack.addWidget(prescriptions_page)
+    def get_page(self, page_name):
+        """Return the page called ``page_name``, building it on first use"""
+        if page_name in self.other_pages:
+            return self.other_pages[page_name]
+        factory = self.page_factories.get(page_name)
+        if factory is None:
+            return None
 
-            patient_records_page = PatientMedicalRecordsPage(self.user_data, self.db, self.lang)
-            self.other_pages["medical-records"] = patient_records_page
-            self.content_stack.addWidget(patient_records_page)
+        started = time.perf_counter()
+        page = factory()
+        self.record_build(page_name, page, started)
+        self.other_pages[page_name] = page
+        self.content_stack.addWidget(page)
+        return page
 
-            billing_page = PatientBillingPage(self.user_data, self.db, self.lang)
-            self.other_pages["billing"] = billing_page
-            self.content_stack.addWidget(billing_page)
+    def prefetch_page(self, page_name):
+        """Build a page's widgets ahead of time, once the event loop is idle.
 
-        elif self.role == 'admin':
-            profile_page = AdminProfilePage(self.user_data, self.db, self.lang)
-            self.other_pages["profile"] = profile_page
-            self.content_stack.addWidget(profile_page)
-            
-            doctors_page = ManageDoctorsPage(self.user_data, self.db, self.lang)
-            self.other_pages["manage-doctors"] = doctors_page
-            self.content_stack.addWidget(doctors_page)
-            
-            patients_page = ManagePatientsPage(self.user_data, self.db, self.lang)
-            self.other_pages["manage-patients"] = patients_page
-            self.content_stack.addWidget(patients_page)
-            
-            reports_page = ReportsPage(self.user_data, self.db, self.lang)
-            self.other_pages["reports"] = reports_page
-            self.content_stack.addWidget(reports_page)
-            
-            manage_appointments_page = ManageAppointmentsPage(self.user_data, self.db, self.lang)
-            self.other_pages["manage-appointments"] = manage_appointments_page
-            self.content_stack.addWidget(manage_appointments_page)
-            
-            # manage_billing_page = ReportsPage(self.user_data, self.db, self.lang)
-            # self.other_pages["manage-billing"] = manage_billing_page
-            # self.content_stack.addWidget(manage_billing_page)
-            
-            # settings_page = SettingsPage(self.user_data, self.db, self.lang)
-            # self.other_pages["settings"] = settings_page
-            # self.content_stack.addWidget(settings_page)
+        The page's data then loads in the background, so hovering never
+        blocks the GUI thread on the database.
+        """
+        if page_name in self.page_factories and page_name not in self.other_pages:
+            QTimer.singleShot(0, lambda: self.get_page(page_name))
+
+    def record_build(self, page_name, page, started):
+        """Record how long a page took to build and watch for its first paint"""
+        self.page_timings[page_name] = {
+            'build_ms': (time.perf_counter() - started) * 1000,
+            'first_paint_ms': None,
+        }
+        self._paint_pending[page] = (page_name, started)
+        page.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj in self._paint_pending:
+            page_name, started = self._paint_pending.pop(obj)
+            obj.removeEventFilter(self)
+            elapsed = (time.perf_counter() - started) * 1000
+            timing = self.page_timings[page_name]
+            timing['first_paint_ms'] = elapsed
+            if self.log_page_timings:
+                print(f"Page {page_name}: built in {timing['build_ms']:.1f} ms, "
+                      f"first painted after {elapsed:.1f} ms")
+        elif event.type() == QEvent.Enter and self.prefetch_on_hover and obj.property("page"):
+            self.prefetch_page(obj.property("page"))
+        return super().eventFilter(obj, event)
+
+    def switch_to(self, page_name, page):
+        # A prefetched page that hasn't been shown yet is timed from the
+        # moment the user asks for it, not from when it was built
+        if page in self._paint_pending:
+            self._paint_pending[page] = (page_name, time.perf_counter())
+        self.content_stack.setCurrentWidget(page)
 
     def connect_signals(self):
         # Find sidebar toggle button and connect
@@ -424,6 +460,7 @@ class MainWindow(QMainWindow):
         for btn in self.sidebar.findChildren(QPushButton):
             if btn.property("page"):
                 btn.clicked.connect(self.switch_page)
+                btn.installEventFilter(self)
                 
         # Set dashboard as active
         dashboard_btn = self.sidebar.findChild(QPushButton, "nav-item")
@@ -441,10 +478,9 @@ class MainWindow(QMainWindow):
         self.switch_page_by_name(page)
             
     def switch_page_by_name(self, page_name):
-        if page_name == "dashboard":
-            self.content_stack.setCurrentWidget(self.dashboard)
-        elif page_name in self.other_pages:
-            self.content_stack.setCurrentWidget(self.other_pages[page_name])
+        page = self.dashboard if page_name == "dashboard" else self.get_page(page_name)
+        if page is not None:
+            self.switch_to(page_name, page)
         else:
             QMessageBox.warning(self, 
                                LANGUAGES[self.lang]['page_not_available'], 
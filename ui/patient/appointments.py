@@ -1,4 +1,5 @@
 from .needs import *
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -41,6 +42,7 @@ class PatientAppointmentsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -77,12 +79,16 @@ class PatientAppointmentsPage(QWidget):
         self.load_appointments()
         
     def load_appointments(self):
-        appointments = self.db.get_patient_appointments(self.user_data['id'])
+        self.loader.request(
+            'appointments',
+            self.db.get_patient_appointments, self.user_data['id'],
+            on_loaded=self.populate_appointments
+        )
+
+    def populate_appointments(self, appointments):
         self.appointments_table.setRowCount(len(appointments))
         
         for row_idx, appt in enumerate(appointments):
-            doctor = self.db.get_doctor_by_id(appt['doctor_id'])
-
             # Convert date to string if it's a date object
             date_str = appt['date'].strftime("%Y-%m-%d") if hasattr(appt['date'], 'strftime') else str(appt['date'])
             # Convert time to string if needed
@@ -92,8 +98,8 @@ class PatientAppointmentsPage(QWidget):
             items = [
                 QTableWidgetItem(date_str),
                 QTableWidgetItem(time_str),
-                QTableWidgetItem(doctor['name'] if doctor else LANGUAGES[self.lang]['unknown_doctor']),
-                QTableWidgetItem(doctor['department'] if doctor else LANGUAGES[self.lang]['unknown_department']),
+                QTableWidgetItem(appt.get('doctor_name') or LANGUAGES[self.lang]['unknown_doctor']),
+                QTableWidgetItem(appt.get('doctor_department') or LANGUAGES[self.lang]['unknown_department']),
                 QTableWidgetItem(appt.get('reason', '')),
                 QTableWidgetItem(self.translate_status(appt['status']))
             ]
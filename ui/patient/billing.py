@@ -1,6 +1,7 @@
 
 
 from .needs import *
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -77,6 +78,7 @@ class PatientBillingPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -279,20 +281,23 @@ class PatientBillingPage(QWidget):
         
     def load_bills(self):
         """Load bills based on current filters"""
+        # Get filter values
+        from_date = self.from_date.date().toString("yyyy-MM-dd")
+        to_date = self.to_date.date().toString("yyyy-MM-dd")
+        status = self.status_filter.currentData()
+
+        self.loader.request(
+            'bills',
+            self.db.get_patient_bills, self.user_data['id'],
+            from_date=from_date,
+            to_date=to_date,
+            status=status if status != "all" else None,
+            on_loaded=self.populate_bills,
+            on_failed=self.show_load_error
+        )
+
+    def populate_bills(self, bills):
         try:
-            # Get filter values
-            from_date = self.from_date.date().toString("yyyy-MM-dd")
-            to_date = self.to_date.date().toString("yyyy-MM-dd")
-            status = self.status_filter.currentData()
-            
-            # Get bills from database
-            bills = self.db.get_patient_bills(
-                self.user_data['id'],
-                from_date=from_date,
-                to_date=to_date,
-                status=status if status != "all" else None
-            )
-            
             # Update summary
             self.update_summary(bills)
             
@@ -342,11 +347,14 @@ class PatientBillingPage(QWidget):
             # self.bills_table.resizeColumnsToContents()
             
         except Exception as e:
-            QMessageBox.critical(
-                self, 
-                LANGUAGES[self.lang]['error_title'], 
-                LANGUAGES[self.lang]['load_bills_error'].format(str(e))
-            )
+            self.show_load_error(e)
+
+    def show_load_error(self, error):
+        QMessageBox.critical(
+            self, 
+            LANGUAGES[self.lang]['error_title'], 
+            LANGUAGES[self.lang]['load_bills_error'].format(str(error))
+        )
     
     def translate_status(self, status):
         """Translate status to current language"""
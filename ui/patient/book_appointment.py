@@ -2,9 +2,12 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QScrollArea, QWidget, QGroupBox, 
                             QFormLayout, QComboBox, QTextEdit, QDateEdit, QLabel, 
                             QPushButton, QHBoxLayout, QMessageBox)
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QDateTime, QLocale, QTime
+from PyQt5.QtGui import QColor, QTextCharFormat
 from .needs import *
-from datetime import datetime, timedelta
+from ..loader import DataLoader
+from db import BookingConflict
+from datetime import date, datetime, timedelta
 
 LANGUAGES = {
     'en': {
@@ -41,6 +44,18 @@ LANGUAGES = {
         'chose_doctor_first': 'Choose doctor first',
         'doctor_not_found': "Doctor not found",
         'error_loading_slots': 'Error loading slots',
+        'slot_taken': 'This time slot has just been booked by someone else. Please choose another one.',
+        'booking_failed': 'The appointment could not be saved. Please try again later.',
+        'filter_specialization': 'Specialization:',
+        'all_specializations': 'All Specializations',
+        'first_available': 'First available:',
+        'find_first_available': 'Find Earliest Slots',
+        'first_available_hint': 'Earliest free slots of any matching doctor',
+        'searching_slots': 'Searching...',
+        'no_first_available': 'No free slots found',
+        'doctor_label': 'Dr. {name} ({specialization})',
+        'slot_label': '{time} - {doctor}',
+        'slot_date_format': 'ddd d MMM',
     },
     'ru': {
         'window_title': 'Запись на прием',
@@ -75,7 +90,19 @@ LANGUAGES = {
         'no_slots_available': 'Нет доступного времени на выбранную дату.',
         'chose_doctor_first': "Сначала выберите врача",
         'doctor_not_found': "Врач не найден",
-        'error_loading_slots': "Ошибка загрузки слотов"
+        'error_loading_slots': "Ошибка загрузки слотов",
+        'slot_taken': 'Это время только что занял другой пациент. Пожалуйста, выберите другое.',
+        'booking_failed': 'Не удалось сохранить запись. Попробуйте позже.',
+        'filter_specialization': 'Специализация:',
+        'all_specializations': 'Все специализации',
+        'first_available': 'Ближайшее время:',
+        'find_first_available': 'Найти ближайшее',
+        'first_available_hint': 'Ближайшее свободное время у любого подходящего врача',
+        'searching_slots': 'Поиск...',
+        'no_first_available': 'Свободное время не найдено',
+        'doctor_label': 'Врач {name} ({specialization})',
+        'slot_label': '{time} — {doctor}',
+        'slot_date_format': 'ddd, d MMM',
     }
 }
 
@@ -85,7 +112,15 @@ class BookAppointmentDialog(QDialog):
         self.user_data = user_data
         self.db = db
         self.lang = lang if lang in LANGUAGES else 'en'
+        # Day and month names and the clock format follow the UI language
+        self.qlocale = QLocale(QLocale.Russian if self.lang == 'ru' else QLocale.English)
         self.doctors = self.db.get_all_doctors()
+        # Free slots per (doctor_id, year, month), each {date: [time, ...]}
+        self.availability = {}
+        # (doctor_id, date, "HH:MM") picked in the first-available list,
+        # selected in time_combo once that day's slots are shown
+        self.pending_slot = None
+        self.loader = DataLoader(self)
         self.setup_ui()
         
     def tr(self, text_key):
@@ -146,6 +181,22 @@ class BookAppointmentDialog(QDialog):
             self.dept_filter.addItem(dept, dept)
         self.dept_filter.currentIndexChanged.connect(self.filter_doctors)
         
+        # Specialization filter, used by the first-available search
+        self.spec_filter = QComboBox()
+        self.spec_filter.addItem(self.tr('all_specializations'), "all")
+        for spec in sorted({d['specialization'] for d in self.doctors if d['specialization']}):
+            self.spec_filter.addItem(spec, spec)
+
+        # First available: earliest free slots across the matching doctors
+        first_layout = QHBoxLayout()
+        find_btn = QPushButton(self.tr('find_first_available'))
+        find_btn.clicked.connect(self.find_earliest_slots)
+        self.earliest_combo = QComboBox()
+        self.earliest_combo.setToolTip(self.tr('first_available_hint'))
+        self.earliest_combo.activated.connect(self.pick_earliest_slot)
+        first_layout.addWidget(find_btn)
+        first_layout.addWidget(self.earliest_combo, 1)
+
         # Doctor selection
         self.doctor_combo = QComboBox()
         self.populate_doctor_combo()
@@ -167,6 +218,8 @@ class BookAppointmentDialog(QDialog):
         self.doctor_combo.currentIndexChanged.connect(self.update_doctor_info)
         
         form.addRow(self.tr('filter_department'), self.dept_filter)
+        form.addRow(self.tr('filter_specialization'), self.spec_filter)
+        form.addRow(self.tr('first_available'), first_layout)
         form.addRow(self.tr('select_doctor'), self.doctor_combo)
         form.addRow(self.tr('doctor_info'), self.doctor_info)
         
@@ -184,7 +237,7 @@ class BookAppointmentDialog(QDialog):
         
         for doctor in doctors:
             self.doctor_combo.addItem(
-                f"Dr. {doctor['name']} ({doctor['specialization']})", 
+                self.tr('doctor_label').format(name=doctor['name'], specialization=doctor['specialization']),
                 doctor['id']
             )
         
@@ -213,6 +266,54 @@ class BookAppointmentDialog(QDialog):
         )
         self.doctor_info.setHtml(info)
 
+    def find_earliest_slots(self):
+        """Look up the next free slots of every doctor matching the filters"""
+        department = self.dept_filter.currentData()
+        specialization = self.spec_filter.currentData()
+        self.earliest_combo.clear()
+        self.earliest_combo.addItem(self.tr('searching_slots'))
+        self.loader.request(
+            'earliest',
+            self.db.find_earliest_slots,
+            specialization=None if specialization == "all" else specialization,
+            department=None if department == "all" else department,
+            limit=10,
+            on_loaded=self.show_earliest_slots,
+            on_failed=self.show_slots_error
+        )
+
+    def show_earliest_slots(self, slots):
+        self.earliest_combo.clear()
+        if not slots:
+            self.earliest_combo.addItem(self.tr('no_first_available'))
+            return
+        for slot in slots:
+            start = QDateTime(slot['start_ts'])
+            when = (f"{self.qlocale.toString(start.date(), self.tr('slot_date_format'))}, "
+                    f"{self.qlocale.toString(start.time(), QLocale.ShortFormat)}")
+            doctor = self.tr('doctor_label').format(
+                name=slot['doctor_name'], specialization=slot['specialization']
+            )
+            self.earliest_combo.addItem(self.tr('slot_label').format(time=when, doctor=doctor), slot)
+        self.pick_earliest_slot(0)
+
+    def pick_earliest_slot(self, index):
+        """Select the doctor, date and time of a first-available entry"""
+        slot = self.earliest_combo.itemData(index)
+        if not slot:
+            return
+        start = slot['start_ts']
+        self.pending_slot = (slot['doctor_id'], start.date(), start.strftime("%H:%M"))
+
+        doctor_index = self.doctor_combo.findData(slot['doctor_id'])
+        if doctor_index < 0:
+            # Hidden by the department filter
+            self.dept_filter.setCurrentIndex(0)
+            doctor_index = self.doctor_combo.findData(slot['doctor_id'])
+        self.doctor_combo.setCurrentIndex(doctor_index)
+        self.appt_date.setDate(QDate(start.year, start.month, start.day))
+        self.update_available_times()
+
     def setup_date_time(self):
         """Setup date and time selection components"""
         group = QGroupBox(self.tr('appt_datetime_group'))
@@ -237,9 +338,10 @@ class BookAppointmentDialog(QDialog):
         self.available_slots = QLabel(self.tr('loading_slots'))
         self.available_slots.setWordWrap(True)
 
-        # Connect signals
+        # Connect signals. Switching days within a loaded month needs no query.
         self.appt_date.dateChanged.connect(self.update_available_times)
-        self.doctor_combo.currentIndexChanged.connect(self.update_available_times)
+        self.doctor_combo.currentIndexChanged.connect(self.on_doctor_changed)
+        self.appt_date.calendarWidget().currentPageChanged.connect(self.on_calendar_page_changed)
 
         form.addRow(self.tr('date_label'), self.appt_date)
         form.addRow(self.tr('time_label'), self.time_combo)
@@ -251,78 +353,92 @@ class BookAppointmentDialog(QDialog):
         self.update_available_times()
 
     def update_available_times(self):
-        """Update available time slots based on selected doctor's working hours"""
-        try:
-            self.time_combo.clear()
+        """Show the free slots of the selected doctor on the selected date"""
+        self.time_combo.clear()
+        doctor_id = self.doctor_combo.currentData()
+        if not doctor_id:
+            self.time_combo.addItem(self.tr("chose_doctor_first"))
+            self.available_slots.setText("")
+            return
+
+        selected_date = self.appt_date.date().toPyDate()
+        month = self.availability.get((doctor_id, selected_date.year, selected_date.month))
+        if month is None:
             self.available_slots.setText(self.tr('loading_slots'))
-            QApplication.processEvents()  # Force UI update
-            
-            doctor_id = self.doctor_combo.currentData()
-            selected_date = self.appt_date.date().toPyDate()
-            current_datetime = datetime.now()
-            is_today = selected_date == current_datetime.date()
-            
-            if not doctor_id:
-                self.time_combo.addItem(self.tr("chose_doctor_first"))
-                self.available_slots.setText("")
-                return
+            self.load_month(doctor_id, selected_date.year, selected_date.month)
+            return
 
-            doctor = self.db.get_doctor_by_id(doctor_id)
-            if not doctor:
-                raise ValueError(self.tr('doctor_not_found'))
-                
-            from_time = doctor['from_time']
-            until_time = doctor['until_time']
-            
-            if isinstance(from_time, str):
-                from_time = datetime.strptime(from_time, "%H:%M:%S").time()
-            if isinstance(until_time, str):
-                until_time = datetime.strptime(until_time, "%H:%M:%S").time()
-            
-            booked_times = self.db.get_booked_times(
-                doctor_id, 
-                selected_date.strftime("%Y-%m-%d")
-            )
-            
-            available_slots = []
-            current_time = datetime.combine(selected_date, from_time)
-            end_time = datetime.combine(selected_date, until_time)
-            
-            # If today, start from current time + 30 minutes (rounded up)
-            if is_today:
-                # Round up to next 30 minute interval
-                minutes_to_add = (30 - (current_datetime.minute % 30)) % 30
-                if minutes_to_add == 0:
-                    minutes_to_add = 30  # If exactly on the half hour, go to next
-                current_time = current_datetime + timedelta(minutes=minutes_to_add)
-                current_time = current_time.replace(second=0, microsecond=0)
-                # Make sure we don't start before doctor's working hours
-                if current_time.time() < from_time:
-                    current_time = datetime.combine(selected_date, from_time)
-            
-            while current_time < end_time:
-                time_str = current_time.time().strftime("%H:%M")
-                if time_str not in booked_times:
-                    display_time = current_time.strftime("%I:%M %p")
-                    available_slots.append((display_time, time_str))
-                current_time += timedelta(minutes=30)
-            
-            self.time_combo.clear()
-            if available_slots:
-                for display_time, time_value in available_slots:
-                    self.time_combo.addItem(display_time, time_value)
-                self.available_slots.setText(
-                    f"{len(available_slots)} {self.tr('slots_available')}"
-                )
-            else:
-                self.time_combo.addItem(self.tr('no_slots_available'))
-                self.available_slots.setText("")
-                
-        except Exception as e:
-            print(f"Error updating time slots: {str(e)}")
-            self.time_combo.clear()
-            self.time_combo.addItem(self.tr('error_loading_slots'))
-            self.available_slots.setText(f"Error: {str(e)}")
+        slots = month.get(selected_date, [])
+        if slots:
+            for slot in slots:
+                self.time_combo.addItem(self.qlocale.toString(QTime(slot), QLocale.ShortFormat), slot.strftime("%H:%M"))
+            self.available_slots.setText(f"{len(slots)} {self.tr('slots_available')}")
+            if self.pending_slot and self.pending_slot[:2] == (doctor_id, selected_date):
+                index = self.time_combo.findData(self.pending_slot[2])
+                if index >= 0:
+                    self.time_combo.setCurrentIndex(index)
+                self.pending_slot = None
+        else:
+            self.time_combo.addItem(self.tr('no_slots_available'))
+            self.available_slots.setText("")
+
+    def load_month(self, doctor_id, year, month):
+        """Fetch a month of free slots in the background, in one query"""
+        first_day = date(year, month, 1)
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        self.loader.request(
+            'availability',
+            self.db.get_availability, doctor_id, max(first_day, date.today()),
+            next_month - timedelta(days=1),
+            on_loaded=lambda days: self.apply_month(doctor_id, year, month, days),
+            on_failed=self.show_slots_error
+        )
+
+    def apply_month(self, doctor_id, year, month, days):
+        self.availability[(doctor_id, year, month)] = days
+        if doctor_id != self.doctor_combo.currentData():
+            return
+        self.mark_calendar(days)
+        selected_date = self.appt_date.date()
+        if (selected_date.year(), selected_date.month()) == (year, month):
+            self.update_available_times()
+
+    def mark_calendar(self, days):
+        """Grey out fully booked days and put the free-slot count in each day's tooltip"""
+        calendar = self.appt_date.calendarWidget()
+        for day, slots in days.items():
+            fmt = QTextCharFormat()
+            fmt.setToolTip(f"{len(slots)} {self.tr('slots_available')}")
+            if not slots:
+                fmt.setForeground(QColor('#9ca3af'))
+            calendar.setDateTextFormat(QDate(day.year, day.month, day.day), fmt)
+
+    def on_doctor_changed(self):
+        # Formats from the previous doctor's months no longer apply
+        self.appt_date.calendarWidget().setDateTextFormat(QDate(), QTextCharFormat())
+        doctor_id = self.doctor_combo.currentData()
+        calendar = self.appt_date.calendarWidget()
+        shown = self.availability.get((doctor_id, calendar.yearShown(), calendar.monthShown()))
+        if shown:
+            self.mark_calendar(shown)
+        self.update_available_times()
+
+    def on_calendar_page_changed(self, year, month):
+        """Load the month the user has paged the calendar to"""
+        doctor_id = self.doctor_combo.currentData()
+        if not doctor_id:
+            return
+        days = self.availability.get((doctor_id, year, month))
+        if days is None:
+            self.load_month(doctor_id, year, month)
+        else:
+            self.mark_calendar(days)
+
+    def show_slots_error(self, error):
+        print(f"Error updating time slots: {error}")
+        self.time_combo.clear()
+        self.time_combo.addItem(self.tr('error_loading_slots'))
+        self.available_slots.setText(f"Error: {error}")
 
     def setup_reason(self):
         """Setup appointment reason input"""
@@ -404,13 +520,21 @@ class BookAppointmentDialog(QDialog):
                 self.tr('error_reason')
             )
             return
+
+        if not self.time_combo.currentData():
+            QMessageBox.warning(
+                self,
+                self.tr('error_title'),
+                self.tr('no_slots_available')
+            )
+            return
             
         # Prepare appointment data
         appointment = {
             "patient_id": self.user_data['id'],
             "doctor_id": self.doctor_combo.currentData(),
             "date": self.appt_date.date().toString("yyyy-MM-dd"),
-            "time": self.time_combo.currentText(),
+            "time": self.time_combo.currentData(),
             "reason": self.appt_reason.toPlainText(),
             "status": "scheduled",
             "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -418,7 +542,8 @@ class BookAppointmentDialog(QDialog):
         
         try:
             # Save to database
-            self.db.add_appointment(appointment)
+            if self.db.add_appointment(appointment) is None:
+                raise RuntimeError(self.tr('booking_failed'))
             
             # Show success message
             doctor_name = next(d['name'] for d in self.doctors if d['id'] == appointment['doctor_id'])
@@ -428,13 +553,18 @@ class BookAppointmentDialog(QDialog):
                 self.tr('success_message').format(
                     doctor_name,
                     appointment['date'],
-                    appointment['time']
+                    self.time_combo.currentText()
                 )
             )
             
             # Close dialog with success
             self.accept()
             
+        except BookingConflict:
+            QMessageBox.warning(self, self.tr('error_title'), self.tr('slot_taken'))
+            # Someone else took the slot meanwhile, so fetch fresh ones
+            self.availability.clear()
+            self.on_doctor_changed()
         except Exception as e:
             QMessageBox.critical(
                 self,
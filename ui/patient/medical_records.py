@@ -1,4 +1,7 @@
 from .needs import *
+from html import escape
+from ..delegates import RichTextDelegate
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -9,6 +12,8 @@ LANGUAGES = {
         'to_label': 'To:',
         'doctor_label': 'Doctor:',
         'diagnosis_label': 'Diagnosis:',
+        'search_label': 'Search:',
+        'search_placeholder': 'Diagnosis, treatment, notes...',
         'apply_filters': 'Apply Filters',
         'all_doctors': 'All Doctors',
         'all_diagnoses': 'All Diagnoses',
@@ -43,6 +48,8 @@ LANGUAGES = {
         'to_label': 'До:',
         'doctor_label': 'Врач:',
         'diagnosis_label': 'Диагноз:',
+        'search_label': 'Поиск:',
+        'search_placeholder': 'Диагноз, лечение, примечания...',
         'apply_filters': 'Применить фильтры',
         'all_doctors': 'Все врачи',
         'all_diagnoses': 'Все диагнозы',
@@ -77,6 +84,8 @@ class PatientMedicalRecordsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.record_doctors = {}
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -173,6 +182,11 @@ class PatientMedicalRecordsPage(QWidget):
         self.diagnosis_filter = QComboBox()
         self.diagnosis_filter.addItem(LANGUAGES[self.lang]['all_diagnoses'], "all")
         
+        # Full-text search
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText(LANGUAGES[self.lang]['search_placeholder'])
+        self.search_input.returnPressed.connect(self.load_records)
+        
         # Filter button
         filter_btn = QPushButton(LANGUAGES[self.lang]['apply_filters'])
         filter_btn.setStyleSheet("""
@@ -196,6 +210,8 @@ class PatientMedicalRecordsPage(QWidget):
         filter_layout.addWidget(self.doctor_filter)
         filter_layout.addWidget(QLabel(LANGUAGES[self.lang]['diagnosis_label']))
         filter_layout.addWidget(self.diagnosis_filter)
+        filter_layout.addWidget(QLabel(LANGUAGES[self.lang]['search_label']))
+        filter_layout.addWidget(self.search_input)
         filter_layout.addWidget(filter_btn)
         
         group.setLayout(filter_layout)
@@ -213,6 +229,8 @@ class PatientMedicalRecordsPage(QWidget):
         self.records_table.setSelectionBehavior(QTableWidget.SelectRows)
         self.records_table.setSelectionMode(QTableWidget.SingleSelection)
         self.records_table.cellClicked.connect(self.show_record_details)
+        # Diagnosis cells are HTML so search matches can be highlighted
+        self.records_table.setItemDelegateForColumn(2, RichTextDelegate(self))
         
         self.layout.addWidget(self.records_table)
         
@@ -274,21 +292,47 @@ class PatientMedicalRecordsPage(QWidget):
         
     def load_records(self):
         """Load records based on current filters"""
-        try:
-            # Get filter values
-            from_date = self.from_date.date().toString("yyyy-MM-dd")
-            to_date = self.to_date.date().toString("yyyy-MM-dd")
-            doctor_id = self.doctor_filter.currentData()
-            diagnosis = self.diagnosis_filter.currentData()
-            
-            # Get records from database
+        # Get filter values
+        from_date = self.from_date.date().toString("yyyy-MM-dd")
+        to_date = self.to_date.date().toString("yyyy-MM-dd")
+        doctor_id = self.doctor_filter.currentData()
+        diagnosis = self.diagnosis_filter.currentData()
+        search = self.search_input.text().strip()
+
+        self.loader.request(
+            'records',
+            self.fetch_records, search, from_date, to_date,
+            doctor_id if doctor_id != "all" else None,
+            diagnosis if diagnosis != "all" else None,
+            on_loaded=self.populate_records,
+            on_failed=self.show_load_error
+        )
+
+    def fetch_records(self, search, from_date, to_date, doctor_id, diagnosis):
+        """Runs on the loader thread: the matching records and their doctors"""
+        if search:
+            # Ranked full-text matches instead of the diagnosis filter
+            records, _ = self.db.search_medical_records(
+                search,
+                patient_id=self.user_data['id'],
+                limit=100,
+                from_date=from_date,
+                to_date=to_date,
+                doctor_id=doctor_id
+            )
+        else:
             records = self.db.get_patient_medical_records(
                 self.user_data['id'],
                 from_date=from_date,
                 to_date=to_date,
-                doctor_id=doctor_id if doctor_id != "all" else None,
-                diagnosis=diagnosis if diagnosis != "all" else None
+                doctor_id=doctor_id,
+                diagnosis=diagnosis
             )
+        return records, self.db.get_doctors_by_ids(r['doctor_id'] for r in records)
+
+    def populate_records(self, result):
+        try:
+            records, self.record_doctors = result
             
             # Update filters dropdowns
             self.update_filter_options(records)
@@ -297,13 +341,13 @@ class PatientMedicalRecordsPage(QWidget):
             self.records_table.setRowCount(len(records))
             
             for row_idx, record in enumerate(records):
-                doctor = self.db.get_doctor_by_id(record['doctor_id'])
+                doctor = self.record_doctors.get(record['doctor_id'])
                 date_str = record['date'].strftime("%Y-%m-%d") if hasattr(record['date'], 'strftime') else str(record['date'])
 
                 items = [
                     QTableWidgetItem(date_str),
                     QTableWidgetItem(doctor['name'] if doctor else LANGUAGES[self.lang]['unknown_doctor']),
-                    QTableWidgetItem(record['diagnosis']),
+                    QTableWidgetItem(record.get('snippet') or escape(record['diagnosis'] or '')),
                     QTableWidgetItem(record['treatment']),
                 ]
                 
@@ -327,11 +371,14 @@ class PatientMedicalRecordsPage(QWidget):
                 self.records_table.setCellWidget(row_idx, 4, view_btn)
                         
         except Exception as e:
-            QMessageBox.critical(
-                self, 
-                LANGUAGES[self.lang]['error_title'], 
-                LANGUAGES[self.lang]['load_error'].format(str(e))
-            )
+            self.show_load_error(e)
+
+    def show_load_error(self, error):
+        QMessageBox.critical(
+            self, 
+            LANGUAGES[self.lang]['error_title'], 
+            LANGUAGES[self.lang]['load_error'].format(str(error))
+        )
     
     def update_filter_options(self, records):
         """Update filter dropdowns based on available records"""
@@ -342,9 +389,7 @@ class PatientMedicalRecordsPage(QWidget):
         self.doctor_filter.clear()
         self.doctor_filter.addItem(LANGUAGES[self.lang]['all_doctors'], "all")
         
-        doctor_ids = {r['doctor_id'] for r in records}
-        doctors = [self.db.get_doctor_by_id(did) for did in doctor_ids]
-        doctors = [d for d in doctors if d is not None]
+        doctors = list(self.record_doctors.values())
         
         for doctor in sorted(doctors, key=lambda d: d['name']):
             self.doctor_filter.addItem(doctor['name'], doctor['id'])
@@ -376,7 +421,7 @@ class PatientMedicalRecordsPage(QWidget):
                 return
             record_id = self.records_table.item(selected_row, 0).data(Qt.UserRole)
             all_records = self.db.get_patient_medical_records(self.user_data['id'])
-            record = next((r for r in all_records if isinstance(r, dict) and r.get('id') == record_id), None)
+            record = next((r for r in all_records if r['id'] == record_id), None)
             if not record:
                 QMessageBox.warning(self, LANGUAGES[self.lang]['error_title'], "Selected record not found")
                 return
@@ -385,7 +430,7 @@ class PatientMedicalRecordsPage(QWidget):
         if selected_col != 4:
             return
         
-        doctor = self.db.get_doctor_by_id(record['doctor_id'])
+        doctor = self.record_doctors.get(record['doctor_id']) or self.db.get_doctor_by_id(record['doctor_id'])
         
         details_html = LANGUAGES[self.lang]['details_template'].format(
             date=record['date'],
@@ -1,5 +1,6 @@
 
 from .needs import *
+from ..loader import DataLoader
 
 LANGUAGES = {
     'en': {
@@ -40,6 +41,7 @@ class PatientPrescriptionsPage(QWidget):
         self.user_data = user_data
         self.db = db
         self.lang = lang
+        self.loader = DataLoader(self)
         self.init_ui()
         
     def init_ui(self):
@@ -72,12 +74,16 @@ class PatientPrescriptionsPage(QWidget):
         self.load_prescriptions()
         
     def load_prescriptions(self):
-        prescriptions = self.db.get_patient_prescriptions(self.user_data['id'])
+        self.loader.request(
+            'prescriptions',
+            self.db.get_patient_prescriptions, self.user_data['id'],
+            on_loaded=self.populate_prescriptions
+        )
+
+    def populate_prescriptions(self, prescriptions):
         self.prescriptions_table.setRowCount(len(prescriptions))
         
         for row_idx, presc in enumerate(prescriptions):
-            doctor = self.db.get_doctor_by_id(presc['doctor_id'])
-            
             # Convert date to string if it's a date object
             date_str = presc['date'].strftime("%Y-%m-%d") if hasattr(presc['date'], 'strftime') else str(presc['date'])
 
@@ -86,7 +92,7 @@ class PatientPrescriptionsPage(QWidget):
                 QTableWidgetItem(date_str),
                 QTableWidgetItem(presc['medication']),
                 QTableWidgetItem(presc['dosage']),
-                QTableWidgetItem(doctor['name'] if doctor else LANGUAGES[self.lang]['unknown_doctor']),
+                QTableWidgetItem(presc.get('doctor_name') or LANGUAGES[self.lang]['unknown_doctor']),
                 QTableWidgetItem(self.translate_status(presc['status']))
             ]
             
@@ -92,17 +92,30 @@ class PatientDashboard(Dashboard):
             QWidget().setLayout(self.layout())
 
         super().init_ui()
-        self.load_data()
-        self.setup_ui_components()
+        self.load_data(then=self.setup_ui_components)
         
-    def load_data(self):
-        """Load all necessary data from database"""
+    def load_data(self, then=None):
+        """Load all necessary data from database in the background"""
         self.patient_id = self.user_data['id']
-        self.appointments = self.db.get_patient_appointments(self.patient_id)
-        self.prescriptions = self.db.get_patient_prescriptions(self.patient_id)
-        self.medical_records = self.db.get_patient_medical_records(self.patient_id)
-        self.bills = self.db.get_patient_bills(self.patient_id)
-        self.doctors = self.db.get_all_doctors()
+        self.loader.request(
+            'dashboard',
+            self.fetch_data, self.patient_id,
+            on_loaded=lambda data: self.apply_data(data, then)
+        )
+
+    def fetch_data(self, patient_id):
+        """Runs on a worker thread"""
+        return self.db.get_patient_overview(patient_id) or {
+            'appointments': [], 'prescriptions': [], 'medical_records': [], 'bills': []
+        }
+
+    def apply_data(self, data, then=None):
+        self.appointments = data['appointments']
+        self.prescriptions = data['prescriptions']
+        self.medical_records = data['medical_records']
+        self.bills = data['bills']
+        if then:
+            then()
         
     def setup_ui_components(self):
         """Setup all UI components"""
@@ -181,8 +194,7 @@ class PatientDashboard(Dashboard):
     def update_appointments_table(self):
         """Update the appointments table with current data"""
         try:
-            appointments = self.db.get_patient_appointments(self.user_data['id'])
-            upcoming_appts = [appt for appt in appointments 
+            upcoming_appts = [appt for appt in self.appointments 
                             if appt['status'] == 'scheduled' and 
                             appt['date'] >= datetime.now().date()]
             
@@ -197,8 +209,7 @@ class PatientDashboard(Dashboard):
                 self.appointments_table.setItem(row, 2, QTableWidgetItem(appt['reason']))
                 self.appointments_table.setItem(row, 3, QTableWidgetItem(LANGUAGES[self.lang][appt['status']]))
                 
-                doctor = self.db.get_doctor_by_id(appt['doctor_id'])
-                doctor_name = doctor['name'] if doctor else "Unknown"
+                doctor_name = appt.get('doctor_name') or "Unknown"
                 self.appointments_table.setItem(row, 4, QTableWidgetItem(doctor_name))
                 
         except Exception as e:
@@ -221,7 +232,6 @@ class PatientDashboard(Dashboard):
         )[:3]
         
         for presc in active_prescriptions:
-            doctor = self.db.get_doctor_by_id(presc['doctor_id'])
             color = "blue" if presc['status'] == 'active' else "green"
             
             prescription = QWidget()
@@ -252,7 +262,7 @@ class PatientDashboard(Dashboard):
             
             date_str = presc['date'].strftime("%Y-%m-%d") if hasattr(presc['date'], 'strftime') else str(presc['date'])
             details = QLabel(LANGUAGES[self.lang]['prescribed_by'].format(
-                doctor['name'] if doctor else "Unknown", 
+                presc.get('doctor_name') or "Unknown", 
                 date_str
             ))
             details.setStyleSheet("color: #6b7280; font-size: 12px;")
@@ -308,11 +318,10 @@ class PatientDashboard(Dashboard):
             for record in sorted(self.medical_records, 
                                key=lambda x: x['date'], 
                                reverse=True)[:3]:
-                doctor = self.db.get_doctor_by_id(record['doctor_id'])
                 date_str = record['date'].strftime("%Y-%m-%d") if hasattr(record['date'], 'strftime') else str(record['date'])
                 summary_html += f"""
                 <li>
-                    <b>{date_str}</b> - {doctor['name'] if doctor else 'Unknown'}<br>
+                    <b>{date_str}</b> - {record.get('doctor_name') or 'Unknown'}<br>
                     {LANGUAGES[self.lang]['diagnosis_label'].format(record['diagnosis'])}<br>
                     {LANGUAGES[self.lang]['treatment_label'].format(record['treatment'])}
                 </li>
@@ -355,10 +364,8 @@ class PatientDashboard(Dashboard):
         """Show dialog to book new appointment"""
         dialog = BookAppointmentDialog(self.user_data, self.db, self.lang)
         if dialog.exec_() == QDialog.Accepted:
-            self.load_data()
-            self.update_appointments_table()
             dialog.close()
-            self.update_appointments_table()
+            self.load_data(then=self.update_appointments_table)
         
     def request_prescription_refill(self, prescription_id):
         """Request refill for a prescription"""
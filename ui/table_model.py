@@ -0,0 +1,184 @@
+from decimal import Decimal
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, pyqtSignal
+
+from .loader import DataLoader
+
+# Custom roles: the whole row dict, and a raw value the proxy sorts on
+ROW_ROLE = Qt.UserRole
+SORT_ROLE = Qt.UserRole + 1
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Read-only table model that pulls rows from the database a page at a time.
+
+    ``columns`` is a list of ``(header, value)`` pairs, where ``value`` is a
+    row key or a callable that takes the row dict and returns the cell text.
+
+    ``set_query(fetch_page)`` makes the model paginated: ``fetch_page(cursor,
+    page_size)`` must return ``(rows, next_cursor)`` like the ``*_page``
+    methods of HospitalDatabase. The first page loads straight away and the
+    view asks for the next one through ``canFetchMore``/``fetchMore`` when it
+    is scrolled to the bottom, so only rows the user has reached are ever
+    fetched. Pages load on a worker thread. ``set_rows`` fills the model
+    with a fixed list instead.
+    """
+
+    page_loaded = pyqtSignal(int)
+
+    def __init__(self, columns, page_size: int = 200, parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.page_size = page_size
+        self.loader = DataLoader(self)
+
+        self._rows = []
+        self._fetch_page = None
+        self._next_cursor = None
+        self._exhausted = True
+        self._fetching = False
+
+    def set_query(self, fetch_page):
+        """Drop the current rows and start paging through ``fetch_page``"""
+        self.loader.cancel('page')
+        self.beginResetModel()
+        self._rows = []
+        self._fetch_page = fetch_page
+        self._next_cursor = None
+        self._exhausted = False
+        self._fetching = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def set_rows(self, rows):
+        """Show a fixed list of rows; nothing more will be fetched"""
+        self.loader.cancel('page')
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._fetch_page = None
+        self._next_cursor = None
+        self._exhausted = True
+        self._fetching = False
+        self.endResetModel()
+
+    # Lazy loading
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._fetching = True
+        self.loader.request(
+            'page',
+            self._fetch_page, self._next_cursor, self.page_size,
+            on_loaded=self._append_page,
+            on_failed=self._page_failed
+        )
+
+    def has_more(self):
+        """True while there are rows in the database that aren't loaded yet"""
+        return not self._exhausted
+
+    def _append_page(self, result):
+        rows, next_cursor = result
+        self._fetching = False
+        self._next_cursor = next_cursor
+        self._exhausted = next_cursor is None
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+        self.page_loaded.emit(len(rows))
+
+    def _page_failed(self, error):
+        self._fetching = False
+        self._exhausted = True
+
+    # Qt model interface
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.columns):
+            return self.columns[section][0]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role == ROW_ROLE:
+            return row
+
+        value = self.columns[index.column()][1]
+        if value is None:
+            return None
+        value = value(row) if callable(value) else row.get(value)
+
+        if role == Qt.DisplayRole:
+            return '' if value is None else str(value)
+        if role == SORT_ROLE:
+            # Keep numbers numeric so they sort by value, everything else by text
+            if isinstance(value, Decimal):
+                return float(value)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return value
+            return '' if value is None else str(value)
+        return None
+
+    # Row access for pages
+    def row(self, row_idx):
+        return self._rows[row_idx]
+
+    def rows(self):
+        return list(self._rows)
+
+    def find_row(self, predicate):
+        """Index of the first loaded row matching ``predicate``, or None"""
+        return next((i for i, row in enumerate(self._rows) if predicate(row)), None)
+
+    def set_row(self, row_idx, row):
+        self._rows[row_idx] = row
+        self.dataChanged.emit(
+            self.index(row_idx, 0), self.index(row_idx, len(self.columns) - 1)
+        )
+
+    def insert_row(self, row_idx, row):
+        self.beginInsertRows(QModelIndex(), row_idx, row_idx)
+        self._rows.insert(row_idx, row)
+        self.endInsertRows()
+
+    def remove_row(self, row_idx):
+        self.beginRemoveRows(QModelIndex(), row_idx, row_idx)
+        del self._rows[row_idx]
+        self.endRemoveRows()
+
+
+class TableSortProxy(QSortFilterProxyModel):
+    """Sorts on raw values and filters on any column, case-insensitively.
+
+    Sorting and filtering only see rows the source model has loaded.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.setSortRole(SORT_ROLE)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setFilterKeyColumn(-1)
+
+    def row_at(self, proxy_index):
+        """The row dict behind an index of this proxy"""
+        return self.sourceModel().row(self.mapToSource(proxy_index).row())
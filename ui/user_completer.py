@@ -0,0 +1,52 @@
+from PyQt5.QtCore import QStringListModel, Qt, QTimer
+from PyQt5.QtWidgets import QCompleter
+
+
+class UserSearchCompleter(QCompleter):
+    """Suggests user names in a filter box as the admin types.
+
+    Suggestions come from HospitalDatabase.search_users, so they follow the
+    same substring-or-fuzzy rule as the SQL name filters. Lookups run on
+    ``loader`` once typing pauses for ``delay_ms``.
+    """
+
+    def __init__(self, line_edit, db, role, loader, delay_ms=200, limit=10):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        self.db = db
+        self.role = role
+        self.loader = loader
+        self.limit = limit
+        self._key = f'user_search:{role}:{id(self)}'
+
+        self._names = QStringListModel(self)
+        self.setModel(self._names)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        # The database already picked the matches; fuzzy ones don't share
+        # a prefix with the text, so the completer mustn't filter again
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        line_edit.setCompleter(self)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._lookup)
+        line_edit.textEdited.connect(lambda _: self._timer.start())
+
+    def _lookup(self):
+        text = self.line_edit.text().strip()
+        if len(text) < 2:
+            self.loader.cancel(self._key)
+            self._names.setStringList([])
+            return
+        self.loader.request(
+            self._key,
+            self.db.search_users, text, self.role, limit=self.limit,
+            on_loaded=self._show
+        )
+
+    def _show(self, users):
+        names = list(dict.fromkeys(user['name'] for user in users))
+        self._names.setStringList(names)
+        if names and self.line_edit.hasFocus():
+            self.complete()